@@ -0,0 +1,167 @@
+"""
+Per-process caches of small, rarely-changing ArangoDB collections, so hot
+endpoints can resolve them without a round trip. Each is a
+roma.cache.CollectionCache, invalidated by collection revision — except
+search_candidate_cache, a short-TTL cache of search results being paged,
+and related_response_cache, the /related/ and by-category responses in
+the "responses" Django cache, keyed on the same collection revisions.
+"""
+
+import csv
+import io
+from collections import defaultdict
+
+from django.conf import settings
+
+from data.models import parse_hierarchy, phrase_ref_sort_key
+from roma.cache import CollectionCache, ResponseCache, TTLCache
+
+
+class CategoryTree:
+    """The whole Categories collection, indexed by id, _key and parent_id.
+    `hierarchy` is parsed to a list once, at load time."""
+
+    def __init__(self, docs):
+        self.by_id = {}
+        self.by_key = {}
+        self.children_by_parent = defaultdict(list)
+        for doc in docs:
+            doc["hierarchy"] = parse_hierarchy(doc.get("hierarchy"))
+            self.by_id[doc["id"]] = doc
+            self.by_key[doc["_key"]] = doc
+            self.children_by_parent[doc.get("parent_id")].append(doc)
+
+    @staticmethod
+    def _normalize_id(category_id):
+        if isinstance(category_id, str) and category_id.isdigit():
+            return int(category_id)
+        return category_id
+
+    def get(self, category_id):
+        """Category doc by its numeric id, or None."""
+        return self.by_id.get(self._normalize_id(category_id))
+
+    def get_by_key(self, key):
+        """Category doc by ArangoDB _key, or None."""
+        return self.by_key.get(key)
+
+    def children(self, parent_id):
+        """Direct children of parent_id, in id order."""
+        return self.children_by_parent.get(self._normalize_id(parent_id), [])
+
+    def has_children(self, category_id):
+        return bool(self.children_by_parent.get(self._normalize_id(category_id)))
+
+
+def _load_category_tree(db):
+    cursor = db.aql.execute("FOR doc IN Categories SORT doc.id RETURN doc", batch_size=1000)
+    return CategoryTree(cursor)
+
+
+category_tree_cache = CollectionCache(["Categories"], _load_category_tree)
+
+
+def get_category_tree(db):
+    """The cached CategoryTree for db (reloaded when Categories changes)."""
+    return category_tree_cache.get(db)
+
+
+class SampleIndex:
+    """Every sample's ref, visibility and display label ("dialect, location")."""
+
+    def __init__(self, docs):
+        self.labels = {}
+        self.visible_refs = []
+        self.hidden_refs = []
+        for doc in docs:
+            self.labels[doc["ref"]] = doc.get("label")
+            if doc.get("visible") == "Yes":
+                self.visible_refs.append(doc["ref"])
+            else:
+                self.hidden_refs.append(doc["ref"])
+        self._visible = frozenset(self.visible_refs)
+
+    def is_visible(self, ref):
+        return ref in self._visible
+
+
+def _load_sample_index(db):
+    cursor = db.aql.execute(
+        """
+        FOR s IN Samples
+            RETURN {ref: s.sample_ref, visible: s.visible, label: CONCAT_SEPARATOR(', ', s.dialect_name, s.location)}
+        """,
+        batch_size=1000,
+    )
+    return SampleIndex(cursor)
+
+
+sample_index_cache = CollectionCache(["Samples"], _load_sample_index)
+
+
+def get_sample_index(db):
+    """The cached SampleIndex for db (reloaded when Samples changes)."""
+    return sample_index_cache.get(db)
+
+
+class PhraseRegistry:
+    """The canonical phrase list — every MasterPhrases phrase_ref and its
+    English gloss, in natural phrase_ref order — that sample imports are
+    validated against and the import template is built from."""
+
+    def __init__(self, docs):
+        self.phrases = sorted(docs, key=lambda p: p.get("phrase_ref_sort") or phrase_ref_sort_key(p["phrase_ref"]))
+        self.refs = frozenset(p["phrase_ref"] for p in self.phrases)
+        self._template_csv = None
+
+    @property
+    def template_csv(self):
+        """The import template (phrase_ref, english, phrase, conjugated) as
+        UTF-8 CSV bytes with a BOM, rendered on first use."""
+        if self._template_csv is None:
+            output = io.BytesIO()
+            wrapper = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
+            writer = csv.writer(wrapper)
+            writer.writerow(["phrase_ref", "english", "phrase", "conjugated"])
+            for p in self.phrases:
+                writer.writerow([p.get("phrase_ref", ""), p.get("english") or "", "", ""])
+            wrapper.flush()
+            self._template_csv = output.getvalue()
+        return self._template_csv
+
+
+def _load_phrase_registry(db):
+    cursor = db.aql.execute(
+        "FOR m IN MasterPhrases "
+        "RETURN {phrase_ref: m.phrase_ref, phrase_ref_sort: m.phrase_ref_sort, english: m.english}",
+        batch_size=1000,
+    )
+    return PhraseRegistry(cursor)
+
+
+phrase_registry_cache = CollectionCache(["MasterPhrases"], _load_phrase_registry)
+
+
+def get_phrase_registry(db):
+    """The cached PhraseRegistry for db (reloaded when MasterPhrases changes)."""
+    return phrase_registry_cache.get(db)
+
+
+# Ordered candidate _ids of recent phrase/transcription searches, keyed by
+# (kind, sort, bind vars) plus the search_revisions below, so paging
+# doesn't re-run the ArangoSearch LIKE, yet a write from any process
+# misses the lists cached before it
+search_candidate_cache = TTLCache(
+    settings.SEARCH_CANDIDATE_CACHE_TTL, settings.SEARCH_CANDIDATE_CACHE_ENTRIES
+)
+search_revisions = CollectionCache(
+    ["SamplePhrases", "MasterPhrases", "Transcriptions", "Samples"], lambda db: None
+)
+
+# Keyed by (endpoint, category_id, sample[, answer_key]) plus the revisions
+# of every collection those responses read — and Phrases, which sample
+# imports and rollbacks write to.
+related_response_cache = ResponseCache(
+    "related",
+    ["Answers", "ResearchQuestions", "MasterPhrases", "SamplePhrases", "Transcriptions", "Phrases"],
+)
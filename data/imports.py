@@ -0,0 +1,442 @@
+"""
+Sample CSV imports, run as background jobs.
+
+POST /samples/import/ only checks the request (permissions, sample_ref,
+CSV header), saves the upload under IMPORT_UPLOAD_DIR and queues an
+ImportBatches record pointing at it. The run_import_worker management
+command picks queued batches up in order, validates every row and writes
+the sample in one stream transaction, so a large import never ties up an
+API worker.
+
+The upload is never held in memory as a whole: its encoding is detected
+from the first bytes, and it is decoded and parsed row by row, twice —
+once to validate every row (collecting the per-row errors), then, if all
+rows are valid, again inside the transaction to write the phrases in
+WRITE_BATCH_SIZE batches.
+
+The batch record doubles as the job's status, polled through
+GET /samples/import-batch/{batch_id}/:
+
+    queued -> validating -> writing -> done
+
+or `failed` (with the per-row errors, or the write error) from validating
+or writing, in which case nothing was written.
+
+Records from before the queue existed carry no status; they count as done.
+"""
+
+import codecs
+import csv
+import fcntl
+import logging
+import os
+import socket
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+
+from data.caches import (
+    get_phrase_registry,
+    related_response_cache,
+    sample_index_cache,
+    search_revisions,
+)
+from data.models import phrase_ref_sort_key
+from roma.bulk import WRITE_BATCH_SIZE, BulkWriteError, bulk_insert, bulk_update
+from roma.transactions import stream_transaction
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+VALIDATING = "validating"
+WRITING = "writing"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, VALIDATING, WRITING)
+
+# Worker-only attributes of a batch record, left out of API responses
+INTERNAL_FIELDS = ["upload_path", "encoding", "params"]
+
+# Rows validated between two progress updates of the batch record
+PROGRESS_EVERY = 500
+
+# Encodings tried for an upload, in order; latin-1 decodes anything
+ENCODINGS = ("utf-8-sig", "utf-8", "cp1252", "latin-1")
+# Bytes read from the start of an upload to pick its encoding
+ENCODING_PREFIX_BYTES = 64 * 1024
+
+# Lock file in IMPORT_UPLOAD_DIR held by the running worker
+WORKER_LOCK_FILE = "worker.lock"
+
+REQUIRED_COLUMNS = {"phrase_ref", "phrase"}
+
+SAMPLE_FIELDS = (
+    "dialect_name", "self_attrib_name", "dialect_group_name", "location", "country_code", "source_type",
+)
+
+
+class ImportRejectedError(Exception):
+    """The upload can't be imported; `body` is the error response payload."""
+
+    def __init__(self, body):
+        super().__init__(body.get("error") or "Import rejected")
+        self.body = body
+
+
+def save_upload(uploaded_file):
+    """Copy an UploadedFile into IMPORT_UPLOAD_DIR chunk by chunk; returns its path."""
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+    with open(path, "wb") as out:
+        for chunk in uploaded_file.chunks():
+            out.write(chunk)
+    return path
+
+
+def remove_upload(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def detect_encoding(prefix, complete=False):
+    """The first of ENCODINGS that decodes `prefix`: the start of a file,
+    possibly cut mid-character, or all of it if `complete`."""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+@contextmanager
+def open_rows(path, encoding):
+    """A csv.DictReader over the upload at `path`, decoding and parsing it
+    as it's iterated. The delimiter is sniffed from the first 4 KiB."""
+    with open(path, encoding=encoding, newline="") as f:
+        head = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(head, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield csv.DictReader(f, dialect=dialect)
+
+
+def check_upload(path):
+    """The encoding of the upload at `path`. Raises ImportRejectedError if its
+    header can't be parsed or lacks the required columns."""
+    with open(path, "rb") as f:
+        prefix = f.read(ENCODING_PREFIX_BYTES)
+    encoding = detect_encoding(prefix, complete=len(prefix) < ENCODING_PREFIX_BYTES)
+    try:
+        with open_rows(path, encoding) as reader:
+            fieldnames = reader.fieldnames or []
+    except Exception as exc:
+        raise ImportRejectedError({"error": f"Could not parse CSV: {exc}"})
+
+    if not fieldnames:
+        raise ImportRejectedError({"error": "CSV file appears to be empty or has no header row"})
+
+    missing = REQUIRED_COLUMNS - set(fieldnames)
+    if missing:
+        raise ImportRejectedError({
+            "error": f"CSV is missing required column(s): {', '.join(sorted(missing))}. "
+                     f"Found columns: {', '.join(fieldnames)}"
+        })
+    return encoding
+
+
+def validate_row(i, row, canonical_refs, sample_ref, skip_empty):
+    """(phrase document, None) for a valid CSV row (line `i`), (None, error)
+    for an invalid one and (None, None) for a skipped empty phrase."""
+    phrase_ref = (row.get("phrase_ref") or "").strip()
+    phrase = (row.get("phrase") or "").strip()
+    english = (row.get("english") or "").strip()
+    conjugated_raw = (row.get("conjugated") or "").strip().lower()
+
+    if not phrase_ref:
+        return None, {"row": i, "phrase_ref": "", "message": "phrase_ref is empty"}
+    if phrase_ref not in canonical_refs:
+        return None, {
+            "row": i,
+            "phrase_ref": phrase_ref,
+            "message": f"phrase_ref '{phrase_ref}' does not exist in the canonical phrase list",
+        }
+    if not phrase:
+        if skip_empty:
+            return None, None
+        return None, {
+            "row": i,
+            "phrase_ref": phrase_ref,
+            "message": "phrase column is empty — Romani text is required (or enable 'Skip empty phrases')",
+        }
+
+    conjugated = None
+    if conjugated_raw in ("y", "yes", "true", "1"):
+        conjugated = True
+    elif conjugated_raw in ("n", "no", "false", "0"):
+        conjugated = False
+    elif conjugated_raw:
+        return None, {
+            "row": i,
+            "phrase_ref": phrase_ref,
+            "message": f"conjugated value '{row.get('conjugated', '')}' is not recognised — use Y, N, or leave blank",
+        }
+
+    return {
+        "phrase_ref": phrase_ref,
+        "phrase_ref_sort": phrase_ref_sort_key(phrase_ref),
+        "phrase": phrase,
+        "english": english,
+        "conjugated": conjugated,
+        "sample": sample_ref,
+    }, None
+
+
+def queue_import(db, sample_ref, upgrade, upload_path, encoding, params, username):
+    """Store a queued ImportBatches record for the worker; returns it."""
+    batch = {
+        "batch_id": str(uuid.uuid4()),
+        "sample_ref": sample_ref,
+        "status": QUEUED,
+        "upgrade": upgrade,
+        "created_at": datetime.utcnow().isoformat(),
+        "created_by": username,
+        "rolled_back": False,
+        "upload_path": upload_path,
+        "encoding": encoding,
+        "params": params,
+    }
+    meta = db.collection("ImportBatches").insert(batch)
+    batch["_key"] = meta["_key"]
+    return batch
+
+
+def claim_next_import(db):
+    """Mark the oldest queued batch as validating and return it (None if
+    the queue is empty). Two workers racing for the same batch conflict,
+    and the loser just tries again on its next poll."""
+    cursor = db.aql.execute(
+        "FOR b IN ImportBatches FILTER b.status == @queued SORT b.created_at LIMIT 1 "
+        "UPDATE b WITH {status: @validating, started_at: @now, worker: @worker} IN ImportBatches "
+        "RETURN NEW",
+        bind_vars={
+            "queued": QUEUED,
+            "validating": VALIDATING,
+            "now": datetime.utcnow().isoformat(),
+            "worker": socket.gethostname(),
+        },
+    )
+    return next(cursor, None)
+
+
+@contextmanager
+def worker_lock():
+    """
+    Hold the import worker lock of this host while the block runs; yields
+    False, without blocking, if another worker already holds it. The lock
+    is a file in IMPORT_UPLOAD_DIR, next to the uploads only a worker on
+    this host can read, and is released when the process dies.
+    """
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    with open(os.path.join(settings.IMPORT_UPLOAD_DIR, WORKER_LOCK_FILE), "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def requeue_interrupted(db):
+    """Put batches a stopped worker on this host left validating/writing
+    back in the queue. Their transaction never committed, so nothing of
+    them was written. Call only while holding worker_lock(), so no live
+    worker here is still running them."""
+    cursor = db.aql.execute(
+        "FOR b IN ImportBatches FILTER b.status IN @active AND b.worker == @worker "
+        "UPDATE b WITH {status: @queued} IN ImportBatches RETURN 1",
+        bind_vars={"active": [VALIDATING, WRITING], "queued": QUEUED, "worker": socket.gethostname()},
+    )
+    return len(list(cursor))
+
+
+def _update_batch(db, batch, **fields):
+    db.collection("ImportBatches").update({"_key": batch["_key"], **fields}, keep_none=False)
+
+
+def run_import(db, batch):
+    """Validate and write a claimed batch, recording the outcome on it."""
+    try:
+        canonical_refs = get_phrase_registry(db).refs
+        encoding, rows_total, valid_count = _validate_upload(db, batch, canonical_refs)
+        # Last write to the record outside the transaction: updating it
+        # again inside would conflict with an outside write made after
+        # the transaction began
+        _update_batch(db, batch, status=WRITING, encoding=encoding, rows_total=rows_total, rows_checked=rows_total)
+        docs = _phrase_docs(batch, encoding, canonical_refs)
+        _write_import(db, batch, docs, rows_total - valid_count)
+    except ImportRejectedError as exc:
+        _fail(db, batch, **exc.body)
+    except BulkWriteError as exc:
+        _fail(db, batch, error=f"Failed to write phrases: {exc}", errors=exc.errors)
+    except Exception as exc:
+        logger.exception("Import batch %s failed", batch["batch_id"])
+        _fail(db, batch, error=f"Import failed, nothing was written: {exc}")
+    else:
+        remove_upload(batch["upload_path"])
+        related_response_cache.invalidate()
+        search_revisions.invalidate()
+        if not batch["upgrade"]:
+            sample_index_cache.invalidate()
+
+
+def _fail(db, batch, error=None, errors=None):
+    _update_batch(db, batch, status=FAILED, error=error, errors=errors, finished_at=datetime.utcnow().isoformat())
+    remove_upload(batch["upload_path"])
+
+
+def _validate_upload(db, batch, canonical_refs):
+    """
+    First pass: check every row, keeping only the errors and counts.
+    Returns (encoding, rows, valid rows); raises ImportRejectedError with the
+    per-row errors. A byte the detected encoding can't decode further into
+    the file restarts the pass with the next encoding in ENCODINGS.
+    """
+    skip_empty = batch["params"].get("skip_empty", False)
+    for encoding in ENCODINGS[ENCODINGS.index(batch["encoding"]):]:
+        errors = []
+        rows_total = valid_count = 0
+        try:
+            with open_rows(batch["upload_path"], encoding) as reader:
+                for rows_total, row in enumerate(reader, start=1):
+                    doc, error = validate_row(rows_total + 1, row, canonical_refs, batch["sample_ref"], skip_empty)
+                    if error:
+                        errors.append(error)
+                    elif doc:
+                        valid_count += 1
+                    if rows_total % PROGRESS_EVERY == 0:
+                        _update_batch(db, batch, rows_checked=rows_total)
+        except UnicodeDecodeError:
+            continue
+        break
+
+    if errors:
+        raise ImportRejectedError({"errors": errors})
+    if not valid_count:
+        raise ImportRejectedError({"error": "CSV contains no phrase rows after the header"})
+    return encoding, rows_total, valid_count
+
+
+def _phrase_docs(batch, encoding, canonical_refs):
+    """Second pass: the phrase documents of an upload already validated."""
+    skip_empty = batch["params"].get("skip_empty", False)
+    with open_rows(batch["upload_path"], encoding) as reader:
+        for i, row in enumerate(reader, start=2):
+            doc, _ = validate_row(i, row, canonical_refs, batch["sample_ref"], skip_empty)
+            if doc:
+                yield doc
+
+
+def _chunks(docs, size):
+    docs = iter(docs)
+    while batch := list(islice(docs, size)):
+        yield batch
+
+
+def _write_import(db, batch, docs, skipped_empty_count):
+    # The sample, its phrases and the completed batch record are written in
+    # one stream transaction: either all of it is committed or none of it.
+    # Phrases are written WRITE_BATCH_SIZE at a time as they're parsed.
+    batch_id, sample_ref = batch["batch_id"], batch["sample_ref"]
+    with stream_transaction(db, write=["Samples", "Phrases", "ImportBatches"]) as txn:
+        phrases = txn.collection("Phrases")
+        inserted_count = updated_count = 0
+        rollback_updates = []  # stores old values so rollback can restore them
+
+        # ── Create mode ──────────────────────────────────────────────────────
+        if not batch["upgrade"]:
+            # Re-checked here: another import of the same sample_ref may
+            # have been queued and run since this one was accepted
+            if list(txn.collection("Samples").find({"sample_ref": sample_ref}, limit=1)):
+                raise ImportRejectedError({"error": f"Sample {sample_ref} already exists"})
+
+            params = batch["params"]
+            sample_doc = {field: (params.get(field) or "").strip() for field in SAMPLE_FIELDS}
+            txn.collection("Samples").insert({
+                "sample_ref": sample_ref,
+                **sample_doc,
+                "visible": params.get("visible", "No"),
+                "migrant": params.get("migrant", "No"),
+                "import_batch_id": batch_id,
+            })
+
+            for to_insert in _chunks(docs, WRITE_BATCH_SIZE):
+                for p in to_insert:
+                    p["import_batch_id"] = batch_id
+                write_errors = bulk_insert(phrases, to_insert)
+                if write_errors:
+                    raise BulkWriteError(write_errors)
+                inserted_count += len(to_insert)
+
+        # ── Upgrade mode ─────────────────────────────────────────────────────
+        else:
+            # Load existing phrases for this sample keyed by phrase_ref
+            existing_cursor = txn.aql.execute(
+                "FOR p IN Phrases FILTER p.sample == @s "
+                "RETURN {phrase_ref: p.phrase_ref, _key: p._key, "
+                "phrase: p.phrase, english: p.english, conjugated: p.conjugated}",
+                bind_vars={"s": sample_ref},
+            )
+            existing_by_ref = {p["phrase_ref"]: p for p in existing_cursor}
+
+            for chunk in _chunks(docs, WRITE_BATCH_SIZE):
+                to_insert = []
+                to_update = []
+                for p in chunk:
+                    ref = p["phrase_ref"]
+                    if ref in existing_by_ref:
+                        old = existing_by_ref[ref]
+                        rollback_updates.append({
+                            "_key": old["_key"],
+                            "phrase": old.get("phrase"),
+                            "english": old.get("english"),
+                            "conjugated": old.get("conjugated"),
+                        })
+                        # Tagged apart from inserted phrases, which rollback removes
+                        to_update.append({"_key": old["_key"], "phrase": p["phrase"],
+                                          "english": p["english"], "conjugated": p["conjugated"],
+                                          "phrase_ref_sort": p["phrase_ref_sort"],
+                                          "updated_by_batch_id": batch_id})
+                    else:
+                        p["import_batch_id"] = batch_id
+                        to_insert.append(p)
+
+                write_errors = bulk_insert(phrases, to_insert) + bulk_update(phrases, to_update)
+                if write_errors:
+                    raise BulkWriteError(write_errors)
+                inserted_count += len(to_insert)
+                updated_count += len(to_update)
+
+        txn.collection("ImportBatches").update({
+            "_key": batch["_key"],
+            "status": DONE,
+            "phrase_count": inserted_count,
+            "updated_count": updated_count,
+            "skipped_empty_count": skipped_empty_count,
+            "rollback_updates": rollback_updates,
+            "finished_at": datetime.utcnow().isoformat(),
+            "upload_path": None,
+        }, keep_none=False)
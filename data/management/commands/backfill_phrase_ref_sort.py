@@ -0,0 +1,64 @@
+"""
+One-off migration: store `phrase_ref_sort` (see data.models.phrase_ref_sort_key)
+on every MasterPhrases and SamplePhrases document, so phrase search can
+sort and paginate on an indexed field instead of computing a natural-sort
+expression per row.
+
+Idempotent — documents whose phrase_ref_sort is already correct are left
+alone, so a run that reports failed writes can simply be repeated.
+
+Usage:
+    python manage.py backfill_phrase_ref_sort
+    python manage.py backfill_phrase_ref_sort --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data.models import MasterPhrase, SamplePhrase, phrase_ref_sort_key
+from roma.bulk import bulk_update
+
+
+class Command(BaseCommand):
+    help = "Store the zero-padded phrase_ref_sort key on MasterPhrases and SamplePhrases."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without writing anything",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Documents per bulk update (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        db = MasterPhrase.db()
+        size = options["batch_size"]
+        failed = 0
+        for model in (MasterPhrase, SamplePhrase):
+            cursor = db.aql.execute(
+                f"FOR doc IN {model.collection_name} "
+                "RETURN {_key: doc._key, phrase_ref: doc.phrase_ref, phrase_ref_sort: doc.phrase_ref_sort}",
+                batch_size=size,
+            )
+            updates = [
+                {"_key": doc["_key"], "phrase_ref_sort": phrase_ref_sort_key(doc["phrase_ref"])}
+                for doc in cursor
+                if doc.get("phrase_ref_sort") != phrase_ref_sort_key(doc["phrase_ref"])
+            ]
+            self.stdout.write(f"{model.collection_name}: {len(updates)} documents need phrase_ref_sort.")
+            if options["dry_run"] or not updates:
+                continue
+
+            errors = bulk_update(db.collection(model.collection_name), updates, batch_size=size)
+            for error in errors[:20]:
+                self.stderr.write(f"{model.collection_name}/{error['_key']}: {error['error']}")
+            failed += len(errors)
+            self.stdout.write(self.style.SUCCESS(
+                f"Set phrase_ref_sort on {len(updates) - len(errors)} {model.collection_name} documents."
+            ))
+        if failed:
+            raise CommandError(f"{failed} document(s) could not be updated; re-run to retry them.")
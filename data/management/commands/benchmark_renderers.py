@@ -0,0 +1,77 @@
+"""
+Times rendering representative API payloads with roma.renderers.ORJSONRenderer
+against DRF's stdlib-based JSONRenderer: a full phrase export list and a
+multi-question answers response. Uses synthetic rows, so it needs no
+database.
+
+Usage:
+    python manage.py benchmark_renderers
+    python manage.py benchmark_renderers --rows 20000 --repeat 20
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from roma.renderers import ORJSONRenderer, orjson
+
+
+def _phrase_export(count):
+    return [
+        {
+            "phrase_ref": str(i % 1100),
+            "sample": f"AL-{i % 150:03d}",
+            "sample_label": "Dialect name, Location",
+            "phrase": "me dikhav le phrales thaj le phenja",
+            "english": "I see the brother and the sisters",
+            "conjugated": bool(i % 2),
+            "has_recording": True,
+        }
+        for i in range(count)
+    ]
+
+
+def _answers(count):
+    return [
+        {
+            "_key": str(1000000 + i),
+            "sample": f"AL-{i % 150:03d}",
+            "question_id": 100 + i % 12,
+            "category": "Phonology",
+            "form": "phral",
+            "marker": ["-es", "-e"],
+            "notes": {"source": "fieldwork", "checked": True, "score": 0.75},
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the orjson renderer against DRF's JSONRenderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Rows per payload (default: 10000)")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs, best is reported (default: 10)")
+
+    def _best(self, fn, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed; ORJSONRenderer falls back to JSONRenderer."))
+        rows, repeat = options["rows"], options["repeat"]
+        fast_renderer, drf_renderer = ORJSONRenderer(), JSONRenderer()
+        for name, payload in (("phrase export", _phrase_export(rows)), ("answers", _answers(rows))):
+            fast = self._best(lambda: fast_renderer.render(payload, "application/json", {}), repeat)
+            drf = self._best(lambda: drf_renderer.render(payload, "application/json", {}), repeat)
+            size = len(fast_renderer.render(payload, "application/json", {}))
+            self.stdout.write(
+                f"{name} x {rows} ({size / 1024:.0f} KiB): orjson {fast:.1f} ms, "
+                f"JSONRenderer {drf:.1f} ms ({drf / fast:.1f}x)"
+            )
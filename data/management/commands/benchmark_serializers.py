@@ -0,0 +1,86 @@
+"""
+Times the serialize step of a search response: the many=True fast path
+(roma.serializers.PassThroughListSerializer) against DRF's regular
+ListSerializer, which instantiates a child serializer (and its fields)
+and dispatches through it for every row. Uses synthetic phrase/transcription
+rows, so it needs no database.
+
+Usage:
+    python manage.py benchmark_serializers
+    python manage.py benchmark_serializers --rows 10000 --repeat 20
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+
+from data.serializers import PhraseSerializer, TranscriptionSerializer
+
+
+def _phrase_rows(count):
+    return [
+        {
+            "_key": f"AL-{i % 150:03d}_{i}",
+            "_id": f"SamplePhrases/AL-{i % 150:03d}_{i}",
+            "_rev": "_hXyZ123---",
+            "phrase_ref": str(i % 1100),
+            "phrase_ref_sort": f"{i % 1100:06d}",
+            "sample": f"AL-{i % 150:03d}",
+            "phrase": "me dikhav le phrales",
+            "english": "I see the brother",
+            "conjugated": bool(i % 2),
+            "has_recording": True,
+            "sample_label": "Dialect, Location",
+        }
+        for i in range(count)
+    ]
+
+
+def _transcription_rows(count):
+    return [
+        {
+            "_key": f"t{i}",
+            "_id": f"Transcriptions/t{i}",
+            "_rev": "_hXyZ123---",
+            "sample": f"AL-{i % 150:03d}",
+            "segment_no": i,
+            "transcription": "me dikhav le phrales",
+            "english": "I see the brother",
+            "gloss": "1SG see.1SG ART.OBL brother.OBL",
+            "sample_label": "Dialect, Location",
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the pass-through list serializer against DRF's ListSerializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Rows per response (default: 10000)")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs, best is reported (default: 10)")
+
+    def _best(self, fn, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        for serializer_class, make_rows in (
+            (PhraseSerializer, _phrase_rows),
+            (TranscriptionSerializer, _transcription_rows),
+        ):
+            data = make_rows(rows)
+            fast = self._best(lambda: serializer_class(data, many=True, context={}).data, repeat)
+            drf = self._best(
+                lambda: serializers.ListSerializer(data, child=serializer_class(), context={}).data, repeat
+            )
+            self.stdout.write(
+                f"{serializer_class.__name__} x {rows}: pass-through {fast:.1f} ms, "
+                f"ListSerializer {drf:.1f} ms ({drf / fast:.1f}x)"
+            )
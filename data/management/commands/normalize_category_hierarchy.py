@@ -0,0 +1,71 @@
+"""
+One-off migration: rewrite Categories.hierarchy values that are stored as
+strings (legacy Python reprs like "['Root', 'Phonology']") into native
+arrays, so category listings and searches never have to parse them.
+
+Idempotent — documents whose hierarchy is already an array are left alone,
+so a run that reports failed writes can simply be repeated.
+
+Usage:
+    python manage.py normalize_category_hierarchy
+    python manage.py normalize_category_hierarchy --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data.caches import category_tree_cache
+from data.models import Category, _parse_hierarchy_string
+from roma.bulk import bulk_update
+
+
+class Command(BaseCommand):
+    help = "Convert string-encoded Categories.hierarchy values into native arrays."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without writing anything",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Documents per bulk update (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        db = Category.db()
+        cursor = db.aql.execute(
+            f"FOR doc IN {Category.collection_name} FILTER IS_STRING(doc.hierarchy) "
+            "RETURN {_key: doc._key, hierarchy: doc.hierarchy}",
+            batch_size=options["batch_size"],
+        )
+
+        updates = []
+        unparseable = []
+        for doc in cursor:
+            parsed = _parse_hierarchy_string(doc["hierarchy"])
+            if not parsed and doc["hierarchy"].strip() not in ("", "[]"):
+                unparseable.append(doc["_key"])
+            updates.append({"_key": doc["_key"], "hierarchy": list(parsed)})
+
+        self.stdout.write(f"{len(updates)} string hierarchies found.")
+        if unparseable:
+            self.stdout.write(self.style.WARNING(
+                f"{len(unparseable)} could not be parsed and will be set to []: {', '.join(unparseable[:20])}"
+            ))
+        if options["dry_run"] or not updates:
+            return
+
+        collection = db.collection(Category.collection_name)
+        errors = bulk_update(collection, updates, batch_size=options["batch_size"], merge=False)
+        category_tree_cache.invalidate()
+        if errors:
+            for error in errors[:20]:
+                self.stderr.write(f"{error['_key']}: {error['error']}")
+            raise CommandError(
+                f"{len(errors)} of {len(updates)} Categories.hierarchy values could not be rewritten; "
+                "re-run to retry them."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rewrote {len(updates)} Categories.hierarchy values as arrays."))
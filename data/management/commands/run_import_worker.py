@@ -0,0 +1,77 @@
+"""
+Runs queued sample CSV imports (see data/imports.py), one at a time, so
+they don't occupy the API's gunicorn workers.
+
+On start, batches a previous worker on this host left half-done are put
+back in the queue (their transaction never committed). A batch whose
+failure couldn't even be recorded stops the worker, so that its restart
+requeues it. Only one worker runs per host: a second one exits while the
+first holds the worker lock.
+
+Usage:
+    python manage.py run_import_worker
+    python manage.py run_import_worker --once
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data.imports import claim_next_import, requeue_interrupted, run_import, worker_lock
+from roma.connection import ArangoUnavailableError, connection_manager
+
+
+class Command(BaseCommand):
+    help = "Process queued sample imports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the batches queued right now, then exit",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.IMPORT_WORKER_POLL_INTERVAL,
+            help="Seconds between queue checks while idle (default: IMPORT_WORKER_POLL_INTERVAL)",
+        )
+
+    def handle(self, *args, **options):
+        with worker_lock() as locked:
+            if not locked:
+                raise CommandError("Another import worker is already running on this host")
+            self._run(options)
+
+    def _run(self, options):
+        requeued = None
+        while True:
+            try:
+                db = connection_manager.ensure_available()
+                if requeued is None:
+                    requeued = requeue_interrupted(db)
+                    if requeued:
+                        self.stdout.write(f"Requeued {requeued} interrupted import(s).")
+                batch = claim_next_import(db)
+            except ArangoUnavailableError as exc:
+                self.stderr.write(f"ArangoDB unavailable: {exc}")
+                batch = None
+            except Exception as exc:
+                # e.g. a write conflict with another worker claiming the same batch
+                self.stderr.write(f"Could not claim an import: {exc}")
+                batch = None
+
+            if batch is not None:
+                self.stdout.write(f"Importing {batch['sample_ref']} (batch {batch['batch_id']})")
+                try:
+                    run_import(db, batch)
+                except Exception as exc:
+                    # Couldn't even record the failure, so the batch is still
+                    # marked active: exit, and the restart (start-server.sh)
+                    # requeues it
+                    raise CommandError(f"Import {batch['batch_id']} interrupted: {exc}") from exc
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
@@ -1,8 +1,60 @@
+import ast
+import json
+from functools import lru_cache
+
 from django.db import models
 
 from roma.models import ArangoModel
 
 
+@lru_cache(maxsize=8192)
+def _parse_hierarchy_string(value):
+    try:
+        parsed = json.loads(value)
+    except RecursionError:
+        return ()
+    except ValueError:
+        # Legacy rows store a Python repr, e.g. "['Root', 'Phonology']"
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            # Not a literal (TypeError: e.g. an unhashable dict key), or
+            # one too deeply nested to build
+            return ()
+    if not isinstance(parsed, (list, tuple)):
+        return ()
+    return tuple(parsed)
+
+
+def parse_hierarchy(value):
+    """
+    Category/ResearchQuestion `hierarchy` as a list. Normally stored as a
+    native array (see the normalize_category_hierarchy command); stragglers
+    stored as a string are parsed safely (JSON, then literal_eval — never
+    eval) and memoized on the stored string, so each document revision is
+    parsed once per process.
+    """
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        return list(_parse_hierarchy_string(value))
+    return []
+
+
+def phrase_ref_sort_key(phrase_ref):
+    """
+    Natural-order sort key for a phrase_ref, stored as `phrase_ref_sort` on
+    MasterPhrases/SamplePhrases: the leading number zero-padded to 6
+    digits, then the suffix ("80a" -> "000080a", "100" -> "000100"). A
+    plain string comparison on it matches the old TO_NUMBER/REGEX_REPLACE
+    natural sort, so it can be indexed and range-scanned.
+    """
+    ref = str(phrase_ref or "")
+    suffix = ref.lstrip("0123456789")
+    number = ref[:len(ref) - len(suffix)]
+    return f"{int(number or 0):06d}{suffix}"
+
+
 # Create your models here.
 class Sample(ArangoModel):
     collection_name = "Samples"
@@ -13,8 +13,11 @@ from data.models import (
     Transcription,
     Translation,
     View,
+    parse_hierarchy,
 )
-from roma.serializers import ArangoModelSerializer
+from data.caches import get_category_tree
+from roma.projection import projection
+from roma.serializers import ArangoModelSerializer, PassThroughSerializer
 
 
 class CategorySerializer(ArangoModelSerializer):
@@ -46,14 +49,7 @@ class CategorySerializer(ArangoModelSerializer):
             hierarchy = obj.get("hierarchy", [])
         else:
             hierarchy = getattr(obj, "hierarchy", [])
-
-        if isinstance(hierarchy, str):
-            try:
-                hierarchy = eval(hierarchy)  # Convert string representation to list
-            except Exception as e:
-                print(f"Error parsing hierarchy: {e}")
-                hierarchy = []
-        return hierarchy
+        return parse_hierarchy(hierarchy)
 
     def get_has_children(self, obj):
         request = self.context.get("request")
@@ -66,10 +62,8 @@ class CategorySerializer(ArangoModelSerializer):
         else:
             obj_id = obj.id
 
-        db = request.arangodb
-        collection = db.collection(self.Meta.model.collection_name)
-        cursor = collection.find({"parent_id": obj_id}, limit=1)
-        return len([child for child in cursor]) > 0
+        # Resolved from the cached category tree — no query per category
+        return get_category_tree(request.arangodb).has_children(obj_id)
 
     def get_drill(self, obj):
         request = self.context.get("request")
@@ -110,10 +104,12 @@ class TranslationSerializer(serializers.ModelSerializer):
         ]
 
 
-class ResearchQuestionSerializer(ArangoModelSerializer):
+class ResearchQuestionSerializer(PassThroughSerializer):
     id = serializers.IntegerField()
     parent_id = serializers.IntegerField(allow_null=True)
 
+    exclude_fields = ("_rev", "_id", "tag_ids", "is_leaf")
+
     class Meta:
         model = ResearchQuestion
         fields = [
@@ -124,13 +120,8 @@ class ResearchQuestionSerializer(ArangoModelSerializer):
             "hierarchy_ids",
         ]
 
-    def to_representation(self, instance):
-        exclude_fields = ["_rev", "_id", "tag_ids", "is_leaf"]
-        result = {k: v for k, v in instance.items() if k not in exclude_fields}
-        return result
-
 
-class PhraseSerializer(ArangoModelSerializer):
+class PhraseSerializer(PassThroughSerializer):
     """
     Serializes joined SamplePhrase + MasterPhrase rows (one per sample
     recording of a phrase). Endpoints build the merged dict themselves
@@ -160,14 +151,8 @@ class PhraseSerializer(ArangoModelSerializer):
             return obj.get("has_recording", False)
         return getattr(obj, "has_recording", False)
 
-    def to_representation(self, instance):
-        # Return all attributes from the ArangoDB document, excluding certain fields
-        exclude_fields = ["_rev", "_id"]  # Add fields you want to exclude
-        result = {k: v for k, v in instance.items() if k not in exclude_fields}
-        return result
-
 
-class MasterPhraseSerializer(ArangoModelSerializer):
+class MasterPhraseSerializer(PassThroughSerializer):
     class Meta:
         model = MasterPhrase
         fields = [
@@ -178,11 +163,6 @@ class MasterPhraseSerializer(ArangoModelSerializer):
             "category_ids",
         ]
 
-    def to_representation(self, instance):
-        exclude_fields = ["_rev", "_id"]
-        result = {k: v for k, v in instance.items() if k not in exclude_fields}
-        return result
-
 
 class SampleSerializer(ArangoModelSerializer):
     coordinates = serializers.SerializerMethodField()
@@ -209,6 +189,17 @@ class SampleSerializer(ArangoModelSerializer):
             "annotations",
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The list query already applies ?fields= / ?exclude= (roma.projection);
+        # drop the matching declared fields too, or they'd come back as null
+        request = self.context.get("request")
+        if request is not None and hasattr(request, "query_params"):
+            keep, unset = projection(request, required=("sample_ref",))
+            for name in list(self.fields):
+                if (keep and name not in keep) or (unset and name in unset):
+                    self.fields.pop(name)
+
     def get_coordinates(self, obj):
         # Handle both dict objects (from ArangoDB) and model objects
         if isinstance(obj, dict):
@@ -269,20 +260,11 @@ class SourceSerializer(ArangoModelSerializer):
         fields = "__all__"
 
 
-class AnswerSerializer(ArangoModelSerializer):
+class AnswerSerializer(PassThroughSerializer):
     class Meta:
         model = Answer
         fields = "__all__"
 
-    def to_representation(self, instance):
-        # Handle both dict objects (from ArangoDB) and model objects
-        if isinstance(instance, dict):
-            exclude_fields = ["_rev", "_id"]
-            return {k: v for k, v in instance.items() if k not in exclude_fields}
-        else:
-            # For model instances, use the parent serializer's method
-            return super().to_representation(instance)
-
 
 class ViewSerializer(ArangoModelSerializer):
     parent_category = serializers.SerializerMethodField()
@@ -315,12 +297,10 @@ class ViewSerializer(ArangoModelSerializer):
         db = request.arangodb
         if not db:
             raise serializers.ValidationError("ArangoDB connection is not available.")
-        collection = db.collection(Category.collection_name)
-        cursor = collection.find({"id": parent_id}, limit=1)
-        docs = list(cursor)
+        parent = get_category_tree(db).get(parent_id)
 
-        if docs:
-            return CategorySerializer(docs[0], context={"request": request}).data
+        if parent:
+            return CategorySerializer(parent, context={"request": request}).data
         return None
 
     def to_representation(self, instance):
@@ -332,12 +312,7 @@ class ViewSerializer(ArangoModelSerializer):
         return result
 
 
-class TranscriptionSerializer(ArangoModelSerializer):
+class TranscriptionSerializer(PassThroughSerializer):
     class Meta:
         model = Transcription
         fields = "__all__"
-
-    def to_representation(self, instance):
-        # Return all attributes from the ArangoDB document, excluding certain fields
-        exclude_fields = ["_rev", "_id"]
-        return {k: v for k, v in instance.items() if k not in exclude_fields}
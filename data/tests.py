@@ -1,11 +1,16 @@
+import io
 import json
+import os
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import AnonymousUser
-from django.test import RequestFactory, SimpleTestCase
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, override_settings
 from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
 
+from data.models import phrase_ref_sort_key
+
 
 def _mock_user(is_admin=False, show_hidden=False):
     user = MagicMock()
@@ -26,6 +31,7 @@ def _mock_arango_db():
     """Returns a mock db where:
        - collection.find({"visible": "Yes"}) yields only visible
        - collection.all() yields every sample
+       - the SampleViewSet list query yields visible or all sample documents
     """
     visible = [s for s in ALL_SAMPLES if s["visible"] == "Yes"]
 
@@ -40,6 +46,9 @@ def _mock_arango_db():
     collection.all.side_effect = all_
 
     def aql_execute(q, bind_vars=None):
+        # SampleViewSet list: whole documents, visible ones only unless filtered
+        if "FOR s IN Samples" in q and "RETURN s.sample_ref" not in q:
+            return iter(visible if 'FILTER s.visible == "Yes"' in q else ALL_SAMPLES)
         # Used for the phrase-search helpers: "FOR s IN Samples FILTER s.visible == 'Yes' RETURN s.sample_ref"
         # and the unfiltered variant.
         if "FILTER" in q:
@@ -150,11 +159,11 @@ MASTER_PHRASES = [
 ]
 
 SAMPLE_PHRASES = [
-    {"_key": "AL-001_80a", "phrase_ref": "80a", "phrase": "phrako", "sample": "AL-001", "has_recording": True},
-    {"_key": "AL-002_80a", "phrase_ref": "80a", "phrase": "phral", "sample": "AL-002", "has_recording": False},
-    {"_key": "HIDDEN-01_80a", "phrase_ref": "80a", "phrase": "phralo", "sample": "HIDDEN-01", "has_recording": False},
-    {"_key": "AL-001_81", "phrase_ref": "81", "phrase": "phen", "sample": "AL-001", "has_recording": True},
-    {"_key": "AL-002_81", "phrase_ref": "81", "phrase": "pheni", "sample": "AL-002", "has_recording": False},
+    {"_key": "AL-001_80a", "phrase_ref": "80a", "phrase_ref_sort": "000080a", "phrase": "phrako", "sample": "AL-001", "has_recording": True},
+    {"_key": "AL-002_80a", "phrase_ref": "80a", "phrase_ref_sort": "000080a", "phrase": "phral", "sample": "AL-002", "has_recording": False},
+    {"_key": "HIDDEN-01_80a", "phrase_ref": "80a", "phrase_ref_sort": "000080a", "phrase": "phralo", "sample": "HIDDEN-01", "has_recording": False},
+    {"_key": "AL-001_81", "phrase_ref": "81", "phrase_ref_sort": "000081", "phrase": "phen", "sample": "AL-001", "has_recording": True},
+    {"_key": "AL-002_81", "phrase_ref": "81", "phrase_ref_sort": "000081", "phrase": "pheni", "sample": "AL-002", "has_recording": False},
 ]
 
 VISIBLE_REFS = ["AL-001", "AL-002"]
@@ -175,49 +184,56 @@ class _FakePhraseDB:
         self.master_phrases = {m["phrase_ref"]: m for m in (master_phrases if master_phrases is not None else MASTER_PHRASES)}
         self.sample_phrases = {sp["_key"]: sp for sp in (sample_phrases if sample_phrases is not None else SAMPLE_PHRASES)}
         self.samples = samples if samples is not None else ALL_SAMPLES
+        self.sample_index_loads = 0
+        self.search_queries = 0
+        self.revisions = {}
 
-    def _merged(self, sp, sample_label=None):
+    def _merged(self, sp):
         # question_ids/category_ids deliberately omitted — list/search/
         # export no longer return them (bulky, unused by any bulk-list
         # consumer; see PhraseViewSet.links for the on-demand replacement).
         m = self.master_phrases.get(sp["phrase_ref"], {})
-        out = {
+        return {
             **sp,
             "english": m.get("english"),
             "conjugated": m.get("conjugated"),
         }
-        if sample_label is not None:
-            out["sample_label"] = sample_label
-        return out
 
-    def _export_row(self, sp, sample_label):
+    def _export_row(self, sp):
+        # sample_label is filled in by the view from the cached SampleIndex
         m = self.master_phrases.get(sp["phrase_ref"], {})
         return {
             "phrase_ref": sp["phrase_ref"],
             "sample": sp["sample"],
-            "sample_label": sample_label,
             "phrase": sp["phrase"],
             "english": m.get("english"),
             "conjugated": m.get("conjugated"),
             "has_recording": sp.get("has_recording"),
         }
 
+    def _visible_refs(self, bv):
+        # the per-row Samples lookup behind @show_hidden_samples (unknown samples never match)
+        if "show_hidden_samples" not in bv:
+            return None
+        show_hidden = bv["show_hidden_samples"]
+        return [s["sample_ref"] for s in self.samples if show_hidden or s.get("visible") == "Yes"]
+
     def collection(self, name):
         col = MagicMock()
         store = {"SamplePhrases": self.sample_phrases, "MasterPhrases": self.master_phrases}.get(name, {})
+        col.revision.return_value = self.revisions.get(name, "1")
         col.find.side_effect = lambda q: iter([v for v in store.values() if all(v.get(k) == val for k, val in q.items())])
         return col
 
-    def aql_execute(self, query, bind_vars=None):
+    def aql_execute(self, query, bind_vars=None, **kwargs):
         bv = bind_vars or {}
         is_export = "has_recording: phrase.has_recording" in query
 
-        # sample_refs resolution when not explicitly provided (used by both
-        # the search and export general branches before building bind_vars)
-        if query == "FOR s IN Samples RETURN s.sample_ref":
-            return iter([s["sample_ref"] for s in self.samples])
-        if query == "FOR s IN Samples FILTER s.visible == 'Yes' RETURN s.sample_ref":
-            return iter([s["sample_ref"] for s in self.samples if s.get("visible") == "Yes"])
+        # data.caches.SampleIndex loader (visibility + labels for every sample)
+        if "FOR s IN Samples" in query and "visible: s.visible" in query:
+            self.sample_index_loads += 1
+            return iter([{"ref": s["sample_ref"], "visible": s.get("visible"), "label": f"Label {s['sample_ref']}"}
+                         for s in self.samples])
 
         # get_queryset: GET /phrases/?sample=
         if "FOR sp IN SamplePhrases" in query and "FILTER sp.sample == @sample" in query and "DOCUMENT" in query:
@@ -235,26 +251,22 @@ class _FakePhraseDB:
             if not m:
                 return iter([])
             sample_refs = bv.get("sample_refs")
-            visible_only = "FILTER s.visible == 'Yes'" in query
+            visible = self._visible_refs(bv)
             rows = []
             for sp in self.sample_phrases.values():
                 if sp["phrase_ref"] != phrase_ref:
                     continue
                 if sample_refs and sp["sample"] not in sample_refs:
                     continue
-                s = next((x for x in self.samples if x["sample_ref"] == sp["sample"]), None)
-                if s is None:
+                if visible is not None and sp["sample"] not in visible:
                     continue
-                if visible_only and s.get("visible") != "Yes":
-                    continue
-                label = f"Label {sp['sample']}"
-                rows.append(self._export_row(sp, label) if is_export else self._merged(sp, label))
+                rows.append(self._export_row(sp) if is_export else self._merged(sp))
             return iter(rows)
 
         # search/export general (free-text) branch
         if "LET candidate_keys = UNIQUE" in query:
             query_lower = bv.get("query", "")
-            sample_refs = bv.get("sample_refs", ALL_REFS)
+            sample_refs = bv.get("sample_refs") or self._visible_refs(bv) or ALL_REFS
             search_romani = bv.get("search_romani", True)
             search_english = bv.get("search_english", True)
 
@@ -268,22 +280,37 @@ class _FakePhraseDB:
                                  if query_lower in (m.get("english") or "").lower()}
                 english_keys = {sp["_key"] for sp in self.sample_phrases.values()
                                  if sp["phrase_ref"] in english_refs and sp["sample"] in sample_refs}
-            candidate_keys = sorted(romani_keys | english_keys)
+            # sort=phrase_ref order: (stored phrase_ref_sort, sample)
+            def order(k):
+                return (self.sample_phrases[k].get("phrase_ref_sort") or "", self.sample_phrases[k]["sample"])
 
-            if "RETURN LENGTH(candidate_keys)" in query:
-                return iter([len(candidate_keys)])
+            candidate_keys = sorted(romani_keys | english_keys, key=order)
 
-            rows = []
-            for key in candidate_keys:
-                sp = self.sample_phrases[key]
-                label = f"Label {sp['sample']}"
-                rows.append(self._export_row(sp, label) if is_export else self._merged(sp, label))
+            if "@after_0" in query:
+                # search: cursor (keyset) page
+                after = (bv["after_0"], bv["after_1"])
+                keys = [k for k in candidate_keys if order(k) > after][:bv["limit"]]
+                return iter([self._merged(self.sample_phrases[k]) for k in keys])
 
             if is_export:
-                return iter(rows)
+                return iter([self._export_row(self.sample_phrases[key]) for key in candidate_keys])
+
+            # search: single query returning count, ordered ids and the first page
+            self.search_queries += 1
+            ids = [f"SamplePhrases/{key}" for key in candidate_keys]
             offset = bv.get("offset", 0)
             page_size = bv.get("page_size", 50)
-            return iter(rows[offset:offset + page_size])
+            return iter([{
+                "count": len(ids),
+                "ids": ids if len(ids) <= bv["max_cached_ids"] else None,
+                "results": [self._merged(self.sample_phrases[key]) for key in candidate_keys[offset:offset + page_size]],
+            }])
+
+        # search: later page of a cached candidate list
+        if query.startswith("FOR id IN @ids"):
+            # FILTER sp != null: ids whose document is gone are dropped
+            keys = [i.split("/", 1)[1] for i in bv["ids"]]
+            return iter([self._merged(self.sample_phrases[k]) for k in keys if k in self.sample_phrases])
 
         return iter([])
 
@@ -299,6 +326,9 @@ def _phrase_request(user, method="get", data=None, query=None, db=None):
         raw = factory.get(path, query or {})
         req = Request(raw)
     req.user = user
+    # Candidate lists cached by an earlier test's fake DB must not leak in
+    from data.caches import search_candidate_cache
+    search_candidate_cache.clear()
     fake = db or _FakePhraseDB()
     mock_db = MagicMock()
     mock_db.aql.execute.side_effect = fake.aql_execute
@@ -308,10 +338,10 @@ def _phrase_request(user, method="get", data=None, query=None, db=None):
     return req
 
 
-def _phrase_viewset(user, method="get", data=None, query=None):
+def _phrase_viewset(user, method="get", data=None, query=None, db=None):
     from data.views import PhraseViewSet
     vs = PhraseViewSet()
-    vs.request = _phrase_request(user, method=method, data=data, query=query)
+    vs.request = _phrase_request(user, method=method, data=data, query=query, db=db)
     vs.kwargs = {}
     vs.format_kwarg = None
     vs.action = "search" if method == "post" else "list"
@@ -620,11 +650,11 @@ class QuestionHierarchyIdsTests(SimpleTestCase):
 
 class _FakeByAnswerPhraseDB:
     """
-    Fake ArangoDB for PhraseViewSet.by_answer. Mirrors the two AQL shapes
-    the real view issues: the phrase_overrides.include override path, and
-    the normal question_ids/category_ids-matching path — both then joining
-    to SamplePhrases by direct key lookup (DOCUMENT), same as the real
-    implementation.
+    Fake ArangoDB for PhraseViewSet.by_answer. Mirrors the two paths of
+    the real view's RESOLVE_PHRASES_AQL: the phrase_overrides.include
+    override path (bound @include), and the normal question_ids/
+    category_ids-matching path — both then joining to SamplePhrases by
+    direct key lookup (DOCUMENT), same as the real implementation.
     """
 
     def __init__(self, answer, question=None, master_phrases=None, sample_phrases=None):
@@ -632,6 +662,7 @@ class _FakeByAnswerPhraseDB:
         self.question = question
         self.master_phrases = {m["phrase_ref"]: m for m in (master_phrases or [])}
         self.sample_phrases = {sp["_key"]: sp for sp in (sample_phrases or [])}
+        self.phrase_queries = 0
 
     def collection(self, name):
         col = MagicMock()
@@ -650,47 +681,50 @@ class _FakeByAnswerPhraseDB:
             "conjugated": m.get("conjugated"),
         }
 
-    def aql_execute(self, query, bind_vars=None):
+    def _with_overrides(self, matched, bv):
+        # Both resolution paths drop SamplePhrases whose question_overrides
+        # exclude the category, then union in those whose include names it.
+        category_id = bv["category_id"]
+        exclude = set(bv.get("exclude") or [])
+        rows = {}
+        for sp in matched:
+            if sp and category_id not in (sp.get("question_overrides") or {}).get("exclude", []):
+                rows[sp["_key"]] = sp
+        for sp in self.sample_phrases.values():
+            if (
+                sp.get("sample") == bv["sample"]
+                and sp.get("phrase_ref") not in exclude
+                and category_id in (sp.get("question_overrides") or {}).get("include", [])
+            ):
+                rows[sp["_key"]] = sp
+        return [self._merge(sp, self.master_phrases.get(sp["phrase_ref"], {})) for sp in rows.values()]
+
+    def aql_execute(self, query, bind_vars=None, **kwargs):
         bv = bind_vars or {}
 
         if "ResearchQuestions" in query and "hierarchy_ids" in query:
             return iter([self.question["hierarchy_ids"]] if self.question else [])
 
-        # question_overrides.include/exclude live on SamplePhrases now; the
-        # fixtures here don't set them, so this always no-ops (empty override).
-        if "FOR sp IN SamplePhrases" in query and "question_overrides.include" in query:
-            return iter([])
-
-        if "FOR phrase_ref IN @include" in query:
-            include = bv["include"]
+        if bv.get("include"):
+            self.phrase_queries += 1
             exclude = set(bv.get("exclude") or [])
-            sample = bv["sample"]
-            rows = []
-            for ref in include:
-                if ref in exclude:
-                    continue
-                sp = self.sample_phrases.get(f"{sample}_{ref}")
-                if not sp:
-                    continue
-                m = self.master_phrases.get(ref, {})
-                rows.append(self._merge(sp, m))
-            return iter(rows)
+            matched = [
+                self.sample_phrases.get(f"{bv['sample']}_{ref}") for ref in bv["include"] if ref not in exclude
+            ]
+            return iter(self._with_overrides(matched, bv))
 
         if "FOR m IN MasterPhrases" in query and "@category_id IN" in query:
+            self.phrase_queries += 1
             category_id = bv["category_id"]
             hierarchy_ids = set(bv["hierarchy_ids"])
             exclude = set(bv.get("exclude") or [])
-            sample = bv["sample"]
-            rows = []
-            for m in self.master_phrases.values():
-                if m["phrase_ref"] in exclude:
-                    continue
-                if category_id in (m.get("question_ids") or []) or (set(m.get("category_ids") or []) & hierarchy_ids):
-                    sp = self.sample_phrases.get(f"{sample}_{m['phrase_ref']}")
-                    if not sp:
-                        continue
-                    rows.append(self._merge(sp, m))
-            return iter(rows)
+            matched = [
+                self.sample_phrases.get(f"{bv['sample']}_{m['phrase_ref']}")
+                for m in self.master_phrases.values()
+                if m["phrase_ref"] not in exclude
+                and (category_id in (m.get("question_ids") or []) or (set(m.get("category_ids") or []) & hierarchy_ids))
+            ]
+            return iter(self._with_overrides(matched, bv))
 
         return iter([])
 
@@ -701,8 +735,11 @@ class PhrasesByAnswerTests(SimpleTestCase):
         self.user = _mock_user()
 
     def _call(self, answer, question=None, master_phrases=None, sample_phrases=None):
-        from data.views import PhraseViewSet
         fake = _FakeByAnswerPhraseDB(answer, question=question, master_phrases=master_phrases, sample_phrases=sample_phrases)
+        return self._call_with(fake, answer)
+
+    def _call_with(self, fake, answer):
+        from data.views import PhraseViewSet
         mock_db = MagicMock()
         mock_db.aql.execute.side_effect = fake.aql_execute
         mock_db.collection.side_effect = fake.collection
@@ -770,6 +807,27 @@ class PhrasesByAnswerTests(SimpleTestCase):
         refs = [p["phrase_ref"] for p in response.data]
         self.assertEqual(refs, ["1"])
 
+    def test_sample_phrase_override_include_merged_in_same_query(self):
+        m1 = {"phrase_ref": "1", "english": "brother", "conjugated": False, "question_ids": [10], "category_ids": []}
+        m2 = {"phrase_ref": "2", "english": "sister", "conjugated": False, "question_ids": [], "category_ids": []}
+        sp1 = {"_key": "AL-001_1", "phrase_ref": "1", "phrase": "phrako", "sample": "AL-001", "has_recording": True}
+        sp2 = {"_key": "AL-001_2", "phrase_ref": "2", "phrase": "phen", "sample": "AL-001", "has_recording": True,
+               "question_overrides": {"include": [10]}}
+        answer = {"_key": "a1", "sample": "AL-001", "question_id": 10}
+        question = {"hierarchy_ids": [1, 10]}
+        fake = _FakeByAnswerPhraseDB(answer, question=question, master_phrases=[m1, m2], sample_phrases=[sp1, sp2])
+        response = self._call_with(fake, answer)
+        self.assertEqual(sorted(p["phrase_ref"] for p in response.data), ["1", "2"])
+        self.assertEqual(fake.phrase_queries, 1)
+
+    def test_sample_phrase_override_exclude_drops_match(self):
+        m1 = {"phrase_ref": "1", "english": "brother", "conjugated": False, "question_ids": [10], "category_ids": []}
+        sp1 = {"_key": "AL-001_1", "phrase_ref": "1", "phrase": "phrako", "sample": "AL-001", "has_recording": True,
+               "question_overrides": {"exclude": [10]}}
+        answer = {"_key": "a1", "sample": "AL-001", "question_id": 10}
+        response = self._call(answer, question={"hierarchy_ids": [1, 10]}, master_phrases=[m1], sample_phrases=[sp1])
+        self.assertEqual(list(response.data), [])
+
     def test_missing_answer_key_raises_400(self):
         from data.views import PhraseViewSet
         fake = _FakeByAnswerPhraseDB(answer=None)
@@ -795,9 +853,10 @@ class PhrasesByAnswerTests(SimpleTestCase):
 # ---------------------------------------------------------------------------
 
 class _FakeByAnswerTranscriptionDB:
-    """Mirrors the two AQL shapes TranscriptionViewSet.by_answer issues:
-    the transcription_overrides.include override path (direct key lookups,
-    still sample-scoped), and the normal question_ids/category_ids match."""
+    """Mirrors the two paths of TranscriptionViewSet.RESOLVE_TRANSCRIPTIONS_AQL:
+    the transcription_overrides.include override path (bound @include;
+    direct key lookups, still sample-scoped), and the normal
+    question_ids/category_ids match."""
 
     def __init__(self, answer, question=None, transcriptions=None):
         self.answer = answer
@@ -812,13 +871,13 @@ class _FakeByAnswerTranscriptionDB:
             col.get.side_effect = lambda key: None
         return col
 
-    def aql_execute(self, query, bind_vars=None):
+    def aql_execute(self, query, bind_vars=None, **kwargs):
         bv = bind_vars or {}
 
         if "ResearchQuestions" in query and "hierarchy_ids" in query:
             return iter([self.question["hierarchy_ids"]] if self.question else [])
 
-        if "FOR key IN @include" in query:
+        if bv.get("include"):
             include = bv["include"]
             exclude = set(bv.get("exclude") or [])
             sample = bv["sample"]
@@ -912,3 +971,1348 @@ class TranscriptionsByAnswerTests(SimpleTestCase):
         question = {"hierarchy_ids": [1, 10]}
         response = self._call(answer, question=question, transcriptions=[t1])
         self.assertEqual(list(response.data), [])
+
+
+# ---------------------------------------------------------------------------
+# Category tree cache (CategoryViewSet / CategorySerializer)
+# ---------------------------------------------------------------------------
+
+CATEGORIES = [
+    {"_key": "c1", "id": 1, "name": "Root", "parent_id": 0, "hierarchy": ["Root"]},
+    {"_key": "c2", "id": 2, "name": "Hidden A", "parent_id": 1, "hierarchy": ["Root", "Hidden A"]},
+    {"_key": "c4", "id": 4, "name": "Phonology", "parent_id": 1, "hierarchy": ["Root", "Phonology"]},
+    {"_key": "c5", "id": 5, "name": "Vowels", "parent_id": 4, "hierarchy": ["Root", "Phonology", "Vowels"], "is_leaf": True},
+]
+
+
+def _category_db(categories=CATEGORIES):
+    db = MagicMock()
+    db.aql.execute.side_effect = lambda q, bind_vars=None, **kw: iter(
+        sorted(categories, key=lambda c: c["id"]) if "FOR doc IN Categories" in q else []
+    )
+    return db
+
+
+class CategoryTreeCacheTests(SimpleTestCase):
+
+    def _viewset(self, db, query=None):
+        from data.views import CategoryViewSet
+        raw = RequestFactory().get("/categories/", query or {})
+        req = Request(raw)
+        req.user = _mock_user()
+        req.arangodb = db
+        req.arango_error = None
+        vs = CategoryViewSet()
+        vs.request = req
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        return vs, req
+
+    def test_list_children_uses_one_query(self):
+        db = _category_db()
+        vs, req = self._viewset(db, {"parent_id": "1"})
+        response = vs.list(req)
+        self.assertEqual([c["id"] for c in response.data], [4])  # 2 is excluded
+        self.assertTrue(response.data[0]["has_children"])
+        self.assertIn("drill", response.data[0])
+        self.assertEqual(db.aql.execute.call_count, 1)
+
+    def test_leaf_has_no_children_or_drill(self):
+        vs, req = self._viewset(_category_db(), {"parent_id": "4"})
+        response = vs.list(req)
+        self.assertFalse(response.data[0]["has_children"])
+        self.assertNotIn("drill", response.data[0])
+
+    def test_retrieve_by_id_or_key(self):
+        db = _category_db()
+        vs, req = self._viewset(db)
+        self.assertEqual(vs.retrieve(req, pk="5").data["name"], "Vowels")
+        self.assertEqual(vs.retrieve(req, pk="c5").data["name"], "Vowels")
+
+    def test_retrieve_missing_raises_404(self):
+        from rest_framework.exceptions import NotFound
+        vs, req = self._viewset(_category_db())
+        with self.assertRaises(NotFound):
+            vs.retrieve(req, pk="999")
+
+    def test_batch_resolves_from_cache(self):
+        db = _category_db()
+        vs, req = self._viewset(db, {"ids": "5,4,999"})
+        response = vs.batch(req)
+        self.assertEqual([c["id"] for c in response.data], [5, 4])
+        self.assertEqual(db.aql.execute.call_count, 1)
+
+
+class ParseHierarchyTests(SimpleTestCase):
+
+    def setUp(self):
+        from data.models import parse_hierarchy
+        self.parse = parse_hierarchy
+
+    def test_native_list_passes_through(self):
+        value = ["Root", "Phonology"]
+        self.assertIs(self.parse(value), value)
+
+    def test_python_repr_string(self):
+        self.assertEqual(self.parse("['Root', 'Phonology']"), ["Root", "Phonology"])
+
+    def test_json_string(self):
+        self.assertEqual(self.parse('["Root", "Phonology"]'), ["Root", "Phonology"])
+
+    def test_never_evaluates_code(self):
+        self.assertEqual(self.parse("__import__('os').getcwd()"), [])
+
+    def test_non_list_and_missing_values(self):
+        self.assertEqual(self.parse("'Root'"), [])
+        self.assertEqual(self.parse(None), [])
+
+    def test_malformed_literals_fall_back_to_empty(self):
+        self.assertEqual(self.parse("{[1]: 2}"), [])
+        self.assertEqual(self.parse("[" * 100000), [])
+        self.assertEqual(self.parse("(" * 100000 + ")" * 100000), [])
+
+
+class NormalizeCategoryHierarchyTests(SimpleTestCase):
+
+    def _run(self, write_results, stderr=None):
+        from django.core.management import call_command
+        db = MagicMock()
+        db.aql.execute.return_value = iter([
+            {"_key": "c1", "hierarchy": "['Root']"},
+            {"_key": "c4", "hierarchy": "['Root', 'Phonology']"},
+        ])
+        db.collection.return_value.update_many.return_value = write_results
+        with patch("data.models.Category.db", return_value=db):
+            call_command("normalize_category_hierarchy", stdout=io.StringIO(), stderr=stderr or io.StringIO())
+        return db
+
+    def test_rewrites_strings_as_arrays(self):
+        db = self._run([{"_key": "c1"}, {"_key": "c4"}])
+        docs = db.collection.return_value.update_many.call_args.args[0]
+        self.assertEqual(docs[1], {"_key": "c4", "hierarchy": ["Root", "Phonology"]})
+
+    def test_failed_writes_are_reported_and_exit_non_zero(self):
+        from django.core.management.base import CommandError
+        stderr = io.StringIO()
+        with self.assertRaises(CommandError) as ctx:
+            self._run([{"_key": "c1"}, Exception("write-write conflict")], stderr=stderr)
+        self.assertIn("1 of 2", str(ctx.exception))
+        self.assertIn("c4: write-write conflict", stderr.getvalue())
+
+
+# ---------------------------------------------------------------------------
+# Category / research-question name search (CategorySearch view)
+# ---------------------------------------------------------------------------
+
+def _category_search_db(categories=CATEGORIES):
+    """Fake DB answering the CategorySearch query the way the bigram view
+    would: case-insensitive substring, prefix matches first, then id."""
+    db = _category_db(categories)
+    tree_side_effect = db.aql.execute.side_effect
+
+    def execute(query, bind_vars=None, **kwargs):
+        if "FOR doc IN CategorySearch" not in query:
+            return tree_side_effect(query, bind_vars, **kwargs)
+        needle = bind_vars["query"].lower()
+        hits = [c for c in categories if needle in c["name"].lower()]
+        if "doc.path" in query:
+            hits = [c for c in hits if c.get("path")]
+        hits.sort(key=lambda c: (not c["name"].lower().startswith(needle), c["id"]))
+        return iter(hits[:bind_vars["limit"]])
+
+    db.aql.execute.side_effect = execute
+    return db
+
+
+class CategorySearchTests(SimpleTestCase):
+
+    def _viewset(self, db, query, viewset_class=None):
+        from data.views import CategoryViewSet
+        raw = RequestFactory().get("/categories/search/", query)
+        req = Request(raw)
+        req.user = _mock_user()
+        req.arangodb = db
+        req.arango_error = None
+        vs = (viewset_class or CategoryViewSet)()
+        vs.request = req
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        return vs, req
+
+    def _search_calls(self, db):
+        return [c for c in db.aql.execute.call_args_list if "CategorySearch" in c.args[0]]
+
+    def test_uses_search_view_not_regex(self):
+        db = _category_search_db()
+        vs, req = self._viewset(db, {"q": "ow"})
+        response = vs.search(req)
+        self.assertEqual([c["name"] for c in response.data], ["Vowels"])
+        (call,) = self._search_calls(db)
+        self.assertNotIn("REGEX_TEST", call.args[0])
+        self.assertEqual(call.kwargs["bind_vars"]["collection"], "Categories")
+
+    def test_prefix_matches_rank_first(self):
+        categories = CATEGORIES + [
+            {"_key": "c6", "id": 6, "name": "Long vowels", "parent_id": 4, "hierarchy": []},
+            {"_key": "c7", "id": 7, "name": "Vowel length", "parent_id": 4, "hierarchy": []},
+        ]
+        vs, req = self._viewset(_category_search_db(categories), {"q": "vowel"})
+        response = vs.search(req)
+        self.assertEqual([c["id"] for c in response.data], [5, 7, 6])
+
+    def test_query_is_bound_literally(self):
+        db = _category_search_db()
+        vs, req = self._viewset(db, {"q": ".*("})
+        self.assertEqual(vs.search(req).data, [])
+        (call,) = self._search_calls(db)
+        self.assertEqual(call.kwargs["bind_vars"]["query"], ".*(")
+
+    def test_limit_is_capped(self):
+        db = _category_search_db()
+        vs, req = self._viewset(db, {"q": "ow", "limit": "100000"})
+        vs.search(req)
+        (call,) = self._search_calls(db)
+        self.assertEqual(call.kwargs["bind_vars"]["limit"], vs.MAX_SEARCH_LIMIT)
+
+    def test_search_views_without_query_uses_tree(self):
+        categories = [dict(c) for c in CATEGORIES]
+        categories[3]["path"] = "phonology/vowels"
+        db = _category_search_db(categories)
+        vs, req = self._viewset(db, {})
+        response = vs.search_views(req)
+        self.assertEqual([c["path"] for c in response.data], ["phonology/vowels"])
+        self.assertEqual(self._search_calls(db), [])
+
+    def test_research_question_search_uses_view(self):
+        from data.views import ResearchQuestionViewSet
+        db = _category_search_db()
+        vs, req = self._viewset(db, {"q": "pho"}, ResearchQuestionViewSet)
+        vs.search(req)
+        (call,) = self._search_calls(db)
+        self.assertEqual(call.kwargs["bind_vars"]["collection"], "ResearchQuestions")
+        self.assertEqual(call.kwargs["bind_vars"]["limit"], 50)
+
+
+# ---------------------------------------------------------------------------
+# Cached sample visibility (data.caches.SampleIndex)
+# ---------------------------------------------------------------------------
+
+class SampleIndexCacheTests(SimpleTestCase):
+
+    def _search(self, vs, data):
+        vs.request.data = data
+        return vs.search(vs.request)
+
+    def test_visibility_loaded_once_per_db(self):
+        fake = _FakePhraseDB()
+        from data.views import PhraseViewSet
+        vs = PhraseViewSet()
+        vs.request = _phrase_request(_mock_user(), method="post", db=fake)
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        self._search(vs, {"query": "brother", "field": "english"})
+        self._search(vs, {"query": "sister", "field": "english"})
+        self.assertEqual(fake.sample_index_loads, 1)
+
+    def _search_binds(self, vs):
+        vs.search(vs.request)
+        binds = [c.kwargs["bind_vars"] for c in vs.request.arangodb.aql.execute.call_args_list
+                 if c.kwargs.get("bind_vars") and "query" in c.kwargs["bind_vars"]]
+        self.assertTrue(binds)
+        return binds
+
+    def test_only_the_hidden_flag_is_sent(self):
+        vs = _phrase_viewset(_mock_user(), method="post", data={"query": "brother", "field": "english"})
+        for bind in self._search_binds(vs):
+            self.assertIs(bind["show_hidden_samples"], False)
+            self.assertNotIn("sample_refs", bind)
+            self.assertNotIn("visible_samples", bind)
+
+    def test_admin_search_sees_every_known_sample(self):
+        vs = _phrase_viewset(_mock_user(is_admin=True, show_hidden=True), method="post",
+                             data={"query": "brother", "field": "english"})
+        for bind in self._search_binds(vs):
+            self.assertIs(bind["show_hidden_samples"], True)
+
+    def test_rows_of_unknown_samples_are_dropped(self):
+        orphan = {"_key": "GONE-01_80a", "phrase_ref": "80a", "phrase_ref_sort": "000080a",
+                  "phrase": "phrako", "sample": "GONE-01", "has_recording": False}
+        fake = _FakePhraseDB(sample_phrases=SAMPLE_PHRASES + [orphan])
+        for user in (_mock_user(), _mock_user(is_admin=True, show_hidden=True)):
+            vs = _phrase_viewset(user, method="post", data={"phrase_ref": "80a"}, db=fake)
+            samples = [p["sample"] for p in vs.search(vs.request).data["results"]]
+            self.assertNotIn("GONE-01", samples)
+
+    def test_invalidate_forces_reload(self):
+        from data.caches import get_sample_index, sample_index_cache
+        db = MagicMock()
+        db.aql.execute.side_effect = lambda q, bind_vars=None, **kw: iter(
+            [{"ref": "AL-001", "visible": "Yes", "label": "A"}] if "visible: s.visible" in q else []
+        )
+        get_sample_index(db)
+        sample_index_cache.invalidate()
+        get_sample_index(db)
+        self.assertEqual(db.aql.execute.call_count, 2)
+        self.assertTrue(get_sample_index(db).is_visible("AL-001"))
+
+    def test_labels_added_from_cache(self):
+        vs = _phrase_viewset(_mock_user(), method="post", data={"query": "sister", "field": "english"})
+        response = vs.search(vs.request)
+        self.assertEqual({p["sample_label"] for p in response.data["results"]}, {"Label AL-001", "Label AL-002"})
+        for call in vs.request.arangodb.aql.execute.call_args_list:
+            if "candidate_keys" in call.args[0]:
+                self.assertNotIn("FOR s IN Samples", call.args[0])
+
+    def test_export_rows_carry_labels(self):
+        vs = _phrase_viewset(_mock_user(), method="post", data={"phrase_ref": "80a"})
+        response = vs.export(vs.request)
+        self.assertEqual([r["sample_label"] for r in response.data], ["Label AL-001", "Label AL-002"])
+
+
+class SearchCandidateCacheTests(SimpleTestCase):
+
+    def _viewset(self, fake):
+        from data.views import PhraseViewSet
+        vs = PhraseViewSet()
+        vs.request = _phrase_request(_mock_user(), method="post", db=fake)
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        return vs
+
+    def _search(self, vs, **data):
+        vs.request.data = {"query": "ph", "field": "romani", "page_size": 2, **data}
+        return vs.search(vs.request).data
+
+    def test_count_and_page_in_one_query(self):
+        fake = _FakePhraseDB()
+        data = self._search(self._viewset(fake))
+        self.assertEqual(data["count"], 4)  # hidden sample excluded
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(fake.search_queries, 1)
+
+    def test_paging_reuses_candidate_list(self):
+        fake = _FakePhraseDB()
+        vs = self._viewset(fake)
+        first = self._search(vs, page=1)
+        second = self._search(vs, page=2)
+        self.assertEqual(fake.search_queries, 1)
+        self.assertEqual(second["count"], 4)
+        keys = [p["_key"] for p in first["results"] + second["results"]]
+        self.assertEqual(len(set(keys)), 4)
+
+    def test_different_query_is_not_reused(self):
+        fake = _FakePhraseDB()
+        vs = self._viewset(fake)
+        self._search(vs)
+        self._search(vs, field="both")
+        self.assertEqual(fake.search_queries, 2)
+
+    @override_settings(ARANGO_CACHE_CHECK_INTERVAL=0)
+    def test_write_misses_cached_candidate_list(self):
+        fake = _FakePhraseDB()
+        vs = self._viewset(fake)
+        self._search(vs, page=1)
+        fake.revisions["SamplePhrases"] = "2"
+        self._search(vs, page=2)
+        self.assertEqual(fake.search_queries, 2)
+
+    def test_vanished_document_dropped_from_cached_page(self):
+        fake = _FakePhraseDB(sample_phrases=list(SAMPLE_PHRASES))
+        vs = self._viewset(fake)
+        self._search(vs, page=1)
+        # Deleted in a write the revision check hasn't seen yet
+        del fake.sample_phrases["AL-002_81"]
+        second = self._search(vs, page=2)
+        self.assertEqual(fake.search_queries, 1)
+        self.assertEqual([p["_key"] for p in second["results"]], ["AL-001_81"])
+        self.assertIn("FILTER sp != null", vs.request.arangodb.aql.execute.call_args.args[0])
+
+
+# ---------------------------------------------------------------------------
+# Keyset (cursor) pagination for search
+# ---------------------------------------------------------------------------
+
+class PhraseRefSortKeyTests(SimpleTestCase):
+
+    def test_zero_pads_leading_number(self):
+        self.assertEqual(phrase_ref_sort_key("80a"), "000080a")
+        self.assertEqual(phrase_ref_sort_key(100), "000100")
+
+    def test_sorts_naturally(self):
+        refs = ["100", "9", "80b", "80a", "80"]
+        self.assertEqual(sorted(refs, key=phrase_ref_sort_key), ["9", "80", "80a", "80b", "100"])
+
+    def test_no_leading_number_sorts_first(self):
+        self.assertEqual(phrase_ref_sort_key("x1"), "000000x1")
+
+
+class BackfillPhraseRefSortTests(SimpleTestCase):
+
+    def test_failed_writes_are_reported_and_exit_non_zero(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        db = MagicMock()
+        db.aql.execute.side_effect = lambda query, **kw: iter([
+            {"_key": "80a", "phrase_ref": "80a", "phrase_ref_sort": None},
+            {"_key": "81", "phrase_ref": "81", "phrase_ref_sort": None},
+        ])
+        db.collection.return_value.update_many.return_value = [{"_key": "80a"}, Exception("write-write conflict")]
+        stderr = io.StringIO()
+        with patch("data.models.MasterPhrase.db", return_value=db):
+            with self.assertRaises(CommandError) as ctx:
+                call_command("backfill_phrase_ref_sort", stdout=io.StringIO(), stderr=stderr)
+        # A failure in MasterPhrases doesn't stop SamplePhrases being written
+        self.assertEqual(db.collection.return_value.update_many.call_count, 2)
+        self.assertIn("2 document(s)", str(ctx.exception))
+        self.assertIn("MasterPhrases/81: write-write conflict", stderr.getvalue())
+
+
+class SortPhrasesTests(SimpleTestCase):
+
+    def test_natural_order_without_stored_key(self):
+        from data.views import sort_phrases
+        rows = [{"phrase_ref": r} for r in ["100", "80a", "9", "80"]]
+        self.assertEqual([r["phrase_ref"] for r in sort_phrases(rows)], ["9", "80", "80a", "100"])
+
+    def test_uses_stored_key(self):
+        from data.views import sort_phrases
+        rows = [{"phrase_ref": "1", "phrase_ref_sort": "z"}, {"phrase_ref": "2", "phrase_ref_sort": "a"}]
+        self.assertEqual([r["phrase_ref"] for r in sort_phrases(rows)], ["2", "1"])
+
+    def test_patch_fills_in_missing_sort_key(self):
+        from data.views import PhraseViewSet
+        db = MagicMock()
+        db.collection.return_value.get.return_value = {"_key": "AL-001_80a", "phrase_ref": "80a", "sample": "AL-001"}
+        req = MagicMock()
+        req.arangodb = db
+        req.data = {"phrase": "phrako"}
+        PhraseViewSet().partial_update(req, pk="AL-001_80a")
+        update = db.collection.return_value.update.call_args.args[0]
+        self.assertEqual(update["phrase_ref_sort"], "000080a")
+
+
+class CursorHelperTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        from roma.pagination import decode_cursor, encode_cursor
+        token = encode_cursor(["000080a", "AL-001"])
+        self.assertEqual(decode_cursor(token, 2), ["000080a", "AL-001"])
+
+    def test_malformed_cursor_raises(self):
+        from roma.pagination import decode_cursor, encode_cursor
+        with self.assertRaises(ValidationError):
+            decode_cursor("not a cursor!", 2)
+        with self.assertRaises(ValidationError):
+            decode_cursor(encode_cursor(["a"]), 2)
+
+    def test_keyset_filter(self):
+        from roma.pagination import keyset_filter
+        self.assertEqual(
+            keyset_filter("t", ("sample", "segment_no")),
+            "FILTER t.sample > @after_0 OR (t.sample == @after_0 AND t.segment_no > @after_1)",
+        )
+
+
+class PhraseSearchCursorTests(SimpleTestCase):
+
+    def _search(self, **data):
+        vs = _phrase_viewset(_mock_user(), method="post",
+                             data={"query": "ph", "field": "romani", "page_size": 2, **data})
+        return vs.search(vs.request).data
+
+    def test_cursor_walks_all_results_in_order(self):
+        first = self._search()
+        self.assertIsNotNone(first["next_cursor"])
+        second = self._search(cursor=first["next_cursor"])
+        self.assertNotIn("count", second)
+        keys = [p["_key"] for p in first["results"] + second["results"]]
+        self.assertEqual(keys, ["AL-001_80a", "AL-002_80a", "AL-001_81", "AL-002_81"])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_cursor_uses_stored_sort_key(self):
+        from roma.pagination import decode_cursor
+        first = self._search()
+        self.assertEqual(decode_cursor(first["next_cursor"], 2), ["000080a", "AL-002"])
+
+    def _unbackfilled_search(self, **data):
+        unbackfilled = [{k: v for k, v in sp.items() if k != "phrase_ref_sort"} for sp in SAMPLE_PHRASES]
+        vs = _phrase_viewset(_mock_user(), method="post",
+                             data={"query": "ph", "field": "romani", "page_size": 2, **data},
+                             db=_FakePhraseDB(sample_phrases=unbackfilled))
+        return vs.search(vs.request).data
+
+    def test_missing_sort_key_fails_cursor_requests(self):
+        from rest_framework.exceptions import APIException
+
+        from roma.pagination import encode_cursor
+        with self.assertRaises(APIException) as ctx:
+            self._unbackfilled_search(cursor=encode_cursor(["", "AL-000"]))
+        self.assertIn("backfill_phrase_ref_sort", str(ctx.exception.detail))
+
+    def test_missing_sort_key_keeps_page_numbers_working(self):
+        first = self._unbackfilled_search()
+        self.assertEqual(first["count"], 4)
+        self.assertIsNone(first["next_cursor"])
+        second = self._unbackfilled_search(page=2)
+        self.assertEqual(len(second["results"]), 2)
+
+    def test_page_numbers_still_work(self):
+        second = self._search(page=2)
+        self.assertEqual([p["_key"] for p in second["results"]], ["AL-001_81", "AL-002_81"])
+        self.assertIsNone(second["next_cursor"])
+
+
+# ---------------------------------------------------------------------------
+# Streaming exports (roma.export)
+# ---------------------------------------------------------------------------
+
+class StreamingExportTests(SimpleTestCase):
+
+    def _export(self, **data):
+        vs = _phrase_viewset(_mock_user(), method="post", data={"query": "brother", "field": "english", **data})
+        vs.request.accepted_renderer = None
+        return vs.export(vs.request)
+
+    def _body(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_default_is_plain_json_response(self):
+        response = self._export()
+        self.assertIsInstance(response.data, list)
+
+    def test_csv(self):
+        import csv as csv_module
+        response = self._export(export_format="csv")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="phrases.csv"', response["Content-Disposition"])
+        rows = list(csv_module.DictReader(io.StringIO(self._body(response))))
+        self.assertEqual([r["sample"] for r in rows], ["AL-001", "AL-002"])
+        self.assertEqual(rows[0]["sample_label"], "Label AL-001")
+
+    def test_ndjson(self):
+        lines = self._body(self._export(export_format="ndjson")).splitlines()
+        self.assertEqual([json.loads(line)["sample"] for line in lines], ["AL-001", "AL-002"])
+
+    def test_json_array(self):
+        rows = json.loads(self._body(self._export(export_format="json")))
+        self.assertEqual(len(rows), 2)
+
+    def test_cursor_is_streamed_in_batches(self):
+        vs = _phrase_viewset(_mock_user(), method="post",
+                             data={"query": "brother", "field": "english", "export_format": "ndjson"})
+        vs.request.accepted_renderer = None
+        self._body(vs.export(vs.request))
+        export_call = next(c for c in vs.request.arangodb.aql.execute.call_args_list if "candidate_keys" in c.args[0])
+        self.assertTrue(export_call.kwargs["stream"])
+        self.assertIn("batch_size", export_call.kwargs)
+
+    def test_accept_header_selects_format(self):
+        from roma.export import CSVRenderer, export_format
+        request = MagicMock()
+        request.data = {}
+        request.query_params = {}
+        request.accepted_renderer = CSVRenderer()
+        self.assertEqual(export_format(request), "csv")
+
+
+# ---------------------------------------------------------------------------
+# GET /related/ (single-round-trip cell click)
+# ---------------------------------------------------------------------------
+
+class RelatedContentTests(SimpleTestCase):
+
+    def setUp(self):
+        caches["responses"].clear()
+
+    def _call(self, params, related, revision="r1"):
+        from data.views import RelatedContentViewSet
+        mock_db = MagicMock()
+        mock_db.collection.return_value.revision.return_value = revision
+        mock_db.aql.execute.return_value = iter([related])
+        raw = RequestFactory().get("/related/", params)
+        req = Request(raw)
+        req.user = _mock_user()
+        req.arangodb = mock_db
+        req.arango_error = None
+        vs = RelatedContentViewSet()
+        vs.request = req
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        return vs.list(req), mock_db
+
+    def test_one_query_returns_merged_content(self):
+        related = {
+            "phrases": [
+                {"_key": "AL-001_10", "phrase_ref": "10", "phrase_ref_sort": "000010", "sample": "AL-001", "phrase": "b"},
+                {"_key": "AL-001_2", "phrase_ref": "2", "phrase_ref_sort": "000002", "sample": "AL-001", "phrase": "a"},
+            ],
+            "transcriptions": [
+                {"_key": "t2", "sample": "AL-001", "segment_no": 2},
+                {"_key": "t1", "sample": "AL-001", "segment_no": 1},
+            ],
+        }
+        response, db = self._call({"category_id": "10", "sample": "AL-001"}, related)
+        self.assertEqual(db.aql.execute.call_count, 1)
+        db.collection.return_value.get.assert_not_called()
+        self.assertEqual([p["phrase_ref"] for p in response.data["phrases"]], ["2", "10"])
+        self.assertEqual([t["segment_no"] for t in response.data["transcriptions"]], [1, 2])
+
+    def test_query_shares_the_by_answer_resolution(self):
+        from data.views import (
+            PhraseViewSet,
+            RelatedContentViewSet,
+            TranscriptionViewSet,
+        )
+        self.assertIn(PhraseViewSet.RESOLVE_PHRASES_AQL, RelatedContentViewSet.RELATED_AQL)
+        self.assertIn(TranscriptionViewSet.RESOLVE_TRANSCRIPTIONS_AQL, RelatedContentViewSet.RELATED_AQL)
+
+    def test_answer_key_is_resolved_in_query(self):
+        _, db = self._call({"category_id": "10", "sample": "AL-001", "answer_key": "a1"}, {})
+        bind_vars = db.aql.execute.call_args.kwargs["bind_vars"]
+        self.assertEqual(bind_vars, {"answer_key": "a1", "category_id": 10, "sample": "AL-001"})
+
+    def test_no_answer_key_binds_null(self):
+        response, db = self._call({"category_id": "10", "sample": "AL-001"}, {})
+        self.assertIsNone(db.aql.execute.call_args.kwargs["bind_vars"]["answer_key"])
+        self.assertEqual(response.data, {"phrases": [], "transcriptions": []})
+
+    def test_category_id_must_be_integer(self):
+        with self.assertRaises(ValidationError):
+            self._call({"category_id": "x", "sample": "AL-001"}, {})
+
+    def test_repeat_request_served_from_cache(self):
+        params = {"category_id": "10", "sample": "AL-001"}
+        related = {"phrases": [], "transcriptions": [{"_key": "t1", "sample": "AL-001", "segment_no": 1}]}
+        self._call(params, related)
+        response, db = self._call(params, {})
+        db.aql.execute.assert_not_called()
+        self.assertEqual(len(response.data["transcriptions"]), 1)
+
+    def test_answer_key_is_part_of_cache_key(self):
+        self._call({"category_id": "10", "sample": "AL-001"}, {})
+        _, db = self._call({"category_id": "10", "sample": "AL-001", "answer_key": "a1"}, {})
+        self.assertEqual(db.aql.execute.call_count, 1)
+
+    def test_patch_invalidates_cached_responses(self):
+        from data.views import TranscriptionViewSet
+        params = {"category_id": "10", "sample": "AL-001"}
+        self._call(params, {})
+
+        mock_db = MagicMock()
+        mock_db.collection.return_value.get.return_value = {"_key": "t1", "sample": "AL-001", "segment_no": 1}
+        req = Request(RequestFactory().patch("/transcriptions/t1/"))
+        req._full_data = {"transcription": "new"}
+        req.user = _mock_user()
+        req.arangodb = mock_db
+        vs = TranscriptionViewSet()
+        vs.request = req
+        vs.kwargs = {"pk": "t1"}
+        vs.format_kwarg = None
+        vs.partial_update(req, pk="t1")
+
+        _, db = self._call(params, {}, revision="r2")
+        self.assertEqual(db.aql.execute.call_count, 1)
+
+    def test_write_from_another_process_misses_cache(self):
+        params = {"category_id": "10", "sample": "AL-001"}
+        self._call(params, {})
+        _, db = self._call(params, {}, revision="r2")
+        self.assertEqual(db.aql.execute.call_count, 1)
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches["responses"].clear()
+
+    def _db(self, revision="r1"):
+        db = MagicMock()
+        db.collection.return_value.revision.return_value = revision
+        return db
+
+    def test_get_set_roundtrip(self):
+        from roma.cache import ResponseCache
+        cache = ResponseCache("test", ["A"])
+        db = self._db()
+        self.assertIsNone(cache.get(db, ("a", 1)))
+        cache.set(db, ("a", 1), [1, 2])
+        self.assertEqual(cache.get(db, ("a", 1)), [1, 2])
+        self.assertIsNone(cache.get(db, ("a", 2)))
+
+    def test_revision_change_misses_entries(self):
+        from roma.cache import ResponseCache
+        cache = ResponseCache("test", ["A"], check_interval=0)
+        cache.set(self._db("r1"), ("a", 1), "x")
+        self.assertIsNone(cache.get(self._db("r2"), ("a", 1)))
+        self.assertEqual(cache.get(self._db("r1"), ("a", 1)), "x")
+
+    def test_revisions_rechecked_after_interval_only(self):
+        from roma.cache import ResponseCache
+        cache = ResponseCache("test", ["A"], check_interval=60)
+        db = self._db("r1")
+        cache.set(db, ("a", 1), "x")
+        # A write from another process: seen after the interval, or at
+        # once after an in-process invalidate()
+        db.collection.return_value.revision.return_value = "r2"
+        self.assertEqual(cache.get(db, ("a", 1)), "x")
+        cache.invalidate()
+        self.assertIsNone(cache.get(db, ("a", 1)))
+
+
+# ---------------------------------------------------------------------------
+# ETag / conditional GET (roma.views.ArangoModelViewSet)
+# ---------------------------------------------------------------------------
+
+class ConditionalGetTests(SimpleTestCase):
+
+    def _db(self, revision="r1"):
+        db = MagicMock()
+        db.collection.return_value.revision.return_value = revision
+        db.aql.execute.side_effect = lambda *a, **k: iter([{"phrase_ref": "1", "english": "brother"}])
+        return db
+
+    def _get(self, db, **headers):
+        from data.views import PhraseViewSet
+        raw = RequestFactory().get("/phrases/list/", **headers)
+        raw.arangodb = db
+        raw.arango_error = None
+        return PhraseViewSet.as_view({"get": "phrase_list"})(raw)
+
+    def test_response_carries_etag(self):
+        db = self._db()
+        response = self._get(db)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        db.collection.assert_called_with("MasterPhrases")
+
+    def test_matching_if_none_match_returns_304_without_querying(self):
+        etag = self._get(self._db())["ETag"]
+        db = self._db()
+        response = self._get(db, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        db.aql.execute.assert_not_called()
+
+    def test_weak_comparison(self):
+        etag = self._get(self._db())["ETag"]
+        response = self._get(self._db(), HTTP_IF_NONE_MATCH=etag[2:])
+        self.assertEqual(response.status_code, 304)
+
+    def test_collection_write_changes_etag(self):
+        etag = self._get(self._db("r1"))["ETag"]
+        response = self._get(self._db("r2"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_user_is_part_of_etag(self):
+        from data.views import PhraseViewSet
+        db = self._db()
+        vs = PhraseViewSet()
+        vs.action = "phrase_list"
+        request = MagicMock(arangodb=db)
+        request.get_full_path.return_value = "/phrases/list/"
+        request.user = AnonymousUser()
+        anonymous = vs.get_etag(request)
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        self.assertNotEqual(vs.get_etag(request), anonymous)
+
+    def test_hidden_samples_toggle_changes_sample_etag(self):
+        from data.views import SampleViewSet
+        vs = SampleViewSet()
+        vs.action = "list"
+        request = MagicMock(arangodb=self._db())
+        request.get_full_path.return_value = "/samples/"
+        request.user = _mock_user(is_admin=True, show_hidden=False)
+        visible_only = vs.get_etag(request)
+        request.user.show_hidden_samples = True
+        self.assertNotEqual(vs.get_etag(request), visible_only)
+
+
+# ---------------------------------------------------------------------------
+# Database-side ?page= pagination (ArangoModelViewSet.get_list_query)
+# ---------------------------------------------------------------------------
+
+class _FakeCursor:
+    def __init__(self, rows, full_count):
+        self._rows = rows
+        self._full_count = full_count
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def statistics(self):
+        return {"fullCount": self._full_count}
+
+
+class DatabasePaginationTests(SimpleTestCase):
+
+    def _list(self, viewset_class, params, rows, full_count):
+        db = MagicMock()
+        db.aql.execute.return_value = _FakeCursor(rows, full_count)
+        raw = RequestFactory().get("/list/", params)
+        req = Request(raw)
+        req.user = AnonymousUser()
+        req.arangodb = db
+        vs = viewset_class()
+        vs.request = req
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        return vs.list(req), db
+
+    def test_limit_and_full_count_pushed_into_aql(self):
+        from data.views import TranscriptionViewSet
+        rows = [{"_key": f"t{i}", "sample": "AL-001", "segment_no": i} for i in range(51, 101)]
+        response, db = self._list(TranscriptionViewSet, {"sample": "AL-001", "page": "2"}, rows, 120)
+        query = db.aql.execute.call_args.args[0]
+        kwargs = db.aql.execute.call_args.kwargs
+        self.assertIn("LIMIT @offset, @count", query)
+        self.assertEqual(kwargs["bind_vars"], {"sample": "AL-001", "offset": 50, "count": 50})
+        self.assertTrue(kwargs["full_count"])
+        self.assertEqual(response.data["count"], 120)
+        self.assertEqual(len(response.data["results"]), 50)
+        self.assertIn("page=3", response.data["next"])
+        self.assertIn("previous", response.data)
+
+    def test_page_size_param(self):
+        from data.views import PhraseViewSet
+        _, db = self._list(PhraseViewSet, {"sample": "AL-001", "page": "1", "page_size": "10"}, [], 0)
+        self.assertEqual(db.aql.execute.call_args.kwargs["bind_vars"]["count"], 10)
+
+    def test_page_past_the_end_is_404(self):
+        from rest_framework.exceptions import NotFound
+
+        from data.views import TranscriptionViewSet
+        with self.assertRaises(NotFound):
+            self._list(TranscriptionViewSet, {"sample": "AL-001", "page": "9"}, [], 120)
+
+    def test_hidden_samples_filtered_in_query(self):
+        from data.views import SampleViewSet
+        _, db = self._list(SampleViewSet, {"page": "1"}, [], 0)
+        self.assertIn('FILTER s.visible == "Yes"', db.aql.execute.call_args.args[0])
+
+    def test_stock_queryset_pages_whole_collection(self):
+        from data.views import SourceViewSet
+        response, db = self._list(SourceViewSet, {"page": "1"}, [{"_key": "s1"}], 1)
+        self.assertIn("FOR doc IN Sources SORT doc._key", db.aql.execute.call_args.args[0])
+        self.assertEqual(response.data["results"][0]["_key"], "s1")
+
+    def test_without_page_param_returns_plain_list(self):
+        from data.views import TranscriptionViewSet
+        response, db = self._list(TranscriptionViewSet, {"sample": "AL-001"}, [{"_key": "t1", "segment_no": 1}], 1)
+        self.assertNotIn("LIMIT @offset", db.aql.execute.call_args.args[0])
+        self.assertEqual(len(response.data), 1)
+
+
+# ---------------------------------------------------------------------------
+# ?fields= / ?exclude= projection (roma.projection)
+# ---------------------------------------------------------------------------
+
+class ProjectionTests(SimpleTestCase):
+
+    def _request(self, query=None, data=None):
+        factory = RequestFactory()
+        if data is not None:
+            raw = factory.post("/", data, content_type="application/json")
+        else:
+            raw = factory.get("/", query or {})
+        from rest_framework.parsers import JSONParser
+        return Request(raw, parsers=[JSONParser()])
+
+    def test_no_projection(self):
+        from roma.projection import project
+        self.assertEqual(project("doc", self._request()), ("doc", {}))
+
+    def test_fields_become_keep_with_required(self):
+        from roma.projection import project
+        expr, bind = project("doc", self._request({"fields": "english,phrase"}), required=("sample",))
+        self.assertEqual(expr, "KEEP(doc, @projection_fields)")
+        self.assertEqual(bind, {"projection_fields": ["english", "phrase", "sample"]})
+
+    def test_exclude_becomes_unset_never_dropping_required(self):
+        from roma.projection import project
+        expr, bind = project("doc", self._request(data={"exclude": ["gloss", "sample"]}), required=("sample",))
+        self.assertEqual(expr, "UNSET(doc, @projection_exclude)")
+        self.assertEqual(bind, {"projection_exclude": ["gloss"]})
+
+    def test_both_or_invalid_rejected(self):
+        from roma.projection import project
+        with self.assertRaises(ValidationError):
+            project("doc", self._request({"fields": "a", "exclude": "b"}))
+        with self.assertRaises(ValidationError):
+            project("doc", self._request({"fields": "a.b"}))
+
+    def test_phrase_search_projects_rows_in_query(self):
+        vs = _phrase_viewset(_mock_user(), method="post",
+                             data={"query": "brother", "field": "english", "fields": "english"})
+        response = vs.search(vs.request)
+        self.assertEqual(response.status_code, 200)
+        search_call = next(c for c in vs.request.arangodb.aql.execute.call_args_list
+                           if "projection_fields" in (c.kwargs.get("bind_vars") or {}))
+        self.assertIn("KEEP(phrase, @projection_fields)", search_call.args[0])
+        self.assertEqual(search_call.kwargs["bind_vars"]["projection_fields"], ["english", "phrase_ref", "phrase_ref_sort", "sample"])
+
+    def test_sample_list_drops_unrequested_declared_fields(self):
+        from data.views import SampleViewSet
+        db = MagicMock()
+        db.aql.execute.return_value = iter([{"sample_ref": "AL-001", "dialect_name": "A"}])
+        raw = RequestFactory().get("/samples/", {"fields": "dialect_name"})
+        req = Request(raw)
+        req.user = AnonymousUser()
+        req.arangodb = db
+        vs = SampleViewSet()
+        vs.request = req
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        response = vs.list(req)
+        self.assertIn("KEEP(s, @projection_fields)", db.aql.execute.call_args.args[0])
+        self.assertEqual(response.data, [{"sample_ref": "AL-001", "dialect_name": "A"}])
+
+
+# ---------------------------------------------------------------------------
+# Pass-through list serializers (roma.serializers.PassThroughSerializer)
+# ---------------------------------------------------------------------------
+
+class PassThroughSerializerTests(SimpleTestCase):
+
+    def test_many_uses_fast_list_serializer(self):
+        from data.serializers import TranscriptionSerializer
+        from roma.serializers import PassThroughListSerializer
+        rows = [{"_key": "t1", "_id": "Transcriptions/t1", "_rev": "x", "segment_no": 1}]
+        serializer = TranscriptionSerializer(rows, many=True, context={})
+        self.assertIsInstance(serializer, PassThroughListSerializer)
+        self.assertEqual(serializer.data, [{"_key": "t1", "segment_no": 1}])
+
+    def test_subclass_exclude_fields(self):
+        from data.serializers import ResearchQuestionSerializer
+        rows = [{"_key": "1", "_id": "x", "_rev": "y", "id": 1, "name": "Q", "tag_ids": [1], "is_leaf": True}]
+        self.assertEqual(ResearchQuestionSerializer(rows, many=True).data, [{"_key": "1", "id": 1, "name": "Q"}])
+
+    def test_single_instance_unchanged(self):
+        from data.serializers import PhraseSerializer
+        row = {"_key": "AL-001_1", "_id": "SamplePhrases/AL-001_1", "_rev": "x", "phrase_ref": "1"}
+        self.assertEqual(PhraseSerializer(row).data, {"_key": "AL-001_1", "phrase_ref": "1"})
+
+    def test_model_instances_fall_back_to_fields(self):
+        from data.models import Answer
+        from data.serializers import AnswerSerializer
+        data = AnswerSerializer([Answer(_key="a1")], many=True).data
+        self.assertEqual(data, [{"_key": "a1"}])
+
+
+# ---------------------------------------------------------------------------
+# orjson renderer / parser (roma.renderers)
+# ---------------------------------------------------------------------------
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_output_matches_json_renderer(self):
+        import datetime
+        import decimal
+        import uuid
+
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.utils.serializer_helpers import ReturnList
+
+        from roma.renderers import ORJSONRenderer
+        data = ReturnList([{
+            "sample": "AL-001",
+            "phrase": "ćhavo\u2028\u2029",
+            "created": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            "day": datetime.date(2024, 5, 1),
+            "score": decimal.Decimal("1.50"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "ids": {1, 2},
+            7: None,
+        }], serializer=None)
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_falls_back_to_json_renderer(self):
+        from roma.renderers import ORJSONRenderer
+        rendered = ORJSONRenderer().render({"a": 1}, "application/json; indent=2")
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_parser(self):
+        from rest_framework.exceptions import ParseError
+
+        from roma.renderers import ORJSONParser
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(b'{"query": "ph"}')), {"query": "ph"})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{"))
+
+
+class BulkWriteTests(SimpleTestCase):
+
+    def test_batches_and_reports_failed_documents(self):
+        from arango.exceptions import DocumentUpdateError
+
+        from roma.bulk import bulk_update
+        failure = DocumentUpdateError(MagicMock(error_message="conflict", status_code=409), MagicMock())
+        collection = MagicMock()
+        collection.update_many.side_effect = lambda docs, **kw: [
+            failure if d["_key"] == "k3" else {"_key": d["_key"]} for d in docs
+        ]
+        docs = [{"_key": f"k{i}", "phrase": "x"} for i in range(5)]
+        errors = bulk_update(collection, docs, batch_size=2)
+        self.assertEqual(collection.update_many.call_count, 3)
+        self.assertEqual(errors, [{"_key": "k3", "error": "conflict"}])
+
+    def test_silent_write_has_no_errors(self):
+        from roma.bulk import bulk_insert
+        collection = MagicMock()
+        collection.insert_many.return_value = True
+        self.assertEqual(bulk_insert(collection, [{"phrase": "x"}], silent=True), [])
+        collection.insert_many.assert_called_once_with([{"phrase": "x"}], silent=True)
+
+
+class SampleImportTests(SimpleTestCase):
+
+    def setUp(self):
+        import tempfile
+
+        from django.test import override_settings
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.upload_dir = tmp.name
+        settings_override = override_settings(IMPORT_UPLOAD_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _view(self, req):
+        from data.views import SampleViewSet
+        vs = SampleViewSet()
+        vs.request = req
+        vs.kwargs = {}
+        vs.format_kwarg = None
+        return vs
+
+    def _import_db(self):
+        def aql_execute(q, bind_vars=None, **kwargs):
+            if "FOR m IN MasterPhrases" in q:
+                return iter([{"phrase_ref": ref, "english": ""} for ref in ("1", "2", "3")])
+            if "RETURN {phrase_ref" in q:
+                return iter([
+                    {"phrase_ref": "1", "_key": "k1", "phrase": "old1", "english": "", "conjugated": None},
+                    {"phrase_ref": "2", "_key": "k2", "phrase": "old2", "english": "", "conjugated": None},
+                ])
+            return iter([])
+
+        db = MagicMock()
+        db.collection.return_value.find.return_value = iter([{"sample_ref": "AL-001"}])
+        db.collection.return_value.insert.return_value = {"_key": "b1"}
+        db.collection.return_value.insert_many.side_effect = lambda docs, **kw: [{} for _ in docs]
+        db.collection.return_value.update_many.side_effect = lambda docs, **kw: [{} for _ in docs]
+        db.aql.execute.side_effect = aql_execute
+        # Writes go through the stream transaction; let it share the fakes
+        db.begin_transaction.return_value = db
+        return db
+
+    def _import_request(self, csv_content, upgrade="true"):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from rest_framework.parsers import FormParser, MultiPartParser
+        csv_file = SimpleUploadedFile("s.csv", csv_content)
+        raw = RequestFactory().post("/samples/import/", {"sample_ref": "AL-001", "upgrade": upgrade, "file": csv_file})
+        req = Request(raw, parsers=[MultiPartParser(), FormParser()])
+        req.user = _mock_user(is_admin=True)
+        req.user.username = "admin"
+        req.arangodb = self._import_db()
+        return req
+
+    def _batch(self, csv_text, upgrade=True, encoding="utf-8"):
+        import os
+        path = os.path.join(self.upload_dir, "upload.csv")
+        with open(path, "wb") as f:
+            f.write(csv_text if isinstance(csv_text, bytes) else csv_text.encode())
+        return {
+            "_key": "b1", "batch_id": "batch-1", "sample_ref": "AL-001", "status": "validating",
+            "upgrade": upgrade, "upload_path": path, "encoding": encoding,
+            "params": {"skip_empty": False, "dialect_name": "D"},
+        }
+
+    def _batch_updates(self, db):
+        return [c.args[0] for c in db.collection.return_value.update.call_args_list]
+
+    def test_import_is_queued(self):
+        req = self._import_request(b"phrase_ref,phrase\n1,new1\n")
+        db = req.arangodb
+
+        response = self._view(req).import_sample(req)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "queued")
+        self.assertTrue(response.data["status_url"].endswith(f"/samples/import-batch/{response.data['batch_id']}/"))
+        batch = db.collection.return_value.insert.call_args.args[0]
+        self.assertEqual((batch["status"], batch["encoding"], batch["upgrade"]), ("queued", "utf-8", True))
+        with open(batch["upload_path"], "rb") as f:
+            self.assertEqual(f.read(), b"phrase_ref,phrase\n1,new1\n")
+        db.collection.return_value.insert_many.assert_not_called()
+        db.begin_transaction.assert_not_called()
+
+    def test_missing_column_rejected_before_queueing(self):
+        req = self._import_request(b"phrase_ref,english\n1,x\n")
+        response = self._view(req).import_sample(req)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("phrase", response.data["error"])
+        req.arangodb.collection.return_value.insert.assert_not_called()
+
+    def test_upgrade_updates_in_one_request(self):
+        from data.imports import run_import
+        db = self._import_db()
+
+        run_import(db, self._batch("phrase_ref,phrase\n1,new1\n2,new2\n3,new3\n"))
+
+        phrases = db.collection.return_value
+        phrases.update_many.assert_called_once()
+        self.assertEqual([d["_key"] for d in phrases.update_many.call_args.args[0]], ["k1", "k2"])
+        db.commit_transaction.assert_called_once()
+        db.abort_transaction.assert_not_called()
+        self.assertEqual(db.begin_transaction.call_args.kwargs["write"], ["Samples", "Phrases", "ImportBatches"])
+        final = self._batch_updates(db)[-1]
+        self.assertEqual((final["status"], final["phrase_count"], final["updated_count"]), ("done", 1, 2))
+        self.assertIsNone(final["upload_path"])
+        updated = phrases.update_many.call_args.args[0]
+        self.assertEqual({d["updated_by_batch_id"] for d in updated}, {"batch-1"})
+        self.assertNotIn("import_batch_id", updated[0])
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_writes_in_fixed_size_batches(self):
+        from data.imports import run_import
+        db = self._import_db()
+        db.collection.return_value.find.return_value = iter([])
+        csv_text = "phrase_ref,phrase\n" + "".join(f"{i % 3 + 1},p{i}\n" for i in range(5))
+
+        with patch("data.imports.WRITE_BATCH_SIZE", 2):
+            run_import(db, self._batch(csv_text, upgrade=False))
+
+        sizes = [len(c.args[0]) for c in db.collection.return_value.insert_many.call_args_list]
+        self.assertEqual(sizes, [2, 2, 1])
+        self.assertEqual(self._batch_updates(db)[-1]["phrase_count"], 5)
+
+    def test_later_undecodable_byte_switches_encoding(self):
+        from data.imports import run_import
+        db = self._import_db()
+        # Valid UTF-8 at the start (where the encoding was detected), cp1252 further on
+        run_import(db, self._batch(b"phrase_ref,phrase\n1,new1\n3,caf\xe9\n"))
+
+        inserted = db.collection.return_value.insert_many.call_args.args[0]
+        self.assertEqual(inserted[0]["phrase"], "café")
+        self.assertEqual(self._batch_updates(db)[-1]["status"], "done")
+
+    def test_detect_encoding(self):
+        from data.imports import detect_encoding
+        self.assertEqual(detect_encoding("\ufeffphrase_ref".encode()), "utf-8-sig")
+        # Cut in the middle of a two-byte character: still UTF-8
+        self.assertEqual(detect_encoding("phrase,ć".encode()[:-1]), "utf-8")
+        self.assertEqual(detect_encoding("phrase,café\n".encode("cp1252")), "cp1252")
+        self.assertEqual(detect_encoding("phrase,café".encode("cp1252"), complete=True), "cp1252")
+        self.assertEqual(detect_encoding(b"phrase,\x81"), "latin-1")
+
+    def test_invalid_rows_fail_the_batch(self):
+        from data.imports import run_import
+        db = self._import_db()
+
+        run_import(db, self._batch("phrase_ref,phrase\n1,new1\n99,x\n"))
+
+        db.begin_transaction.assert_not_called()
+        final = self._batch_updates(db)[-1]
+        self.assertEqual(final["status"], "failed")
+        self.assertEqual([e["row"] for e in final["errors"]], [3])
+
+    def test_failed_update_reported_per_document(self):
+        from data.imports import run_import
+        db = self._import_db()
+        db.collection.return_value.update_many.side_effect = lambda docs, **kw: [
+            {}, MagicMock(spec=Exception, error_message="document not found"),
+        ]
+
+        run_import(db, self._batch("phrase_ref,phrase\n1,new1\n2,new2\n"))
+
+        # Nothing is committed, not even the inserts and updates that succeeded
+        db.abort_transaction.assert_called_once()
+        db.commit_transaction.assert_not_called()
+        final = self._batch_updates(db)[-1]
+        self.assertEqual(final["status"], "failed")
+        self.assertEqual(final["errors"], [{"_key": "k2", "error": "document not found"}])
+
+    def test_failed_create_writes_nothing(self):
+        from data.imports import run_import
+        db = self._import_db()
+        db.collection.return_value.find.return_value = iter([])
+        db.collection.return_value.insert_many.side_effect = Exception("disk full")
+
+        run_import(db, self._batch("phrase_ref,phrase\n1,new1\n", upgrade=False))
+
+        db.abort_transaction.assert_called_once()
+        db.commit_transaction.assert_not_called()
+        final = self._batch_updates(db)[-1]
+        self.assertEqual(final["status"], "failed")
+        self.assertIn("nothing was written", final["error"])
+
+    def test_status_reports_progress(self):
+        db = MagicMock()
+        db.aql.execute.return_value = iter([{"batch_id": "batch-1", "status": "validating", "rows_checked": 500}])
+        req = Request(RequestFactory().get("/samples/import-batch/batch-1/"))
+        req.user = _mock_user(is_admin=True)
+        req.arangodb = db
+
+        response = self._view(req).import_status(req, batch_id="batch-1")
+
+        self.assertEqual(response.data["status"], "validating")
+        self.assertEqual(
+            db.aql.execute.call_args.kwargs["bind_vars"]["internal"], ["upload_path", "encoding", "params"]
+        )
+
+    def test_rollback_refused_while_running(self):
+        db = MagicMock()
+        db.aql.execute.side_effect = lambda q, bind_vars=None: iter([{"batch_id": "b1", "status": "writing"}])
+        db.begin_transaction.return_value = db
+        req = Request(RequestFactory().delete("/samples/import-batch/b1/"))
+        req.user = _mock_user(is_admin=True)
+        req.arangodb = db
+
+        response = self._view(req).rollback_import_batch(req, batch_id="b1")
+
+        self.assertEqual(response.status_code, 409)
+        db.collection.return_value.update_many.assert_not_called()
+
+    def test_rollback_restores_updated_phrases_tagged_with_batch(self):
+        # Phrases collection: k1/k2 existed and were updated by the import
+        # (tagged with its batch_id, as imports did before
+        # updated_by_batch_id), k3 was inserted by it
+        phrases = {"k1": "b1", "k2": "b1", "k3": "b1"}
+        batch = {"batch_id": "b1", "status": "done", "upgrade": True, "rollback_updates": [
+            {"_key": "k1", "phrase": "old1", "english": "", "conjugated": None},
+            {"_key": "k2", "phrase": "old2", "english": "", "conjugated": None},
+        ]}
+
+        def aql_execute(q, bind_vars=None):
+            if "RETURN b" in q:
+                return iter([batch])
+            if "REMOVE p IN Phrases" in q:
+                removed = [k for k, bid in phrases.items()
+                           if bid == bind_vars["bid"] and k not in bind_vars["restored"]]
+                for k in removed:
+                    del phrases[k]
+                return iter([1] * len(removed))
+            return iter([])
+
+        def update_many(docs, **kw):
+            return [{} if d["_key"] in phrases else MagicMock(spec=Exception, error_message="document not found")
+                    for d in docs]
+
+        db = MagicMock()
+        db.aql.execute.side_effect = aql_execute
+        db.collection.return_value.update_many.side_effect = update_many
+        db.begin_transaction.return_value = db
+        req = Request(RequestFactory().delete("/samples/import-batch/b1/"))
+        req.user = _mock_user(is_admin=True)
+        req.arangodb = db
+
+        response = self._view(req).rollback_import_batch(req, batch_id="b1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["deleted_phrases"], response.data["restored_phrases"]), (1, 2))
+        self.assertEqual(sorted(phrases), ["k1", "k2"])
+        db.commit_transaction.assert_called_once()
+
+    def test_rollback_restores_in_one_request(self):
+        db = MagicMock()
+        batch = {"batch_id": "b1", "status": "done", "rollback_updates": [
+            {"_key": "k1", "phrase": "old1", "english": "", "conjugated": None},
+            {"_key": "k2", "phrase": "old2", "english": "", "conjugated": None},
+        ]}
+        db.aql.execute.side_effect = lambda q, bind_vars=None: iter([batch] if "RETURN b" in q else [])
+        db.collection.return_value.update_many.side_effect = lambda docs, **kw: [{} for _ in docs]
+        db.begin_transaction.return_value = db
+        req = Request(RequestFactory().delete("/samples/import-batch/b1/"))
+        req.user = _mock_user(is_admin=True)
+        req.arangodb = db
+
+        response = self._view(req).rollback_import_batch(req, batch_id="b1")
+
+        db.collection.return_value.update.assert_not_called()
+        db.collection.return_value.update_many.assert_called_once()
+        self.assertEqual(response.data["restored_phrases"], 2)
+        db.commit_transaction.assert_called_once()
+
+    def test_second_worker_does_not_get_the_lock(self):
+        from data.imports import worker_lock
+        with worker_lock() as first:
+            with worker_lock() as second:
+                self.assertTrue(first)
+                self.assertFalse(second)
+        with worker_lock() as again:
+            self.assertTrue(again)
+
+    def test_worker_exits_when_a_failure_cannot_be_recorded(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        from data.imports import worker_lock
+        command = "data.management.commands.run_import_worker"
+        batch = {"batch_id": "b1", "sample_ref": "AL-001"}
+        with patch(f"{command}.connection_manager"), \
+                patch(f"{command}.requeue_interrupted", return_value=0), \
+                patch(f"{command}.claim_next_import", return_value=batch), \
+                patch(f"{command}.run_import", side_effect=ConnectionError("gone")):
+            with self.assertRaises(CommandError):
+                call_command("run_import_worker", stdout=io.StringIO(), stderr=io.StringIO())
+        # The lock is released, so the restarted worker can requeue the batch
+        with worker_lock() as locked:
+            self.assertTrue(locked)
+
+    def test_requeue_only_touches_this_hosts_batches(self):
+        import socket
+
+        from data.imports import requeue_interrupted
+        db = MagicMock()
+        db.aql.execute.return_value = iter([1])
+        self.assertEqual(requeue_interrupted(db), 1)
+        query = db.aql.execute.call_args.args[0]
+        self.assertIn("b.worker == @worker", query)
+        self.assertEqual(db.aql.execute.call_args.kwargs["bind_vars"]["worker"], socket.gethostname())
+
+
+class PhraseRegistryTests(SimpleTestCase):
+
+    def _db(self):
+        db = MagicMock()
+        db.collection.return_value.revision.return_value = "rev-1"
+        db.aql.execute.side_effect = lambda q, **kw: iter([
+            {"phrase_ref": "100", "phrase_ref_sort": "000100", "english": "hundred"},
+            {"phrase_ref": "80a", "english": "eighty, a"},
+            {"phrase_ref": "80", "phrase_ref_sort": "000080", "english": None},
+        ])
+        return db
+
+    def test_refs_and_natural_order(self):
+        from data.caches import PhraseRegistry
+        registry = PhraseRegistry(self._db().aql.execute("FOR m IN MasterPhrases RETURN m"))
+        self.assertEqual(registry.refs, {"80", "80a", "100"})
+        self.assertEqual([p["phrase_ref"] for p in registry.phrases], ["80", "80a", "100"])
+
+    def test_import_template_rendered_once(self):
+        from data.caches import phrase_registry_cache
+        from data.views import SampleViewSet
+        phrase_registry_cache.invalidate()
+        self.addCleanup(phrase_registry_cache.invalidate)
+        db = self._db()
+
+        responses = []
+        for _ in range(2):
+            req = Request(RequestFactory().get("/samples/import-template/"))
+            req.user = _mock_user(is_admin=True)
+            req.arangodb = db
+            vs = SampleViewSet()
+            vs.request = req
+            vs.kwargs = {}
+            vs.format_kwarg = None
+            responses.append(vs.import_template(req))
+
+        self.assertEqual(db.aql.execute.call_count, 1)
+        self.assertIn("FOR m IN MasterPhrases", db.aql.execute.call_args.args[0])
+        self.assertEqual(
+            responses[1].content.decode("utf-8-sig").splitlines(),
+            ["phrase_ref,english,phrase,conjugated", "80,,,", '80a,"eighty, a",,', "100,hundred,,"],
+        )
+
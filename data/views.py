@@ -1,9 +1,6 @@
-import csv
-import io
 import json
 import os
 import shutil
-import uuid
 from datetime import datetime
 
 from django.conf import settings
@@ -21,12 +18,24 @@ def user_sees_hidden_samples(user):
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import ViewSet
-from natsort import natsorted
 
+from data import imports
+from data.caches import (
+    category_tree_cache,
+    get_category_tree,
+    get_phrase_registry,
+    get_sample_index,
+    phrase_registry_cache,
+    related_response_cache,
+    sample_index_cache,
+    search_candidate_cache,
+    search_revisions,
+)
 from data.models import (
     Answer,
     Category,
@@ -37,6 +46,8 @@ from data.models import (
     Source,
     Transcription,
     View,
+    parse_hierarchy,
+    phrase_ref_sort_key,
 )
 from data.serializers import (
     AnswerSerializer,
@@ -49,10 +60,107 @@ from data.serializers import (
     TranscriptionSerializer,
     ViewSerializer,
 )
+from roma.bulk import BulkWriteError, bulk_update
+from roma.export import CURSOR_BATCH_SIZE, EXPORT_RENDERERS, export_format, streaming_export
+from roma.pagination import decode_cursor, encode_cursor, keyset_bind, keyset_filter
+from roma.projection import project
+from roma.transactions import stream_transaction
 from roma.views import ArangoModelViewSet
 from user.permissions import CanEditSample, IsGlobalAdmin, IsGlobalOrProjectAdmin, IsProjectEditor
 
 
+# Streamed exports: fetch in batches, don't materialize the result server-side,
+# and keep the cursor alive while a slow client downloads
+STREAM_CURSOR_OPTIONS = {"batch_size": CURSOR_BATCH_SIZE, "stream": True, "ttl": 600}
+
+
+def sort_phrases(phrases):
+    """Sort phrase rows naturally by phrase_ref (80 < 80a < 81 < 100), on the
+    stored phrase_ref_sort key where present."""
+    return sorted(phrases, key=lambda p: p.get("phrase_ref_sort") or phrase_ref_sort_key(p.get("phrase_ref")))
+
+
+def _sample_visible_expr(var):
+    """
+    AQL expression true when `var`'s sample is one this user may see (any
+    sample when @show_hidden_samples). Rows of samples with no Samples
+    document are dropped either way.
+
+    A sample_ref index lookup per row rather than an @visible_samples list, so
+    the bind vars (and the cache keys built from them) only carry the flag.
+    """
+    return (
+        f"FIRST(FOR sample_doc IN Samples FILTER sample_doc.sample_ref == {var}.sample LIMIT 1 "
+        f"RETURN @show_hidden_samples OR sample_doc.visible == 'Yes') == true"
+    )
+
+
+def _visible_sample_filter(var, include_hidden):
+    """AQL FILTER keeping rows of `var` whose sample this user may see, plus its bind vars."""
+    return f"FILTER {_sample_visible_expr(var)}", {"show_hidden_samples": include_hidden}
+
+
+def _add_sample_labels(db, rows):
+    """Set each row's sample_label ("dialect, location") from the cached
+    SampleIndex, instead of rebuilding a Samples lookup in every query."""
+    labels = get_sample_index(db).labels
+    for row in rows:
+        row["sample_label"] = labels.get(row.get("sample"))
+    return rows
+
+
+def _search_page(db, cache_key, ordered_ids_aql, row_aql, bind, offset, page_size, row_bind=None):
+    """
+    Run a paged search in one query and return (count, rows).
+
+    ordered_ids_aql must bind `ordered_ids`: the _ids of every match, in
+    result order. row_aql turns one `id` into a result row (and RETURNs it),
+    using only row_bind bind vars (e.g. a field projection) besides `id`.
+    The ordered list is kept in search_candidate_cache for a short while,
+    so the next pages just DOCUMENT() their slice of it instead of
+    re-running the full-text candidate search (and its separate count).
+    The key includes the searched collections' revisions, so a write makes
+    the next page search afresh; row_aql must still drop an `id` whose
+    document is gone (a write not yet seen by the revision check).
+    """
+    cache_key = (cache_key, search_revisions.revisions(db))
+    ids = search_candidate_cache.get(cache_key)
+    if ids is not None:
+        rows = db.aql.execute(
+            f"FOR id IN @ids {row_aql}",
+            bind_vars={"ids": ids[offset:offset + page_size], **(row_bind or {})},
+        )
+        return len(ids), list(rows)
+
+    aql = f"""
+        {ordered_ids_aql}
+        LET page = (FOR id IN SLICE(ordered_ids, @offset, @page_size) {row_aql})
+        RETURN {{
+            count: LENGTH(ordered_ids),
+            ids: LENGTH(ordered_ids) <= @max_cached_ids ? ordered_ids : null,
+            results: page
+        }}
+    """
+    result = next(db.aql.execute(aql, bind_vars={
+        **bind,
+        **(row_bind or {}),
+        "offset": offset,
+        "page_size": page_size,
+        "max_cached_ids": settings.SEARCH_CANDIDATE_CACHE_MAX_KEYS,
+    }), None) or {"count": 0, "ids": [], "results": []}
+    if result["ids"] is not None:
+        search_candidate_cache.set(cache_key, result["ids"])
+    return result["count"], result["results"]
+
+
+def _iter_sample_labels(db, rows):
+    """Lazy _add_sample_labels, for streamed exports."""
+    labels = get_sample_index(db).labels
+    for row in rows:
+        row["sample_label"] = labels.get(row.get("sample"))
+        yield row
+
+
 def _get_question_hierarchy_ids(db, question_id):
     """
     Return a ResearchQuestion's hierarchy_ids (itself plus every ancestor
@@ -76,6 +184,33 @@ def _get_question_hierarchy_ids(db, question_id):
     return next(cursor, None)
 
 
+def _search_by_name(db, collection_name, query, limit, extra_filter=""):
+    """
+    Name search for the category/research-question pickers, backed by the
+    CategorySearch ArangoSearch view (created at startup, see
+    ArangoDBMiddleware._ensure_search_views) instead of a REGEX_TEST scan.
+
+    Matches any case/accent-insensitive substring of doc.name through the
+    bigram index; prefix matches rank first, then BM25, then id. The query
+    is only ever a bind variable, so regex/LIKE metacharacters in it are
+    matched literally.
+    """
+    aql = f"""
+        LET q = TOKENS(@query, "category_name_norm")[0]
+        FOR doc IN CategorySearch
+            SEARCH ANALYZER(PHRASE(doc.name, @query), "category_name_ngram")
+            FILTER IS_SAME_COLLECTION(@collection, doc)
+            {extra_filter}
+            LET is_prefix = STARTS_WITH(TOKENS(doc.name, "category_name_norm")[0], q)
+            SORT is_prefix DESC, BM25(doc) DESC, doc.id ASC
+            LIMIT @limit
+            RETURN doc
+    """
+    return db.aql.execute(
+        aql, bind_vars={"query": query, "collection": collection_name, "limit": limit}
+    )
+
+
 class CategoryViewSet(ArangoModelViewSet):
     """
     API endpoint for browsing categories in a hierarchical structure.
@@ -94,15 +229,31 @@ class CategoryViewSet(ArangoModelViewSet):
     model = Category
     serializer_class = CategorySerializer
     http_method_names = ["get", "head", "options"]  # prevent post
+    etag_actions = ("list", "retrieve", "batch")
+
+    SEARCH_LIMIT = 100
+    MAX_SEARCH_LIMIT = 500
 
     def get_queryset(self):
         parent_id = self.request.query_params.get("parent_id")
-        db = self.request.arangodb
-        collection = db.collection(self.model.collection_name)
+        tree = get_category_tree(self.request.arangodb)
         exclude_ids = [2, 3]
         id = int(parent_id) if parent_id else 1
-        categories_cursor = collection.find({"parent_id": id})
-        return [c for c in categories_cursor if c["id"] not in exclude_ids]
+        return [c for c in tree.children(id) if c["id"] not in exclude_ids]
+
+    def get_etag_revisions(self, request):
+        # What the cached tree was loaded at, not the live revision: the tag
+        # must describe the data actually served (the cache lags a write by
+        # up to ARANGO_CACHE_CHECK_INTERVAL)
+        return category_tree_cache.revisions(request.arangodb)
+
+    def get_object(self, pk):
+        # Same _key-then-id lookup as ArangoModelViewSet, against the cached tree
+        tree = get_category_tree(self.request.arangodb)
+        doc = tree.get_by_key(pk) or tree.get(pk)
+        if doc:
+            return doc
+        raise NotFound(detail="Object not found")
 
 
     def list(self, request, *args, **kwargs):
@@ -133,16 +284,19 @@ class CategoryViewSet(ArangoModelViewSet):
     @action(detail=False, methods=["get"])
     def search(self, request):
         """
-        Search categories by name using pattern matching.
+        Search categories by name.
 
         Query Parameters:
         - q (required): Search term (minimum 2 characters)
+        - limit (optional, default 100, max 500): Maximum number of results
 
         Example:
         - /categories/search/?q=music - Searches for categories containing 'music'
 
-        Returns matching categories with hierarchy information, sorted by ID.
-        Case-insensitive search using regular expressions.
+        Returns matching categories with hierarchy information. Case- and
+        accent-insensitive substring match via the CategorySearch index;
+        names starting with the term come first, then the best-ranked infix
+        matches.
         """
         query = request.query_params.get("q", "").strip()
         if not query or len(query) < 2:
@@ -152,33 +306,16 @@ class CategoryViewSet(ArangoModelViewSet):
         if not db:
             return Response({"error": "Database not available"}, status=500)
 
-        search_pattern = f".*{query}.*"
-        aql_query = """
-        FOR doc IN Categories
-        FILTER REGEX_TEST(doc.name, @search_pattern, 'i')
-        SORT doc.id ASC
-        RETURN {
-            "id": doc.id,
-            "name": doc.name,
-            "hierarchy": doc.hierarchy,
-            "parent_id": doc.parent_id,
-            "is_leaf": doc.is_leaf,
-        }
-        """
+        try:
+            limit = min(int(request.query_params.get("limit", self.SEARCH_LIMIT)), self.MAX_SEARCH_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
 
         try:
-            cursor = db.aql.execute(
-                aql_query, bind_vars={"search_pattern": search_pattern}
-            )
+            cursor = _search_by_name(db, self.model.collection_name, query, limit)
             results = []
             for doc in cursor:
-                # Parse hierarchy if it's stored as string
-                hierarchy = doc.get("hierarchy", [])
-                if isinstance(hierarchy, str):
-                    try:
-                        hierarchy = eval(hierarchy)
-                    except Exception as _:
-                        hierarchy = []
+                hierarchy = parse_hierarchy(doc.get("hierarchy"))
                 results.append(
                     {
                         "id": doc["id"],
@@ -216,14 +353,8 @@ class CategoryViewSet(ArangoModelViewSet):
         if not ids:
             return Response([])
 
-        db = request.arangodb
-        aql_query = """
-        FOR doc IN Categories
-            FILTER doc.id IN @ids
-            RETURN doc
-        """
-        cursor = db.aql.execute(aql_query, bind_vars={"ids": ids})
-        results = list(cursor)
+        tree = get_category_tree(request.arangodb)
+        results = [doc for doc in (tree.get(i) for i in dict.fromkeys(ids)) if doc]
         serializer = self.serializer_class(
             results, many=True, context={"request": request, "view": self}
         )
@@ -233,41 +364,27 @@ class CategoryViewSet(ArangoModelViewSet):
     def search_views(self, request):
         """
         Return all categories that have an associated view (path field).
-        Optionally filter by name with ?q= parameter.
+        Optionally filter by name with ?q= parameter; filtered results are
+        capped at MAX_SEARCH_LIMIT best matches, like search's ?limit=.
         """
         db = request.arangodb
         if not db:
             return Response({"error": "Database not available"}, status=500)
 
         query = request.query_params.get("q", "").strip()
-        if query:
-            search_pattern = f".*{query}.*"
-            aql_query = """
-            FOR doc IN Categories
-            FILTER doc.path != null AND doc.path != "" AND REGEX_TEST(doc.name, @search_pattern, 'i')
-            SORT doc.id ASC
-            RETURN { "id": doc.id, "name": doc.name, "hierarchy": doc.hierarchy, "parent_id": doc.parent_id, "path": doc.path }
-            """
-            bind_vars = {"search_pattern": search_pattern}
-        else:
-            aql_query = """
-            FOR doc IN Categories
-            FILTER doc.path != null AND doc.path != ""
-            SORT doc.id ASC
-            RETURN { "id": doc.id, "name": doc.name, "hierarchy": doc.hierarchy, "parent_id": doc.parent_id, "path": doc.path }
-            """
-            bind_vars = {}
 
         try:
-            cursor = db.aql.execute(aql_query, bind_vars=bind_vars)
+            if query:
+                cursor = _search_by_name(
+                    db, self.model.collection_name, query, self.MAX_SEARCH_LIMIT,
+                    extra_filter='FILTER doc.path != null AND doc.path != ""',
+                )
+            else:
+                # Every category with a view, straight from the cached tree
+                cursor = [doc for doc in get_category_tree(db).by_id.values() if doc.get("path")]
             results = []
             for doc in cursor:
-                hierarchy = doc.get("hierarchy", [])
-                if isinstance(hierarchy, str):
-                    try:
-                        hierarchy = eval(hierarchy)
-                    except Exception as _:
-                        hierarchy = []
+                hierarchy = parse_hierarchy(doc.get("hierarchy"))
                 results.append(
                     {
                         "id": doc["id"],
@@ -303,6 +420,7 @@ class ResearchQuestionViewSet(ArangoModelViewSet):
     model = ResearchQuestion
     serializer_class = ResearchQuestionSerializer
     http_method_names = ["get", "head", "options"]
+    etag_actions = ("batch",)
 
     @action(detail=False, methods=["get"])
     def batch(self, request):
@@ -335,25 +453,16 @@ class ResearchQuestionViewSet(ArangoModelViewSet):
     def search(self, request):
         """
         GET /research-questions/search/?q=<term> - search ResearchQuestions
-        by name (case-insensitive substring, minimum 2 characters), sorted
-        by id, capped at 50 results.
+        by name (case/accent-insensitive substring, minimum 2 characters,
+        via the CategorySearch index), prefix matches first, capped at 50
+        results.
         """
         query = request.query_params.get("q", "").strip()
         if not query or len(query) < 2:
             return Response([])
 
         db = request.arangodb
-        cursor = db.aql.execute(
-            """
-            FOR q IN ResearchQuestions
-                FILTER REGEX_TEST(q.name, @pattern, true)
-                SORT q.id
-                LIMIT 50
-                RETURN q
-            """,
-            bind_vars={"pattern": f".*{query}.*"},
-        )
-        results = list(cursor)
+        results = list(_search_by_name(db, self.model.collection_name, query, 50))
         serializer = self.serializer_class(results, many=True, context={"request": request, "view": self})
         return Response(serializer.data)
 
@@ -399,6 +508,17 @@ class PhraseViewSet(ArangoModelViewSet):
 
     EDITABLE_FIELDS = {"phrase", "question_overrides"}
 
+    etag_actions = ("list", "retrieve", "phrase_list")
+    etag_collections = ("SamplePhrases", "MasterPhrases")
+
+    # Search/export ordering per `sort` option. phrase_ref_sort is the stored,
+    # indexed natural-order key (see data.models.phrase_ref_sort_key).
+    SORT_FIELDS = {
+        "phrase_ref": ("phrase_ref_sort", "sample"),
+        "sample": ("sample", "phrase_ref_sort"),
+    }
+    EXPORT_COLUMNS = ["phrase_ref", "sample", "sample_label", "phrase", "english", "conjugated", "has_recording"]
+
     # Resolved question_ids for display/matching: the MasterPhrase's own
     # links, plus this SamplePhrase's question_overrides.include, minus its
     # question_overrides.exclude. Requires `m` (MasterPhrase doc) and `sp`
@@ -481,8 +601,14 @@ class PhraseViewSet(ArangoModelViewSet):
             )
         if "question_overrides" in updates:
             updates["question_overrides"] = self._validate_question_overrides(updates["question_overrides"])
+        # Keep the natural-sort key in step (fills it in on docs predating it)
+        sort_key = phrase_ref_sort_key(doc["phrase_ref"])
+        if doc.get("phrase_ref_sort") != sort_key:
+            updates["phrase_ref_sort"] = sort_key
 
         db.collection(self.model.collection_name).update({"_key": pk, **updates})
+        related_response_cache.invalidate()
+        search_revisions.invalidate()
         updated = self._merge_with_master(db, db.collection(self.model.collection_name).get(pk))
         serializer = self.serializer_class(updated, context={"request": request})
         return Response(serializer.data)
@@ -517,6 +643,23 @@ class PhraseViewSet(ArangoModelViewSet):
             },
         })
 
+    def get_list_query(self):
+        sample = self.request.query_params.get("sample")
+        if not sample:
+            raise NotFound(detail="Sample parameter is required to fetch phrases")
+        aql = """
+            FOR sp IN SamplePhrases
+                FILTER sp.sample == @sample
+                SORT sp.phrase_ref_sort
+                LIMIT @offset, @count
+                LET m = DOCUMENT(CONCAT("MasterPhrases/", sp.phrase_ref))
+                RETURN MERGE(sp, {
+                    english: m.english,
+                    conjugated: m.conjugated
+                })
+        """
+        return aql, {"sample": sample}
+
     def get_queryset(self):
         try:
             sample = self.request.query_params.get("sample")
@@ -531,6 +674,7 @@ class PhraseViewSet(ArangoModelViewSet):
             aql = """
                 FOR sp IN SamplePhrases
                     FILTER sp.sample == @sample
+                    SORT sp.phrase_ref_sort
                     LET m = DOCUMENT(CONCAT("MasterPhrases/", sp.phrase_ref))
                     RETURN MERGE(sp, {
                         english: m.english,
@@ -538,7 +682,7 @@ class PhraseViewSet(ArangoModelViewSet):
                     })
             """
             cursor = db.aql.execute(aql, bind_vars={"sample": sample})
-            return natsorted(list(cursor), key=lambda x: x["phrase_ref"])
+            return list(cursor)
 
         except NotFound:
             raise
@@ -546,6 +690,12 @@ class PhraseViewSet(ArangoModelViewSet):
             print(f"Error fetching phrases: {e}")
             return []
 
+    def get_etag_collections(self):
+        # The picker list doesn't change with per-sample phrase edits
+        if self.action == "phrase_list":
+            return ("MasterPhrases",)
+        return super().get_etag_collections()
+
     @action(detail=False, methods=["get"], url_path="list")
     def phrase_list(self, request):
         """
@@ -555,11 +705,11 @@ class PhraseViewSet(ArangoModelViewSet):
         db = request.arangodb
         aql = """
             FOR m IN MasterPhrases
+                SORT m.phrase_ref_sort
                 RETURN { phrase_ref: m.phrase_ref, english: m.english }
         """
         cursor = db.aql.execute(aql)
-        results = natsorted(list(cursor), key=lambda x: x["phrase_ref"])
-        return Response(results)
+        return Response(list(cursor))
 
 
     @action(detail=False, methods=["get"], url_path="by-answer")
@@ -622,23 +772,67 @@ class PhraseViewSet(ArangoModelViewSet):
             print(f"Error fetching phrases for answer: {e}")
             raise NotFound(detail="Error retrieving phrases")
 
-    def _phrase_override_includes(self, db, category_id, sample, exclude):
-        """SamplePhrases in this sample that declare relevance to category_id
-        via their own question_overrides.include, regardless of whether the
-        MasterPhrase itself matches. Shared by _phrases_by_category and
-        by_answer's Answer.phrase_overrides.include branch."""
-        aql = """
+    # Phrase resolution shared by the helpers below and
+    # RelatedContentViewSet.RELATED_AQL. Expects @category_id and @sample
+    # bound and hierarchy_ids, phrase_include and phrase_exclude defined
+    # before it; leaves the rows, merged with their MasterPhrase, in `phrases`.
+    #
+    # phrase_include (Answer.phrase_overrides.include) names the refs
+    # directly; otherwise they are the MasterPhrases whose question_ids/
+    # category_ids cover the question, looked up through the question_ids[*]
+    # / category_ids[*] array indexes (one lookup per hierarchy id). Each is
+    # joined to this sample's SamplePhrase by key and dropped if its
+    # question_overrides.exclude names the category; SamplePhrases whose
+    # question_overrides.include names it are unioned in (through the
+    # question_overrides.include[*] index) regardless.
+    RESOLVE_PHRASES_AQL = """
+        LET category_refs = (
+            FILTER LENGTH(phrase_include) == 0 AND hierarchy_ids != null
+            FOR phrase_ref IN UNION_DISTINCT(
+                (FOR m IN MasterPhrases FILTER @category_id IN m.question_ids[*] RETURN m.phrase_ref),
+                (FOR cid IN hierarchy_ids FOR m IN MasterPhrases FILTER cid IN m.category_ids[*] RETURN m.phrase_ref)
+            )
+                RETURN phrase_ref
+        )
+        LET matched = (
+            FOR phrase_ref IN (LENGTH(phrase_include) > 0 ? phrase_include : category_refs)
+                FILTER phrase_ref NOT IN phrase_exclude
+                LET sp = DOCUMENT(CONCAT("SamplePhrases/", @sample, "_", phrase_ref))
+                FILTER sp != null
+                FILTER @category_id NOT IN (sp.question_overrides.exclude || [])
+                RETURN sp
+        )
+        LET override_includes = (
+            FILTER LENGTH(phrase_include) > 0 OR hierarchy_ids != null
             FOR sp IN SamplePhrases
-                FILTER sp.sample == @sample
-                FILTER @category_id IN (sp.question_overrides.include || [])
-                FILTER sp.phrase_ref NOT IN @exclude
+                FILTER @category_id IN sp.question_overrides.include[*]
+                FILTER sp.sample == @sample AND sp.phrase_ref NOT IN phrase_exclude
+                RETURN sp
+        )
+        LET phrases = (
+            FOR sp IN UNION_DISTINCT(matched, override_includes)
                 LET m = DOCUMENT(CONCAT("MasterPhrases/", sp.phrase_ref))
                 RETURN MERGE(sp, {
                     english: m.english,
                     conjugated: m.conjugated
                 })
+        )
+    """
+
+    def _query_phrases(self, db, sample, category_id, hierarchy_ids, include, exclude):
+        """Run RESOLVE_PHRASES_AQL on its own."""
+        aql = f"""
+            LET hierarchy_ids = @hierarchy_ids
+            LET phrase_include = @include
+            LET phrase_exclude = @exclude
+            {self.RESOLVE_PHRASES_AQL}
+            FOR phrase IN phrases
+                RETURN phrase
         """
-        return list(db.aql.execute(aql, bind_vars={'sample': sample, 'category_id': category_id, 'exclude': exclude}))
+        return list(db.aql.execute(aql, bind_vars={
+            'category_id': category_id, 'sample': sample, 'hierarchy_ids': hierarchy_ids,
+            'include': include, 'exclude': exclude,
+        }))
 
     def _phrases_by_category(self, db, category_id, sample, exclude=None):
         """
@@ -651,69 +845,24 @@ class PhraseViewSet(ArangoModelViewSet):
         layered on top (exclude subtracts a phrase; include adds one even if
         the MasterPhrase wouldn't otherwise match). `exclude` is an optional
         list of phrase_refs to additionally drop (used by by_answer for its
-        Answer.phrase_overrides.exclude).
+        Answer.phrase_overrides.exclude). One query, RESOLVE_PHRASES_AQL.
         """
-        exclude = exclude or []
         hierarchy_ids = _get_question_hierarchy_ids(db, category_id)
         if hierarchy_ids is None:
             return []
-
-        aql = """
-            FOR m IN MasterPhrases
-                FILTER (@category_id IN (m.question_ids || [])
-                        OR LENGTH(INTERSECTION(m.category_ids || [], @hierarchy_ids)) > 0)
-                    AND m.phrase_ref NOT IN @exclude
-                LET sp = DOCUMENT(CONCAT("SamplePhrases/", @sample, "_", m.phrase_ref))
-                FILTER sp != null
-                FILTER @category_id NOT IN (sp.question_overrides.exclude || [])
-                RETURN MERGE(sp, {
-                    english: m.english,
-                    conjugated: m.conjugated
-                })
-        """
-        phrases = list(db.aql.execute(aql, bind_vars={
-            'category_id': category_id, 'hierarchy_ids': hierarchy_ids, 'sample': sample, 'exclude': exclude,
-        }))
-
-        overrides = self._phrase_override_includes(db, category_id, sample, exclude)
-        seen_keys = {p['_key'] for p in phrases}
-        for p in overrides:
-            if p['_key'] not in seen_keys:
-                phrases.append(p)
-                seen_keys.add(p['_key'])
-        return phrases
+        return self._query_phrases(db, sample, category_id, hierarchy_ids, [], exclude or [])
 
     def _phrases_by_explicit_refs(self, db, sample, category_id, include, exclude):
         """Phrases named directly by Answer.phrase_overrides.include (the
         ~65 divergent-question case), plus the same SamplePhrase-level
         include union _phrases_by_category applies."""
-        aql = """
-            FOR phrase_ref IN @include
-                FILTER phrase_ref NOT IN @exclude
-                LET sp = DOCUMENT(CONCAT("SamplePhrases/", @sample, "_", phrase_ref))
-                FILTER sp != null
-                FILTER @category_id NOT IN (sp.question_overrides.exclude || [])
-                LET m = DOCUMENT(CONCAT("MasterPhrases/", phrase_ref))
-                RETURN MERGE(sp, {
-                    english: m.english,
-                    conjugated: m.conjugated
-                })
-        """
-        bind_vars = {'include': include, 'exclude': exclude, 'sample': sample, 'category_id': category_id}
-        phrases = list(db.aql.execute(aql, bind_vars=bind_vars))
-        overrides = self._phrase_override_includes(db, category_id, sample, exclude)
-        seen_keys = {p['_key'] for p in phrases}
-        for p in overrides:
-            if p['_key'] not in seen_keys:
-                phrases.append(p)
-                seen_keys.add(p['_key'])
-        return phrases
+        return self._query_phrases(db, sample, category_id, None, include, exclude)
 
     def _resolve_phrases(self, db, sample, question_id, include, exclude):
         """Resolves the phrase list for a question_id: via
         Answer.phrase_overrides.include if set (exact per-answer precision
         for divergent questions), otherwise via _phrases_by_category.
-        Shared by by_answer and RelatedContentViewSet."""
+        Used by by_answer."""
         # sp is a direct primary-key lookup (SamplePhrases._key ==
         # "{sample}_{phrase_ref}"), not a scan — avoids re-scanning all
         # 128k SamplePhrases once per matching MasterPhrase.
@@ -728,7 +877,7 @@ class PhraseViewSet(ArangoModelViewSet):
         if not phrases:
             return Response([])
 
-        phrases = natsorted(phrases, key=lambda x: x.get("phrase_ref", ""))
+        phrases = sort_phrases(phrases)
         serializer = self.serializer_class(phrases, many=True, context={"request": request})
         return Response(serializer.data)
 
@@ -762,15 +911,13 @@ class PhraseViewSet(ArangoModelViewSet):
             except (TypeError, ValueError):
                 raise ValidationError("category_id must be an integer")
 
-            db = request.arangodb
-            phrases = self._phrases_by_category(db, category_id, sample)
-
-            if not phrases:
-                return Response([])
-
-            phrases = natsorted(phrases, key=lambda x: x.get("phrase_ref", ""))
-            serializer = self.serializer_class(phrases, many=True, context={"request": request})
-            return Response(serializer.data)
+            cache_key = ("phrases", category_id, sample)
+            data = related_response_cache.get(request.arangodb, cache_key)
+            if data is None:
+                phrases = sort_phrases(self._phrases_by_category(request.arangodb, category_id, sample))
+                data = self.serializer_class(phrases, many=True, context={"request": request}).data
+                related_response_cache.set(request.arangodb, cache_key, data)
+            return Response(data)
 
         except (NotFound, ValidationError):
             raise
@@ -778,6 +925,24 @@ class PhraseViewSet(ArangoModelViewSet):
             print(f"Error fetching phrases for category: {e}")
             raise NotFound(detail="Error retrieving phrases")
 
+    @staticmethod
+    def _next_cursor(rows, sort_fields, strict=True):
+        """Continuation token positioned after the last of rows, from the
+        stored sort keys the keyset filter compares. A row without a stored
+        phrase_ref_sort would sort apart from its neighbours (and the next
+        page skip rows): cursor requests fail rather than return a bad
+        token, ?page= requests (strict=False) just get no token and keep
+        paging by number."""
+        last = rows[-1]
+        if "phrase_ref_sort" in sort_fields and not last.get("phrase_ref_sort"):
+            if not strict:
+                return None
+            raise APIException(
+                f"Phrase {last.get('phrase_ref')} of {last.get('sample')} has no phrase_ref_sort; "
+                "run manage.py backfill_phrase_ref_sort"
+            )
+        return encode_cursor(last.get(f) for f in sort_fields)
+
     @action(detail=False, methods=["post"], url_path="search")
     def search(self, request):
         """
@@ -793,11 +958,22 @@ class PhraseViewSet(ArangoModelViewSet):
         - field (optional, default 'both'): Text search field — 'romani', 'english', or 'both'. Ignored when phrase_ref is given.
         - page (optional, default 1): Page number. Ignored when phrase_ref is given (all results returned).
         - page_size (optional, default 50, max 200): Results per page. Ignored when phrase_ref is given.
+        - cursor (optional): next_cursor from a previous response. Returns the page after it
+          (keyset filter on the stored sort key instead of an offset; `page` is ignored and no
+          count is returned). The text search still runs to find the candidates, so this saves
+          skipping rows, not the search itself.
+        - fields / exclude (optional): Attributes to return / leave out of each result (list or
+          comma-separated), applied in the query. phrase_ref and sample are always returned.
+
+        Count and page come from a single query; the ordered match list is
+        reused for SEARCH_CANDIDATE_CACHE_TTL seconds while paging. Paged
+        responses include next_cursor (null on the last page).
         """
         phrase_ref = request.data.get("phrase_ref", "").strip()
         query = request.data.get("query", "").strip()
         if not phrase_ref and (not query or len(query) < 2):
             raise ValidationError("Query must be at least 2 characters")
+        cursor = request.data.get("cursor") or None
 
         sample_refs = request.data.get("sample_refs", [])
         sort = request.data.get("sort", "phrase_ref")
@@ -808,22 +984,17 @@ class PhraseViewSet(ArangoModelViewSet):
 
         db = request.arangodb
 
-        # Natural sort for phrase_ref: extract leading number, then sort by that numerically,
-        # then by the remaining suffix (e.g. "80a" → 80, "a")
-        natsort_expr = "TO_NUMBER(REGEX_REPLACE(phrase.phrase_ref, '[^0-9].*$', '')), REGEX_REPLACE(phrase.phrase_ref, '^[0-9]+', '')"
-        sort_clauses = {
-            "phrase_ref": f"SORT {natsort_expr}, phrase.sample",
-            "sample": f"SORT phrase.sample, {natsort_expr}",
-        }
-        sort_aql = sort_clauses.get(sort, sort_clauses["phrase_ref"])
+        sort_fields = self.SORT_FIELDS.get(sort, self.SORT_FIELDS["phrase_ref"])
+        sort_aql = "SORT " + ", ".join(f"phrase.{f}" for f in sort_fields)
+        # phrase_ref/sample/phrase_ref_sort are needed for next_cursor and sample_label
+        returned, projection_bind = project("phrase", request, required=("phrase_ref", "sample", "phrase_ref_sort"))
 
         if phrase_ref:
             # Exact phrase_ref match via persistent index — no text search, no sample_refs resolution.
-            # Visibility and sample label resolved per-row via inline Samples lookup.
-            see_hidden = user_sees_hidden_samples(request.user)
-            visibility_filter = "" if see_hidden else "FILTER s.visible == 'Yes'"
+            # Sample labels come from the cached SampleIndex.
+            visibility_filter, bind = _visible_sample_filter("sp", user_sees_hidden_samples(request.user))
             sample_filter = "FILTER sp.sample IN @sample_refs" if sample_refs else ""
-            bind: dict = {"phrase_ref": phrase_ref}
+            bind["phrase_ref"] = phrase_ref
             if sample_refs:
                 bind["sample_refs"] = sample_refs
             results_aql = f"""
@@ -832,32 +1003,27 @@ class PhraseViewSet(ArangoModelViewSet):
                 FOR sp IN SamplePhrases
                     FILTER sp.phrase_ref == m.phrase_ref
                     {sample_filter}
-                    FOR s IN Samples
-                        FILTER s.sample_ref == sp.sample
-                        {visibility_filter}
-                        LET phrase = MERGE(sp, {{
-                            english: m.english,
-                            conjugated: m.conjugated
-                        }})
-                        {sort_aql}
-                        RETURN MERGE(phrase, {{
-                            sample_label: CONCAT_SEPARATOR(', ', s.dialect_name, s.location)
-                        }})
+                    {visibility_filter}
+                    LET phrase = MERGE(sp, {{
+                        english: m.english,
+                        conjugated: m.conjugated
+                    }})
+                    {sort_aql}
+                    RETURN {returned}
             """
             try:
-                results = list(db.aql.execute(results_aql, bind_vars=bind))
+                results = _add_sample_labels(db, list(db.aql.execute(results_aql, bind_vars={**bind, **projection_bind})))
                 serializer = self.serializer_class(results, many=True, context={"request": request})
                 return Response({"count": len(results), "page": 1, "page_size": len(results), "results": serializer.data})
             except Exception as e:
                 print(f"Error searching phrases by phrase_ref: {e}")
                 raise ValidationError(f"Search failed: {str(e)}")
         else:
-            # Resolve sample refs upfront (once) instead of a subquery per phrase
-            if not sample_refs:
-                if user_sees_hidden_samples(request.user):
-                    sample_refs = list(db.aql.execute("FOR s IN Samples RETURN s.sample_ref"))
-                else:
-                    sample_refs = list(db.aql.execute("FOR s IN Samples FILTER s.visible == 'Yes' RETURN s.sample_ref"))
+            # Explicit sample_refs restrict the search; otherwise only hidden samples are excluded
+            if sample_refs:
+                sample_filter, sample_bind = "FILTER sp.sample IN @sample_refs", {"sample_refs": sample_refs}
+            else:
+                sample_filter, sample_bind = _visible_sample_filter("sp", user_sees_hidden_samples(request.user))
 
             # Romani text ('phrase') lives per-sample on SamplePhrases, indexed by the
             # SamplePhraseSearch ArangoSearch view (norm_lower analyzer). English lives
@@ -868,11 +1034,11 @@ class PhraseViewSet(ArangoModelViewSet):
             search_romani = field in ("romani", "both")
             search_english = field in ("english", "both")
 
-            candidates_aql = """
+            candidates_aql = f"""
                 LET romani_keys = @search_romani ? (
                     FOR sp IN SamplePhraseSearch
                         SEARCH ANALYZER(LIKE(sp.phrase, CONCAT("%", @query, "%")), "norm_lower")
-                        FILTER sp.sample IN @sample_refs
+                        {sample_filter}
                         RETURN sp._key
                 ) : []
                 LET english_refs = @search_english ? (
@@ -882,66 +1048,88 @@ class PhraseViewSet(ArangoModelViewSet):
                 ) : []
                 LET english_keys = @search_english ? (
                     FOR sp IN SamplePhrases
-                        FILTER sp.phrase_ref IN english_refs AND sp.sample IN @sample_refs
+                        FILTER sp.phrase_ref IN english_refs
+                        {sample_filter}
                         RETURN sp._key
                 ) : []
                 LET candidate_keys = UNIQUE(APPEND(romani_keys, english_keys))
             """
-            count_aql = f"""
+            ordered_ids_aql = f"""
                 {candidates_aql}
-                RETURN LENGTH(candidate_keys)
-            """
-            results_aql = f"""
-                {candidates_aql}
-                LET sample_lookup = (
-                    FOR s IN Samples
-                        RETURN {{ref: s.sample_ref, label: CONCAT_SEPARATOR(', ', s.dialect_name, s.location)}}
+                LET ordered_ids = (
+                    FOR key IN candidate_keys
+                        LET phrase = DOCUMENT(CONCAT("SamplePhrases/", key))
+                        {sort_aql}
+                        RETURN phrase._id
                 )
-                LET sample_map = ZIP(sample_lookup[*].ref, sample_lookup[*].label)
-                FOR key IN candidate_keys
-                    LET sp = DOCUMENT(CONCAT("SamplePhrases/", key))
-                    LET m = DOCUMENT(CONCAT("MasterPhrases/", sp.phrase_ref))
-                    LET phrase = MERGE(sp, {{
-                        english: m.english,
-                        conjugated: m.conjugated
-                    }})
-                    {sort_aql}
-                    LIMIT @offset, @page_size
-                    RETURN MERGE(phrase, {{
-                        sample_label: sample_map[phrase.sample]
-                    }})
+            """
+            row_aql = f"""
+                LET sp = DOCUMENT(id)
+                FILTER sp != null
+                LET m = DOCUMENT(CONCAT("MasterPhrases/", sp.phrase_ref))
+                LET phrase = MERGE(sp, {{
+                    english: m.english,
+                    conjugated: m.conjugated
+                }})
+                RETURN {returned}
             """
             bind = {
                 "query": query_lower,
-                "sample_refs": sample_refs,
                 "search_romani": search_romani,
                 "search_english": search_english,
+                **sample_bind,
             }
-            count_bind = bind
-            results_bind = {**bind, "offset": offset, "page_size": page_size}
 
-        try:
-            count_cursor = db.aql.execute(count_aql, bind_vars=count_bind)
-            total = next(count_cursor, 0)
+            try:
+                if cursor:
+                    after = decode_cursor(cursor, len(sort_fields))
+                    after_aql = f"""
+                        {candidates_aql}
+                        FOR key IN candidate_keys
+                            LET phrase = DOCUMENT(CONCAT("SamplePhrases/", key))
+                            {keyset_filter("phrase", sort_fields)}
+                            {sort_aql}
+                            LIMIT @limit
+                            LET id = phrase._id
+                            {row_aql}
+                    """
+                    rows = list(db.aql.execute(after_aql, bind_vars={
+                        **bind, **projection_bind, **keyset_bind(after), "limit": page_size + 1,
+                    }))
+                    results = _add_sample_labels(db, rows[:page_size])
+                    serializer = self.serializer_class(results, many=True, context={"request": request})
+                    return Response({
+                        "page_size": page_size,
+                        "results": serializer.data,
+                        "next_cursor": self._next_cursor(results, sort_fields) if len(rows) > page_size else None,
+                    })
 
-            results_cursor = db.aql.execute(results_aql, bind_vars=results_bind)
-            results = list(results_cursor)
+                cache_key = ("phrases", sort, json.dumps(bind, sort_keys=True))
+                total, results = _search_page(
+                    db, cache_key, ordered_ids_aql, row_aql, bind, offset, page_size, row_bind=projection_bind,
+                )
+                results = _add_sample_labels(db, results)
 
-            serializer = self.serializer_class(
-                results, many=True, context={"request": request}
-            )
+                serializer = self.serializer_class(
+                    results, many=True, context={"request": request}
+                )
 
-            return Response({
-                "count": total,
-                "page": page,
-                "page_size": page_size,
-                "results": serializer.data,
-            })
-        except Exception as e:
-            print(f"Error searching phrases: {e}")
-            raise ValidationError(f"Search failed: {str(e)}")
+                return Response({
+                    "count": total,
+                    "page": page,
+                    "page_size": page_size,
+                    "results": serializer.data,
+                    "next_cursor": (
+                        self._next_cursor(results, sort_fields, strict=False) if offset + len(results) < total else None
+                    ),
+                })
+            except APIException:
+                raise
+            except Exception as e:
+                print(f"Error searching phrases: {e}")
+                raise ValidationError(f"Search failed: {str(e)}")
 
-    @action(detail=False, methods=["post"], url_path="export")
+    @action(detail=False, methods=["post"], url_path="export", renderer_classes=EXPORT_RENDERERS)
     def export(self, request):
         """
         Export all matching phrases (no pagination) for download.
@@ -953,6 +1141,9 @@ class PhraseViewSet(ArangoModelViewSet):
         - sample_refs (optional): List of sample refs to limit results
         - sort (optional, default 'phrase_ref'): Sort field — 'phrase_ref' or 'sample'
         - field (optional, default 'both'): Text search field — 'romani', 'english', or 'both'. Ignored when phrase_ref is given.
+        - export_format (optional): 'csv', 'ndjson' or 'json' to stream the rows as a file
+          download (also selected by Accept: text/csv / application/x-ndjson). Without it
+          the rows come back as a plain JSON list, as before.
         """
         phrase_ref = request.data.get("phrase_ref", "").strip()
         query = request.data.get("query", "").strip()
@@ -965,18 +1156,14 @@ class PhraseViewSet(ArangoModelViewSet):
 
         db = request.arangodb
 
-        natsort_expr = "TO_NUMBER(REGEX_REPLACE(phrase.phrase_ref, '[^0-9].*$', '')), REGEX_REPLACE(phrase.phrase_ref, '^[0-9]+', '')"
-        sort_clauses = {
-            "phrase_ref": f"SORT {natsort_expr}, phrase.sample",
-            "sample": f"SORT phrase.sample, {natsort_expr}",
-        }
-        sort_aql = sort_clauses.get(sort, sort_clauses["phrase_ref"])
+        sort_fields = self.SORT_FIELDS.get(sort, self.SORT_FIELDS["phrase_ref"])
+        sort_aql = "SORT " + ", ".join(f"phrase.{f}" for f in sort_fields)
 
+        # sample_label is added afterwards from the cached SampleIndex
         export_fields = """
             RETURN {
                 phrase_ref: phrase.phrase_ref,
                 sample: phrase.sample,
-                sample_label: sample_label,
                 phrase: phrase.phrase,
                 english: phrase.english,
                 conjugated: phrase.conjugated,
@@ -985,10 +1172,9 @@ class PhraseViewSet(ArangoModelViewSet):
         """
 
         if phrase_ref:
-            see_hidden = user_sees_hidden_samples(request.user)
-            visibility_filter = "" if see_hidden else "FILTER s.visible == 'Yes'"
+            visibility_filter, bind = _visible_sample_filter("sp", user_sees_hidden_samples(request.user))
             sample_filter = "FILTER sp.sample IN @sample_refs" if sample_refs else ""
-            bind: dict = {"phrase_ref": phrase_ref}
+            bind["phrase_ref"] = phrase_ref
             if sample_refs:
                 bind["sample_refs"] = sample_refs
             export_aql = f"""
@@ -997,38 +1183,34 @@ class PhraseViewSet(ArangoModelViewSet):
                 FOR sp IN SamplePhrases
                     FILTER sp.phrase_ref == m.phrase_ref
                     {sample_filter}
-                    FOR s IN Samples
-                        FILTER s.sample_ref == sp.sample
-                        {visibility_filter}
-                        LET sample_label = CONCAT_SEPARATOR(', ', s.dialect_name, s.location)
-                        LET phrase = MERGE(sp, {{
-                            english: m.english,
-                            conjugated: m.conjugated
-                        }})
-                        {sort_aql}
-                        {export_fields}
+                    {visibility_filter}
+                    LET phrase = MERGE(sp, {{
+                        english: m.english,
+                        conjugated: m.conjugated
+                    }})
+                    {sort_aql}
+                    {export_fields}
             """
         else:
-            if not sample_refs:
-                if user_sees_hidden_samples(request.user):
-                    sample_refs = list(db.aql.execute("FOR s IN Samples RETURN s.sample_ref"))
-                else:
-                    sample_refs = list(db.aql.execute("FOR s IN Samples FILTER s.visible == 'Yes' RETURN s.sample_ref"))
+            if sample_refs:
+                sample_filter, sample_bind = "FILTER sp.sample IN @sample_refs", {"sample_refs": sample_refs}
+            else:
+                sample_filter, sample_bind = _visible_sample_filter("sp", user_sees_hidden_samples(request.user))
 
             query_lower = query.lower()
             search_romani = field in ("romani", "both")
             search_english = field in ("english", "both")
             bind = {
                 "query": query_lower,
-                "sample_refs": sample_refs,
                 "search_romani": search_romani,
                 "search_english": search_english,
+                **sample_bind,
             }
             export_aql = f"""
                 LET romani_keys = @search_romani ? (
                     FOR sp IN SamplePhraseSearch
                         SEARCH ANALYZER(LIKE(sp.phrase, CONCAT("%", @query, "%")), "norm_lower")
-                        FILTER sp.sample IN @sample_refs
+                        {sample_filter}
                         RETURN sp._key
                 ) : []
                 LET english_refs = @search_english ? (
@@ -1038,19 +1220,14 @@ class PhraseViewSet(ArangoModelViewSet):
                 ) : []
                 LET english_keys = @search_english ? (
                     FOR sp IN SamplePhrases
-                        FILTER sp.phrase_ref IN english_refs AND sp.sample IN @sample_refs
+                        FILTER sp.phrase_ref IN english_refs
+                        {sample_filter}
                         RETURN sp._key
                 ) : []
                 LET candidate_keys = UNIQUE(APPEND(romani_keys, english_keys))
-                LET sample_lookup = (
-                    FOR s IN Samples
-                        RETURN {{ref: s.sample_ref, label: CONCAT_SEPARATOR(', ', s.dialect_name, s.location)}}
-                )
-                LET sample_map = ZIP(sample_lookup[*].ref, sample_lookup[*].label)
                 FOR key IN candidate_keys
                     LET sp = DOCUMENT(CONCAT("SamplePhrases/", key))
                     LET m = DOCUMENT(CONCAT("MasterPhrases/", sp.phrase_ref))
-                    LET sample_label = sample_map[sp.sample]
                     LET phrase = MERGE(sp, {{
                         english: m.english,
                         conjugated: m.conjugated
@@ -1060,8 +1237,12 @@ class PhraseViewSet(ArangoModelViewSet):
             """
 
         try:
+            fmt = export_format(request)
+            if fmt:
+                cursor = db.aql.execute(export_aql, bind_vars=bind, **STREAM_CURSOR_OPTIONS)
+                return streaming_export(_iter_sample_labels(db, cursor), fmt, self.EXPORT_COLUMNS, "phrases")
             cursor = db.aql.execute(export_aql, bind_vars=bind)
-            return Response(list(cursor))
+            return Response(_add_sample_labels(db, list(cursor)))
         except Exception as e:
             print(f"Error exporting phrases: {e}")
             raise ValidationError(f"Export failed: {str(e)}")
@@ -1095,6 +1276,7 @@ class MasterPhraseViewSet(ArangoModelViewSet):
     model = MasterPhrase
     serializer_class = MasterPhraseSerializer
     http_method_names = ["get", "patch", "head", "options"]
+    etag_actions = ("retrieve",)
 
     EDITABLE_FIELDS = {"english", "conjugated", "question_ids", "category_ids"}
 
@@ -1121,8 +1303,14 @@ class MasterPhraseViewSet(ArangoModelViewSet):
                 {"error": f"No editable fields provided. Allowed: {sorted(self.EDITABLE_FIELDS)}"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        sort_key = phrase_ref_sort_key(doc.get("phrase_ref", pk))
+        if doc.get("phrase_ref_sort") != sort_key:
+            updates["phrase_ref_sort"] = sort_key
 
         db.collection(self.model.collection_name).update({"_key": pk, **updates})
+        related_response_cache.invalidate()
+        search_revisions.invalidate()
+        phrase_registry_cache.invalidate()
         updated = db.collection(self.model.collection_name).get(pk)
         serializer = self.serializer_class(updated, context={"request": request})
         return Response(serializer.data)
@@ -1140,12 +1328,17 @@ class SampleViewSet(ArangoModelViewSet):
     - GET /samples/<sample_ref>/ - Retrieve specific sample by reference
     - GET /samples/with-transcriptions/ - List samples that have transcriptions with counts
 
+    The list takes ?fields= / ?exclude= (comma-separated attributes; sample_ref
+    is always returned).
+
     Samples are identified by their sample_ref (not numeric ID).
     """
 
     serializer_class = SampleSerializer
     model = Sample
     http_method_names = ["get", "post", "patch", "delete", "head", "options"]
+    etag_actions = ("list", "retrieve", "with_transcriptions")
+    etag_collections = ("Samples", "Sources")
 
     EDITABLE_FIELDS = {
         "dialect_name", "self_attrib_name", "dialect_group_name",
@@ -1190,6 +1383,8 @@ class SampleViewSet(ArangoModelViewSet):
                     return Response({"error": "annotation keys and values must be strings"}, status=status.HTTP_400_BAD_REQUEST)
 
         db.collection(self.model.collection_name).update({"_key": doc["_key"], **updates}, merge=False)
+        sample_index_cache.invalidate()
+        search_revisions.invalidate()
         updated_cursor = db.aql.execute("""
             FOR sample IN Samples
             FILTER sample.sample_ref == @sample_ref
@@ -1215,21 +1410,34 @@ class SampleViewSet(ArangoModelViewSet):
             raise NotFound(detail="Sample not found")
         return docs[0]
 
+    def _list_aql(self, limit=""):
+        visible = "" if user_sees_hidden_samples(self.request.user) else 'FILTER s.visible == "Yes"'
+        returned, bind = project("s", self.request, required=("sample_ref",))
+        return f"FOR s IN Samples {visible} {limit} RETURN {returned}", bind
+
+    def get_list_query(self):
+        return self._list_aql("SORT s.sample_ref LIMIT @offset, @count")
+
     def get_queryset(self):
+        aql, bind = self._list_aql()
         try:
-            db = self.request.arangodb
-            collection = db.collection(self.model.collection_name)
-            if user_sees_hidden_samples(self.request.user):
-                cursor = collection.all()
-            else:
-                cursor = collection.find({"visible": "Yes"})
-            return [sample for sample in cursor]
+            return list(self.request.arangodb.aql.execute(aql, bind_vars=bind))
         except Exception:
             return []
 
     def create(self, request):
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
+    def get_etag_collections(self):
+        if self.action == "with_transcriptions":
+            return ("Transcriptions",)
+        return super().get_etag_collections()
+
+    def get_etag_extra(self, request):
+        # Toggling show_hidden_samples changes the sample set without
+        # touching any collection
+        return user_sees_hidden_samples(request.user)
+
     @action(detail=False, methods=["get"], url_path="with-transcriptions")
     def with_transcriptions(self, request):
         """
@@ -1305,24 +1513,9 @@ class SampleViewSet(ArangoModelViewSet):
         if not IsGlobalOrProjectAdmin().has_permission(request, self):
             return Response({"error": "Admin access required"}, status=403)
 
-        db = request.arangodb
-        cursor = db.aql.execute("""
-            FOR p IN Phrases
-                COLLECT ref = p.phrase_ref INTO g
-                LET doc = FIRST(g[*].p)
-                RETURN { phrase_ref: doc.phrase_ref, english: doc.english }
-        """)
-        phrases = natsorted(list(cursor), key=lambda x: x["phrase_ref"])
-
-        output = io.BytesIO()
-        wrapper = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
-        writer = csv.writer(wrapper)
-        writer.writerow(["phrase_ref", "english", "phrase", "conjugated"])
-        for p in phrases:
-            writer.writerow([p.get("phrase_ref", ""), p.get("english", ""), "", ""])
-        wrapper.flush()
-
-        response = HttpResponse(output.getvalue(), content_type="text/csv; charset=utf-8")
+        # Rendered once per MasterPhrases revision (see data.caches.PhraseRegistry)
+        template_csv = get_phrase_registry(request.arangodb).template_csv
+        response = HttpResponse(template_csv, content_type="text/csv; charset=utf-8")
         response["Content-Disposition"] = 'attachment; filename="sample_import_template.csv"'
         return response
 
@@ -1330,8 +1523,10 @@ class SampleViewSet(ArangoModelViewSet):
     def import_sample(self, request):
         """
         POST /samples/import/ — create a new sample from a CSV file + metadata form fields.
-        Full validation pass before any writes; rejects with per-row errors on failure.
-        Admin only.
+        The request is checked and queued; the run_import_worker process validates
+        every row and writes the sample (see data/imports.py). Returns 202 with the
+        batch_id, whose progress and per-row errors GET /samples/import-batch/{batch_id}/
+        reports. Admin only.
         """
         if not IsGlobalOrProjectAdmin().has_permission(request, self):
             return Response({"error": "Admin access required"}, status=403)
@@ -1370,213 +1565,36 @@ class SampleViewSet(ArangoModelViewSet):
         if not csv_file:
             return Response({"error": "CSV file is required"}, status=400)
 
-        raw = csv_file.read()
-        for encoding in ("utf-8-sig", "utf-8", "cp1252", "latin-1"):
-            try:
-                text = raw.decode(encoding)
-                break
-            except (UnicodeDecodeError, LookupError):
-                continue
-
+        upload_path = imports.save_upload(csv_file)
         try:
-            try:
-                dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t|")
-            except csv.Error:
-                dialect = csv.excel
-            reader = csv.DictReader(io.StringIO(text), dialect=dialect)
-            rows = list(reader)
-            fieldnames = reader.fieldnames or []
-        except Exception as exc:
-            return Response({"error": f"Could not parse CSV: {exc}"}, status=400)
+            encoding = imports.check_upload(upload_path)
+        except imports.ImportRejectedError as exc:
+            imports.remove_upload(upload_path)
+            return Response(exc.body, status=400)
 
-        if not fieldnames:
-            return Response({"error": "CSV file appears to be empty or has no header row"}, status=400)
-
-        required_cols = {"phrase_ref", "phrase"}
-        missing = required_cols - set(fieldnames)
-        if missing:
-            return Response({
-                "error": f"CSV is missing required column(s): {', '.join(sorted(missing))}. "
-                         f"Found columns: {', '.join(fieldnames)}"
-            }, status=400)
+        params = {field: request.data.get(field) or "" for field in imports.SAMPLE_FIELDS}
+        params["visible"] = request.data.get("visible", "No")
+        params["migrant"] = request.data.get("migrant", "No")
+        params["skip_empty"] = request.data.get("skip_empty") in ("true", "1", "yes")
 
         try:
-            canonical_refs = set(db.aql.execute(
-                "FOR p IN Phrases COLLECT ref = p.phrase_ref RETURN ref"
-            ))
+            batch = imports.queue_import(
+                db, sample_ref, upgrade, upload_path, encoding, params, request.user.username
+            )
         except Exception as exc:
-            return Response({"error": f"Database error loading phrase references: {exc}"}, status=500)
-
-        errors = []
-        phrases_to_create = []
-
-        for i, row in enumerate(rows, start=2):
-            phrase_ref = (row.get("phrase_ref") or "").strip()
-            phrase = (row.get("phrase") or "").strip()
-            english = (row.get("english") or "").strip()
-            conjugated_raw = (row.get("conjugated") or "").strip().lower()
-
-            if not phrase_ref:
-                errors.append({"row": i, "phrase_ref": "", "message": "phrase_ref is empty"})
-                continue
-            if phrase_ref not in canonical_refs:
-                errors.append({
-                    "row": i,
-                    "phrase_ref": phrase_ref,
-                    "message": f"phrase_ref '{phrase_ref}' does not exist in the canonical phrase list",
-                })
-                continue
-            if not phrase:
-                if request.data.get("skip_empty") in ("true", "1", "yes"):
-                    continue
-                errors.append({
-                    "row": i,
-                    "phrase_ref": phrase_ref,
-                    "message": "phrase column is empty — Romani text is required (or enable 'Skip empty phrases')",
-                })
-                continue
-
-            conjugated = None
-            if conjugated_raw in ("y", "yes", "true", "1"):
-                conjugated = True
-            elif conjugated_raw in ("n", "no", "false", "0"):
-                conjugated = False
-            elif conjugated_raw:
-                errors.append({
-                    "row": i,
-                    "phrase_ref": phrase_ref,
-                    "message": f"conjugated value '{row.get('conjugated', '')}' is not recognised — use Y, N, or leave blank",
-                })
-                continue
-
-            phrases_to_create.append({
-                "phrase_ref": phrase_ref,
-                "phrase": phrase,
-                "english": english,
-                "conjugated": conjugated,
-                "sample": sample_ref,
-            })
-
-        if errors:
-            return Response({"errors": errors}, status=400)
-
-        skipped_empty_count = len(rows) - len(phrases_to_create) - len(errors)
-
-        if not phrases_to_create:
-            return Response({"error": "CSV contains no phrase rows after the header"}, status=400)
-
-        batch_id = str(uuid.uuid4())
-        now = datetime.utcnow().isoformat()
-
-        # ── Create mode ──────────────────────────────────────────────────────
-        if not upgrade:
-            sample_doc = {
-                "sample_ref": sample_ref,
-                "dialect_name": (request.data.get("dialect_name") or "").strip(),
-                "self_attrib_name": (request.data.get("self_attrib_name") or "").strip(),
-                "dialect_group_name": (request.data.get("dialect_group_name") or "").strip(),
-                "location": (request.data.get("location") or "").strip(),
-                "country_code": (request.data.get("country_code") or "").strip(),
-                "visible": request.data.get("visible", "No"),
-                "migrant": request.data.get("migrant", "No"),
-                "source_type": (request.data.get("source_type") or "").strip(),
-                "import_batch_id": batch_id,
-            }
-            try:
-                db.collection("Samples").insert(sample_doc)
-            except Exception as exc:
-                return Response({"error": f"Failed to insert sample document: {exc}"}, status=500)
-
-            for p in phrases_to_create:
-                p["import_batch_id"] = batch_id
-
-            try:
-                db.collection("Phrases").insert_many(phrases_to_create)
-            except Exception as exc:
-                try:
-                    db.aql.execute(
-                        "FOR s IN Samples FILTER s.import_batch_id == @bid REMOVE s IN Samples",
-                        bind_vars={"bid": batch_id},
-                    )
-                except Exception:
-                    pass
-                return Response({"error": f"Failed to insert phrases: {exc}"}, status=500)
-
-            inserted_count = len(phrases_to_create)
-            updated_count = 0
-            rollback_updates = []
-
-        # ── Upgrade mode ─────────────────────────────────────────────────────
-        else:
-            # Load existing phrases for this sample keyed by phrase_ref
-            try:
-                existing_cursor = db.aql.execute(
-                    "FOR p IN Phrases FILTER p.sample == @s "
-                    "RETURN {phrase_ref: p.phrase_ref, _key: p._key, "
-                    "phrase: p.phrase, english: p.english, conjugated: p.conjugated}",
-                    bind_vars={"s": sample_ref},
-                )
-                existing_by_ref = {p["phrase_ref"]: p for p in existing_cursor}
-            except Exception as exc:
-                return Response({"error": f"Database error loading existing phrases: {exc}"}, status=500)
-
-            to_insert = []
-            to_update = []
-            rollback_updates = []  # stores old values so rollback can restore them
-
-            for p in phrases_to_create:
-                ref = p["phrase_ref"]
-                if ref in existing_by_ref:
-                    old = existing_by_ref[ref]
-                    rollback_updates.append({
-                        "_key": old["_key"],
-                        "phrase": old.get("phrase"),
-                        "english": old.get("english"),
-                        "conjugated": old.get("conjugated"),
-                    })
-                    to_update.append({"_key": old["_key"], "phrase": p["phrase"],
-                                      "english": p["english"], "conjugated": p["conjugated"],
-                                      "import_batch_id": batch_id})
-                else:
-                    p["import_batch_id"] = batch_id
-                    to_insert.append(p)
-
-            try:
-                if to_insert:
-                    db.collection("Phrases").insert_many(to_insert)
-                for upd in to_update:
-                    db.collection("Phrases").update(upd)
-            except Exception as exc:
-                return Response({"error": f"Failed to write phrases: {exc}"}, status=500)
-
-            inserted_count = len(to_insert)
-            updated_count = len(to_update)
-
-        batch_record = {
-            "batch_id": batch_id,
-            "sample_ref": sample_ref,
-            "phrase_count": inserted_count,
-            "updated_count": updated_count,
-            "skipped_empty_count": skipped_empty_count,
-            "created_at": now,
-            "created_by": request.user.username,
-            "upgrade": upgrade,
-            "rolled_back": False,
-            "rollback_updates": rollback_updates,
-        }
-        try:
-            db.collection("ImportBatches").insert(batch_record)
-        except Exception:
-            pass
+            imports.remove_upload(upload_path)
+            return Response({"error": f"Could not queue import: {exc}"}, status=500)
 
         return Response({
-            "batch_id": batch_id,
+            "batch_id": batch["batch_id"],
             "sample_ref": sample_ref,
-            "phrase_count": inserted_count,
-            "updated_count": updated_count,
-            "skipped_count": skipped_empty_count,
-            "created_at": now,
-        }, status=201)
+            "status": batch["status"],
+            "upgrade": upgrade,
+            "created_at": batch["created_at"],
+            "status_url": reverse(
+                "samples-rollback-import-batch", kwargs={"batch_id": batch["batch_id"]}, request=request
+            ),
+        }, status=202)
 
     @action(
         detail=False,
@@ -1593,67 +1611,105 @@ class SampleViewSet(ArangoModelViewSet):
 
         db = request.arangodb
 
-        # Load batch record to get stored old values for updated phrases
+        # All of the rollback commits together, or nothing is undone
         try:
-            batch_cursor = db.aql.execute(
-                "FOR b IN ImportBatches FILTER b.batch_id == @bid RETURN b",
-                bind_vars={"bid": batch_id},
-            )
-            batch_docs = list(batch_cursor)
-        except Exception:
-            batch_docs = []
+            with stream_transaction(db, write=["Samples", "Phrases", "ImportBatches"]) as txn:
+                # Load batch record to get stored old values for updated phrases
+                batch_docs = list(txn.aql.execute(
+                    "FOR b IN ImportBatches FILTER b.batch_id == @bid RETURN b",
+                    bind_vars={"bid": batch_id},
+                ))
+                batch_doc = batch_docs[0] if batch_docs else {}
+
+                if batch_doc.get("rolled_back"):
+                    return Response({"error": "This import has already been rolled back"}, status=400)
+                if batch_doc.get("status") in imports.ACTIVE_STATUSES:
+                    return Response({"error": "This import is still in progress"}, status=409)
+                if batch_doc.get("status") == imports.FAILED:
+                    return Response({"error": "This import failed; nothing was written"}, status=400)
+
+                # Previously existing phrases the import updated, with their old values
+                restores = [
+                    {
+                        "_key": old["_key"],
+                        "phrase": old.get("phrase"),
+                        "english": old.get("english"),
+                        "conjugated": old.get("conjugated"),
+                        "updated_by_batch_id": None,
+                    }
+                    for old in batch_doc.get("rollback_updates", [])
+                ]
+
+                # Delete newly inserted phrases (tagged with batch_id). Updated
+                # ones are excluded: imports made before they were tagged
+                # separately carry the batch_id too, and must be restored instead
+                phrases_cursor = txn.aql.execute(
+                    "FOR p IN Phrases FILTER p.import_batch_id == @bid AND p._key NOT IN @restored "
+                    "REMOVE p IN Phrases RETURN 1",
+                    bind_vars={"bid": batch_id, "restored": [r["_key"] for r in restores]},
+                )
+                deleted_phrases = len(list(phrases_cursor))
 
-        batch_doc = batch_docs[0] if batch_docs else {}
+                # Restore previously updated phrases to their old values
+                restore_errors = bulk_update(txn.collection("Phrases"), restores)
+                if restore_errors:
+                    raise BulkWriteError(restore_errors)
 
-        if batch_doc.get("rolled_back"):
-            return Response({"error": "This import has already been rolled back"}, status=400)
+                # Delete the sample document (only present in non-upgrade imports)
+                sample_cursor = txn.aql.execute(
+                    "FOR s IN Samples FILTER s.import_batch_id == @bid REMOVE s IN Samples RETURN s.sample_ref",
+                    bind_vars={"bid": batch_id},
+                )
+                deleted_samples = list(sample_cursor)
 
-        # Delete newly inserted phrases (tagged with batch_id)
-        phrases_cursor = db.aql.execute(
-            "FOR p IN Phrases FILTER p.import_batch_id == @bid REMOVE p IN Phrases RETURN 1",
-            bind_vars={"bid": batch_id},
-        )
-        deleted_phrases = len(list(phrases_cursor))
+                txn.aql.execute(
+                    "FOR b IN ImportBatches FILTER b.batch_id == @bid "
+                    "UPDATE b WITH {rolled_back: true, rolled_back_at: @ts} IN ImportBatches",
+                    bind_vars={"bid": batch_id, "ts": datetime.utcnow().isoformat()},
+                )
+        except BulkWriteError as exc:
+            return Response({"error": f"Rollback failed, nothing was undone: {exc}", "errors": exc.errors}, status=500)
+        except Exception as exc:
+            return Response({"error": f"Rollback failed, nothing was undone: {exc}"}, status=500)
 
-        # Restore previously updated phrases to their old values
-        restored_count = 0
-        for old in batch_doc.get("rollback_updates", []):
-            try:
-                db.collection("Phrases").update({
-                    "_key": old["_key"],
-                    "phrase": old.get("phrase"),
-                    "english": old.get("english"),
-                    "conjugated": old.get("conjugated"),
-                })
-                restored_count += 1
-            except Exception:
-                pass
-
-        # Delete the sample document (only present in non-upgrade imports)
-        sample_cursor = db.aql.execute(
-            "FOR s IN Samples FILTER s.import_batch_id == @bid REMOVE s IN Samples RETURN s.sample_ref",
-            bind_vars={"bid": batch_id},
-        )
-        deleted_samples = list(sample_cursor)
+        related_response_cache.invalidate()
+        search_revisions.invalidate()
+        if deleted_samples:
+            sample_index_cache.invalidate()
 
         if not batch_docs and not deleted_samples and deleted_phrases == 0:
             return Response({"error": "Import batch not found"}, status=404)
 
-        try:
-            db.aql.execute(
-                "FOR b IN ImportBatches FILTER b.batch_id == @bid "
-                "UPDATE b WITH {rolled_back: true, rolled_back_at: @ts} IN ImportBatches",
-                bind_vars={"bid": batch_id, "ts": datetime.utcnow().isoformat()},
-            )
-        except Exception:
-            pass
-
         return Response({
             "deleted_sample": deleted_samples[0] if deleted_samples else None,
             "deleted_phrases": deleted_phrases,
-            "restored_phrases": restored_count,
+            "restored_phrases": len(restores),
         })
 
+    @rollback_import_batch.mapping.get
+    def import_status(self, request, batch_id=None):
+        """
+        GET /samples/import-batch/{batch_id}/ — status of a queued import: queued,
+        validating (rows_checked of rows_total), writing, done (with the counts) or
+        failed (with error / per-row errors). Admin only.
+        """
+        if not IsGlobalOrProjectAdmin().has_permission(request, self):
+            return Response({"error": "Admin access required"}, status=403)
+
+        db = request.arangodb
+        try:
+            batch = next(db.aql.execute(
+                "FOR b IN ImportBatches FILTER b.batch_id == @bid "
+                "RETURN UNSET(b, @internal, 'rollback_updates')",
+                bind_vars={"bid": batch_id, "internal": imports.INTERNAL_FIELDS},
+            ), None)
+        except Exception as exc:
+            return Response({"error": f"Database error loading import batch: {exc}"}, status=500)
+        if batch is None:
+            return Response({"error": "Import batch not found"}, status=404)
+        batch.setdefault("status", imports.DONE)
+        return Response(batch)
+
     @action(detail=False, methods=["get"], url_path="import-history")
     def import_history(self, request):
         """
@@ -1666,7 +1722,8 @@ class SampleViewSet(ArangoModelViewSet):
         db = request.arangodb
         try:
             cursor = db.aql.execute(
-                "FOR b IN ImportBatches SORT b.created_at DESC RETURN b"
+                "FOR b IN ImportBatches SORT b.created_at DESC RETURN UNSET(b, @internal)",
+                bind_vars={"internal": imports.INTERNAL_FIELDS},
             )
             return Response(list(cursor))
         except Exception:
@@ -1702,6 +1759,8 @@ class AnswerViewSet(ArangoModelViewSet):
     - search: Field-based filters - "question_id,field,value" format only
     - s: Sample reference(s) - multiple values allowed
     - include_hidden: Set to "true" to include answers from non-visible samples (default: false)
+    - fields / exclude: Comma-separated answer attributes to return / leave out (q lookups;
+      sample is always returned)
 
     By default, only answers from visible samples are returned.
 
@@ -1759,6 +1818,7 @@ class AnswerViewSet(ArangoModelViewSet):
             )
 
         db.collection(self.model.collection_name).update({"_key": pk, **updates}, keep_none=False)
+        related_response_cache.invalidate()
         updated = db.collection(self.model.collection_name).get(pk)
         serializer = self.serializer_class(updated, context={"request": request})
         return Response(serializer.data)
@@ -1949,20 +2009,11 @@ class AnswerViewSet(ArangoModelViewSet):
 
     def validate_samples(self, sample_refs):
         """Validate all sample references exist"""
-        db = self.request.arangodb
-        aql = "FOR s IN Samples FILTER s.sample_ref IN @sample_refs RETURN s.sample_ref"
-        cursor = db.aql.execute(aql, bind_vars={"sample_refs": sample_refs})
-        existing_samples = [ref for ref in cursor]
-        missing_samples = set(sample_refs) - set(existing_samples)
+        known_samples = get_sample_index(self.request.arangodb).labels
+        missing_samples = {ref for ref in sample_refs if ref not in known_samples}
         if missing_samples:
             raise NotFound(detail=f"Samples not found: {sorted(missing_samples)}")
 
-    def get_visible_sample_refs(self):
-        """Get list of visible sample references for filtering."""
-        db = self.request.arangodb
-        cursor = db.aql.execute('FOR s IN Samples FILTER s.visible == "Yes" RETURN s.sample_ref')
-        return [ref for ref in cursor]
-
     def include_hidden(self):
         """Check if the request asks to include hidden (non-visible) samples."""
         # Global admin preference takes precedence
@@ -1997,12 +2048,14 @@ class AnswerViewSet(ArangoModelViewSet):
                 filters.append("FILTER answer.sample IN @samples")
                 bind_vars["samples"] = sample_refs
 
-            if not self.include_hidden():
-                visible_refs = self.get_visible_sample_refs()
-                filters.append("FILTER answer.sample IN @visible_samples")
-                bind_vars["visible_samples"] = visible_refs
+            hidden_filter, hidden_bind = _visible_sample_filter("answer", self.include_hidden())
+            if hidden_filter:
+                filters.append(hidden_filter)
+                bind_vars.update(hidden_bind)
 
             filter_clause = "\n                ".join(filters)
+            returned, projection_bind = project("a", self.request, required=("sample",))
+            bind_vars.update(projection_bind)
 
             if operator == "AND" and len(question_ids) > 1:
                 # Only return answers for samples that have answers to ALL selected questions
@@ -2022,7 +2075,7 @@ class AnswerViewSet(ArangoModelViewSet):
                 )
                 FOR a IN all_answers
                   FILTER a.sample IN qualified_samples
-                  RETURN a
+                  RETURN {returned}
                 """
             else:
                 aql = f"""
@@ -2030,7 +2083,8 @@ class AnswerViewSet(ArangoModelViewSet):
                   FILTER question.id IN @question_ids
                   FOR answer IN 1..1 OUTBOUND question GivesAnswer
                     {filter_clause}
-                    RETURN MERGE(answer, {{question_id: question.id}})
+                    LET a = MERGE(answer, {{question_id: question.id}})
+                    RETURN {returned}
                 """
 
             cursor = db.aql.execute(aql, bind_vars=bind_vars)
@@ -2094,9 +2148,8 @@ class AnswerViewSet(ArangoModelViewSet):
                 bind_vars["sample_refs"] = sample_refs
 
             if not self.include_hidden():
-                visible_refs = self.get_visible_sample_refs()
-                extra_filters += " AND answer.sample IN @visible_samples"
-                bind_vars["visible_samples"] = visible_refs
+                extra_filters += f" AND {_sample_visible_expr('answer')}"
+                bind_vars["show_hidden_samples"] = False
 
             # Build final AQL query
             aql = f"""
@@ -2180,6 +2233,11 @@ class TranscriptionViewSet(ArangoModelViewSet):
 
     EDITABLE_FIELDS = {"transcription", "english", "gloss", "segment_no"}
 
+    # Search/export ordering (both `sort` options), backed by the
+    # (sample, segment_no) persistent index
+    SORT_FIELDS = ("sample", "segment_no")
+    EXPORT_COLUMNS = ["sample", "sample_label", "segment_no", "transcription", "english", "gloss"]
+
     def get_permissions(self):
         if self.request.method == "PATCH":
             return [CanEditSample()]
@@ -2215,10 +2273,25 @@ class TranscriptionViewSet(ArangoModelViewSet):
             )
 
         db.collection(self.model.collection_name).update({"_key": pk, **updates})
+        related_response_cache.invalidate()
+        search_revisions.invalidate()
         updated = db.collection(self.model.collection_name).get(pk)
         serializer = self.serializer_class(updated, context={"request": request})
         return Response(serializer.data)
 
+    def get_list_query(self):
+        sample = self.request.query_params.get("sample")
+        if not sample:
+            raise NotFound(detail="Sample parameter is required to fetch transcriptions")
+        aql = """
+            FOR transcription IN Transcriptions
+                FILTER transcription.sample == @sample
+                SORT transcription.segment_no ASC
+                LIMIT @offset, @count
+                RETURN transcription
+        """
+        return aql, {"sample": sample}
+
     def get_queryset(self):
         try:
             sample = self.request.query_params.get("sample")
@@ -2304,24 +2377,55 @@ class TranscriptionViewSet(ArangoModelViewSet):
             print(f"Error fetching transcriptions for answer: {e}")
             raise NotFound(detail="Error retrieving transcriptions")
 
+    # Transcription resolution shared by the helpers below and
+    # RelatedContentViewSet.RELATED_AQL. Expects @category_id and @sample
+    # bound and hierarchy_ids, transcription_include and
+    # transcription_exclude defined before it; leaves the rows in
+    # `transcriptions`: the included _keys (Answer.transcription_overrides,
+    # still sample-scoped) if any, otherwise the direct question_ids/
+    # category_ids match.
+    RESOLVE_TRANSCRIPTIONS_AQL = """
+        LET included_transcriptions = (
+            FOR key IN transcription_include
+                FILTER key NOT IN transcription_exclude
+                LET t = DOCUMENT(CONCAT("Transcriptions/", key))
+                FILTER t != null AND t.sample == @sample
+                RETURN t
+        )
+        LET matched_transcriptions = (
+            FILTER LENGTH(transcription_include) == 0 AND hierarchy_ids != null
+            FOR transcription IN Transcriptions
+                FILTER transcription.sample == @sample
+                FILTER (@category_id IN (transcription.question_ids || [])
+                        OR LENGTH(INTERSECTION(transcription.category_ids || [], hierarchy_ids)) > 0)
+                    AND transcription._key NOT IN transcription_exclude
+                RETURN transcription
+        )
+        LET transcriptions = APPEND(included_transcriptions, matched_transcriptions)
+    """
+
+    def _query_transcriptions(self, db, sample, category_id, hierarchy_ids, include, exclude):
+        """Run RESOLVE_TRANSCRIPTIONS_AQL on its own."""
+        aql = f"""
+            LET hierarchy_ids = @hierarchy_ids
+            LET transcription_include = @include
+            LET transcription_exclude = @exclude
+            {self.RESOLVE_TRANSCRIPTIONS_AQL}
+            FOR transcription IN transcriptions
+                RETURN transcription
+        """
+        return list(db.aql.execute(aql, bind_vars={
+            'category_id': category_id, 'sample': sample, 'hierarchy_ids': hierarchy_ids,
+            'include': include, 'exclude': exclude,
+        }))
+
     def _resolve_transcriptions(self, db, sample, question_id, include, exclude):
         """Resolves the transcription list for a question_id: via
         Answer.transcription_overrides.include (exact Transcription _keys)
-        if set, otherwise via _transcriptions_by_category. Shared by
-        by_answer and RelatedContentViewSet."""
+        if set, otherwise via _transcriptions_by_category. Used by
+        by_answer."""
         if include:
-            aql = """
-                FOR key IN @include
-                    FILTER key NOT IN @exclude
-                    LET t = DOCUMENT(CONCAT("Transcriptions/", key))
-                    FILTER t != null AND t.sample == @sample
-                    RETURN t
-            """
-            return list(db.aql.execute(aql, bind_vars={
-                'include': include,
-                'exclude': exclude,
-                'sample': sample,
-            }))
+            return self._query_transcriptions(db, sample, question_id, None, include, exclude)
         return self._transcriptions_by_category(db, question_id, sample, exclude=exclude)
 
     def _transcriptions_by_category(self, db, category_id, sample, exclude=None):
@@ -2331,22 +2435,10 @@ class TranscriptionViewSet(ArangoModelViewSet):
         question_overrides layer here — just the direct question_ids/
         category_ids match. Shared by by_answer's question/category branch
         and by_category."""
-        exclude = exclude or []
         hierarchy_ids = _get_question_hierarchy_ids(db, category_id)
         if hierarchy_ids is None:
             return []
-
-        aql = """
-            FOR transcription IN Transcriptions
-                FILTER transcription.sample == @sample
-                FILTER (@category_id IN (transcription.question_ids || [])
-                        OR LENGTH(INTERSECTION(transcription.category_ids || [], @hierarchy_ids)) > 0)
-                    AND transcription._key NOT IN @exclude
-                RETURN transcription
-        """
-        return list(db.aql.execute(aql, bind_vars={
-            'sample': sample, 'category_id': category_id, 'hierarchy_ids': hierarchy_ids, 'exclude': exclude,
-        }))
+        return self._query_transcriptions(db, sample, category_id, hierarchy_ids, [], exclude or [])
 
     @action(detail=False, methods=["get"], url_path="by-category")
     def by_category(self, request):
@@ -2376,15 +2468,14 @@ class TranscriptionViewSet(ArangoModelViewSet):
             except (TypeError, ValueError):
                 raise ValidationError("category_id must be an integer")
 
-            db = request.arangodb
-            transcriptions = self._transcriptions_by_category(db, category_id, sample)
-
-            if not transcriptions:
-                return Response([])
-
-            transcriptions.sort(key=lambda x: x.get("segment_no", 0))
-            serializer = self.serializer_class(transcriptions, many=True, context={"request": request})
-            return Response(serializer.data)
+            cache_key = ("transcriptions", category_id, sample)
+            data = related_response_cache.get(request.arangodb, cache_key)
+            if data is None:
+                transcriptions = self._transcriptions_by_category(request.arangodb, category_id, sample)
+                transcriptions.sort(key=lambda x: x.get("segment_no", 0))
+                data = self.serializer_class(transcriptions, many=True, context={"request": request}).data
+                related_response_cache.set(request.arangodb, cache_key, data)
+            return Response(data)
 
         except (NotFound, ValidationError):
             raise
@@ -2392,14 +2483,16 @@ class TranscriptionViewSet(ArangoModelViewSet):
             print(f"Error fetching transcriptions for category: {e}")
             raise NotFound(detail="Error retrieving transcriptions")
 
-    def _get_visible_sample_refs(self, request):
-        """Get sample refs respecting the show_hidden_samples preference."""
-        db = request.arangodb
-        if user_sees_hidden_samples(request.user):
-            cursor = db.aql.execute("FOR s IN Samples RETURN s.sample_ref")
-        else:
-            cursor = db.aql.execute("FOR s IN Samples FILTER s.visible == 'Yes' RETURN s.sample_ref")
-        return list(cursor)
+    def _next_cursor(self, rows):
+        """Continuation token positioned after the last of rows."""
+        return encode_cursor(rows[-1].get(f) for f in self.SORT_FIELDS)
+
+    def _sample_filter(self, request, sample_refs):
+        """FILTER + bind vars scoping `t` to sample_refs, or (if none given)
+        to the samples this user may see."""
+        if sample_refs:
+            return "FILTER t.sample IN @sample_refs", {"sample_refs": sample_refs}
+        return _visible_sample_filter("t", user_sees_hidden_samples(request.user))
 
     @action(detail=False, methods=["post"], url_path="search")
     def search(self, request):
@@ -2413,13 +2506,22 @@ class TranscriptionViewSet(ArangoModelViewSet):
         - page (optional, default 1): Page number
         - page_size (optional, default 50, max 200): Results per page
         - field (optional, default 'both'): 'romani', 'english', or 'both'
+        - cursor (optional): next_cursor from a previous response. Returns the page after it
+          (keyset filter on (sample, segment_no) instead of an offset; `page` is ignored and no
+          count is returned). The filter runs over the search view's matches, not an index range.
+        - fields / exclude (optional): Attributes to return / leave out of each result (list or
+          comma-separated), applied in the query. sample and segment_no are always returned.
+
+        Count and page come from a single query; the ordered match list is
+        reused for SEARCH_CANDIDATE_CACHE_TTL seconds while paging. Paged
+        responses include next_cursor (null on the last page).
         """
         query = request.data.get("query", "").strip()
         if not query or len(query) < 2:
             raise ValidationError("Query must be at least 2 characters")
+        cursor = request.data.get("cursor") or None
 
         sample_refs = request.data.get("sample_refs", [])
-        sort = request.data.get("sort", "segment_no")
         field = request.data.get("field", "both")
         page = int(request.data.get("page", 1))
         page_size = min(int(request.data.get("page_size", 50)), 200)
@@ -2428,14 +2530,11 @@ class TranscriptionViewSet(ArangoModelViewSet):
         db = request.arangodb
         query_lower = query.lower()
 
-        sort_clauses = {
-            "segment_no": "SORT t.sample, t.segment_no",
-            "sample": "SORT t.sample, t.segment_no",
-        }
-        sort_aql = sort_clauses.get(sort, sort_clauses["segment_no"])
+        sort_aql = "SORT " + ", ".join(f"t.{f}" for f in self.SORT_FIELDS)
+        # The sort key is needed for next_cursor, sample for sample_label
+        returned, projection_bind = project("t", request, required=self.SORT_FIELDS)
 
-        if not sample_refs:
-            sample_refs = self._get_visible_sample_refs(request)
+        sample_filter, sample_bind = self._sample_filter(request, sample_refs)
 
         if field == "romani":
             like_expr = 'LIKE(t.transcription, CONCAT("%", @query, "%"))'
@@ -2445,39 +2544,46 @@ class TranscriptionViewSet(ArangoModelViewSet):
             like_expr = 'LIKE(t.transcription, CONCAT("%", @query, "%")) OR LIKE(t.english, CONCAT("%", @query, "%"))'
         search_filter = f'SEARCH ANALYZER({like_expr}, "norm_lower")'
 
-        count_aql = f"""
-            FOR t IN TranscriptionSearch
-                {search_filter}
-                FILTER t.sample IN @sample_refs
-                COLLECT WITH COUNT INTO total
-                RETURN total
-        """
-
-        results_aql = f"""
-            LET sample_lookup = (
-                FOR s IN Samples
-                    RETURN {{ref: s.sample_ref, label: CONCAT_SEPARATOR(', ', s.dialect_name, s.location)}}
+        ordered_ids_aql = f"""
+            LET ordered_ids = (
+                FOR t IN TranscriptionSearch
+                    {search_filter}
+                    {sample_filter}
+                    {sort_aql}
+                    RETURN t._id
             )
-            LET sample_map = ZIP(sample_lookup[*].ref, sample_lookup[*].label)
-            FOR t IN TranscriptionSearch
-                {search_filter}
-                FILTER t.sample IN @sample_refs
-                {sort_aql}
-                LIMIT @offset, @page_size
-                RETURN MERGE(t, {{
-                    sample_label: sample_map[t.sample]
-                }})
         """
-
-        count_bind = {"query": query_lower, "sample_refs": sample_refs}
-        results_bind = {"query": query_lower, "sample_refs": sample_refs, "offset": offset, "page_size": page_size}
+        row_aql = f"LET t = DOCUMENT(id) FILTER t != null RETURN {returned}"
+        bind = {"query": query_lower, **sample_bind}
 
         try:
-            count_cursor = db.aql.execute(count_aql, bind_vars=count_bind)
-            total = next(count_cursor, 0)
+            if cursor:
+                after = decode_cursor(cursor, len(self.SORT_FIELDS))
+                after_aql = f"""
+                    FOR t IN TranscriptionSearch
+                        {search_filter}
+                        {sample_filter}
+                        {keyset_filter("t", self.SORT_FIELDS)}
+                        {sort_aql}
+                        LIMIT @limit
+                        RETURN {returned}
+                """
+                rows = list(db.aql.execute(after_aql, bind_vars={
+                    **bind, **projection_bind, **keyset_bind(after), "limit": page_size + 1,
+                }))
+                results = _add_sample_labels(db, rows[:page_size])
+                serializer = self.serializer_class(results, many=True, context={"request": request})
+                return Response({
+                    "page_size": page_size,
+                    "results": serializer.data,
+                    "next_cursor": self._next_cursor(results) if len(rows) > page_size else None,
+                })
 
-            results_cursor = db.aql.execute(results_aql, bind_vars=results_bind)
-            results = list(results_cursor)
+            cache_key = ("transcriptions", field, json.dumps(bind, sort_keys=True))
+            total, results = _search_page(
+                db, cache_key, ordered_ids_aql, row_aql, bind, offset, page_size, row_bind=projection_bind,
+            )
+            results = _add_sample_labels(db, results)
 
             serializer = self.serializer_class(
                 results, many=True, context={"request": request}
@@ -2488,36 +2594,37 @@ class TranscriptionViewSet(ArangoModelViewSet):
                 "page": page,
                 "page_size": page_size,
                 "results": serializer.data,
+                "next_cursor": self._next_cursor(results) if offset + len(results) < total else None,
             })
+        except ValidationError:
+            raise
         except Exception as e:
             print(f"Error searching transcriptions: {e}")
             raise ValidationError(f"Search failed: {str(e)}")
 
-    @action(detail=False, methods=["post"], url_path="export")
+    @action(detail=False, methods=["post"], url_path="export", renderer_classes=EXPORT_RENDERERS)
     def export(self, request):
         """
         Export all matching transcriptions (no pagination) for download.
         Same parameters as search but returns all results.
+
+        - export_format (optional): 'csv', 'ndjson' or 'json' to stream the rows as a file
+          download (also selected by Accept: text/csv / application/x-ndjson). Without it
+          the rows come back as a plain JSON list, as before.
         """
         query = request.data.get("query", "").strip()
         if not query or len(query) < 2:
             raise ValidationError("Query must be at least 2 characters")
 
         sample_refs = request.data.get("sample_refs", [])
-        sort = request.data.get("sort", "segment_no")
         field = request.data.get("field", "both")
 
         db = request.arangodb
         query_lower = query.lower()
 
-        sort_clauses = {
-            "segment_no": "SORT t.sample, t.segment_no",
-            "sample": "SORT t.sample, t.segment_no",
-        }
-        sort_aql = sort_clauses.get(sort, sort_clauses["segment_no"])
+        sort_aql = "SORT " + ", ".join(f"t.{f}" for f in self.SORT_FIELDS)
 
-        if not sample_refs:
-            sample_refs = self._get_visible_sample_refs(request)
+        sample_filter, sample_bind = self._sample_filter(request, sample_refs)
 
         if field == "romani":
             like_expr = 'LIKE(t.transcription, CONCAT("%", @query, "%"))'
@@ -2527,19 +2634,14 @@ class TranscriptionViewSet(ArangoModelViewSet):
             like_expr = 'LIKE(t.transcription, CONCAT("%", @query, "%")) OR LIKE(t.english, CONCAT("%", @query, "%"))'
         search_filter = f'SEARCH ANALYZER({like_expr}, "norm_lower")'
 
+        # sample_label is added afterwards from the cached SampleIndex
         export_aql = f"""
-            LET sample_lookup = (
-                FOR s IN Samples
-                    RETURN {{ref: s.sample_ref, label: CONCAT_SEPARATOR(', ', s.dialect_name, s.location)}}
-            )
-            LET sample_map = ZIP(sample_lookup[*].ref, sample_lookup[*].label)
             FOR t IN TranscriptionSearch
                 {search_filter}
-                FILTER t.sample IN @sample_refs
+                {sample_filter}
                 {sort_aql}
                 RETURN {{
                     sample: t.sample,
-                    sample_label: sample_map[t.sample],
                     segment_no: t.segment_no,
                     transcription: t.transcription,
                     english: t.english,
@@ -2547,9 +2649,14 @@ class TranscriptionViewSet(ArangoModelViewSet):
                 }}
         """
 
+        bind = {"query": query_lower, **sample_bind}
         try:
-            cursor = db.aql.execute(export_aql, bind_vars={"query": query_lower, "sample_refs": sample_refs})
-            return Response(list(cursor))
+            fmt = export_format(request)
+            if fmt:
+                cursor = db.aql.execute(export_aql, bind_vars=bind, **STREAM_CURSOR_OPTIONS)
+                return streaming_export(_iter_sample_labels(db, cursor), fmt, self.EXPORT_COLUMNS, "transcriptions")
+            cursor = db.aql.execute(export_aql, bind_vars=bind)
+            return Response(_add_sample_labels(db, list(cursor)))
         except Exception as e:
             print(f"Error exporting transcriptions: {e}")
             raise ValidationError(f"Export failed: {str(e)}")
@@ -2564,6 +2671,11 @@ class RelatedContentViewSet(ViewSet):
 
     GET /related/?category_id=<id>&sample=<sample_ref>&answer_key=<optional>
 
+    Everything — the Answer, the question hierarchy and both content
+    lists — comes back from one AQL query (RELATED_AQL), so a cell click
+    costs a single database round trip; repeat clicks are served from
+    related_response_cache until one of the collections it reads changes.
+
     If answer_key is given, that Answer is fetched once and reused to
     decide — independently for phrases and transcriptions — whether to
     honor its phrase_overrides/transcription_overrides (the ~65 "divergent
@@ -2577,6 +2689,28 @@ class RelatedContentViewSet(ViewSet):
 
     permission_classes = [AllowAny]
 
+    # PhraseViewSet.RESOLVE_PHRASES_AQL and
+    # TranscriptionViewSet.RESOLVE_TRANSCRIPTIONS_AQL (the queries behind
+    # by-answer and by-category) in one query, with the Answer lookup and
+    # the question hierarchy resolved once for both.
+    RELATED_AQL = f"""
+        LET answer = @answer_key == null ? null : DOCUMENT("Answers", @answer_key)
+        LET hierarchy_ids = FIRST(FOR q IN ResearchQuestions FILTER q.id == @category_id RETURN q.hierarchy_ids)
+
+        LET phrase_include = answer.phrase_overrides.include || []
+        LET phrase_exclude = answer.phrase_overrides.exclude || []
+        {PhraseViewSet.RESOLVE_PHRASES_AQL}
+
+        LET transcription_include = answer.transcription_overrides.include || []
+        LET transcription_exclude = answer.transcription_overrides.exclude || []
+        {TranscriptionViewSet.RESOLVE_TRANSCRIPTIONS_AQL}
+
+        RETURN {{
+            phrases: phrases,
+            transcriptions: transcriptions
+        }}
+    """
+
     def list(self, request):
         category_id = request.query_params.get("category_id")
         sample = request.query_params.get("sample")
@@ -2590,30 +2724,29 @@ class RelatedContentViewSet(ViewSet):
         except (TypeError, ValueError):
             raise ValidationError("category_id must be an integer")
 
+        cache_key = ("related", category_id, sample, answer_key or None)
+        data = related_response_cache.get(request.arangodb, cache_key)
+        if data is not None:
+            return Response(data)
+
         db = request.arangodb
-        answer = db.collection("Answers").get(answer_key) if answer_key else None
-
-        phrase_overrides = (answer or {}).get("phrase_overrides") or {}
-        phrase_view = PhraseViewSet()
-        phrases = phrase_view._resolve_phrases(
-            db, sample, category_id,
-            phrase_overrides.get("include") or [],
-            phrase_overrides.get("exclude") or [],
-        )
-        phrases = natsorted(phrases, key=lambda x: x.get("phrase_ref", ""))
+        cursor = db.aql.execute(self.RELATED_AQL, bind_vars={
+            "answer_key": answer_key or None,
+            "category_id": category_id,
+            "sample": sample,
+        })
+        related = next(cursor, None) or {}
+
+        phrases = sort_phrases(related.get("phrases") or [])
         phrase_data = PhraseSerializer(phrases, many=True, context={"request": request}).data
 
-        transcription_overrides = (answer or {}).get("transcription_overrides") or {}
-        transcription_view = TranscriptionViewSet()
-        transcriptions = transcription_view._resolve_transcriptions(
-            db, sample, category_id,
-            transcription_overrides.get("include") or [],
-            transcription_overrides.get("exclude") or [],
-        )
+        transcriptions = related.get("transcriptions") or []
         transcriptions.sort(key=lambda x: x.get("segment_no", 0))
         transcription_data = TranscriptionSerializer(transcriptions, many=True, context={"request": request}).data
 
-        return Response({"phrases": phrase_data, "transcriptions": transcription_data})
+        data = {"phrases": phrase_data, "transcriptions": transcription_data}
+        related_response_cache.set(request.arangodb, cache_key, data)
+        return Response(data)
 
 
 class BackupViewSet(ViewSet):
@@ -0,0 +1,52 @@
+"""
+Batched document writes.
+
+python-arango's insert_many/update_many send a whole list of documents in
+one request and report failures per document (an ArangoServerError in
+place of that document's result) instead of raising. The helpers below
+split large lists into WRITE_BATCH_SIZE requests and turn those per-
+document failures into plain error dicts, so a 1,000-row import is a
+single round trip and the caller still learns which rows didn't land.
+"""
+
+# Documents per insert_many/update_many request
+WRITE_BATCH_SIZE = 1000
+
+
+class BulkWriteError(Exception):
+    """Some documents of a bulk write failed; `errors` lists them. Raise it
+    inside a stream transaction to abort the whole write."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} document(s) could not be written")
+        self.errors = errors
+
+
+def _errors(docs, results):
+    if not isinstance(results, list):  # silent=True returns True
+        return []
+    return [
+        {"_key": doc.get("_key"), "error": getattr(result, "error_message", None) or str(result)}
+        for doc, result in zip(docs, results)
+        if isinstance(result, Exception)
+    ]
+
+
+def _write(method, docs, batch_size, options):
+    errors = []
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        errors.extend(_errors(batch, method(batch, **options)))
+    return errors
+
+
+def bulk_insert(collection, docs, batch_size=WRITE_BATCH_SIZE, **options):
+    """Insert `docs` into `collection` in batches; [{_key, error}] for
+    every document that failed (empty when all were written)."""
+    return _write(collection.insert_many, docs, batch_size, options)
+
+
+def bulk_update(collection, docs, batch_size=WRITE_BATCH_SIZE, **options):
+    """Partially update `docs` (each carrying its `_key`) in batches;
+    [{_key, error}] for every document that failed."""
+    return _write(collection.update_many, docs, batch_size, options)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class CollectionCache:
+    """
+    In-process cache of a value derived from one or more ArangoDB
+    collections (e.g. the whole, small Categories tree), rebuilt by
+    `loader(db)` whenever one of the collections' revision changes.
+
+    The revision check is itself a round trip, so it runs at most once
+    every `check_interval` seconds (ARANGO_CACHE_CHECK_INTERVAL by default);
+    in between, get() is a plain attribute read. Writers in this process
+    should call invalidate() so they see their own change immediately —
+    other worker processes pick it up via the revision check.
+
+    The cached value is tied to the db handle it was loaded from, so a
+    reconnect (or a different database in tests) always reloads.
+    """
+
+    def __init__(self, collections, loader, check_interval=None):
+        self.collections = tuple(collections)
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._db = None
+        self._revisions = None
+        self._value = None
+        self._checked_at = 0.0
+
+    def _interval(self):
+        if self.check_interval is not None:
+            return self.check_interval
+        return settings.ARANGO_CACHE_CHECK_INTERVAL
+
+    def _current_revisions(self, db):
+        return tuple(db.collection(name).revision() for name in self.collections)
+
+    def get(self, db):
+        """Return the cached value for db, reloading it if stale."""
+        now = time.monotonic()
+        if self._db is db and now - self._checked_at < self._interval():
+            return self._value
+        with self._lock:
+            revisions = self._current_revisions(db)
+            if self._db is not db or revisions != self._revisions:
+                self._value = self.loader(db)
+                self._db = db
+                self._revisions = revisions
+            self._checked_at = time.monotonic()
+            return self._value
+
+    def revisions(self, db):
+        """The collection revisions the value get(db) returns was loaded at."""
+        self.get(db)
+        return self._revisions
+
+    def invalidate(self):
+        """Drop the cached value; the next get() reloads it."""
+        with self._lock:
+            self._db = None
+            self._revisions = None
+            self._value = None
+            self._checked_at = 0.0
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache whose entries expire `ttl` seconds
+    after being set, evicting the least recently used entry beyond
+    `max_entries`. For short-lived, per-process reuse (e.g. the candidate
+    list of a search while a user pages through it), not for data that
+    must be invalidated precisely.
+    """
+
+    def __init__(self, ttl, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """
+    Response payloads kept in a Django cache alias (settings.CACHES — local
+    memory by default, file-based or Redis when configured), keyed by the
+    request parameters plus the current revisions of `collections`.
+
+    Any write to one of those collections — from any worker process, the
+    import worker included — changes the key, so entries cached before it
+    are simply never read again (and age out by the alias' TIMEOUT); no
+    shared backend is needed for correctness. As with CollectionCache the
+    revision check runs at most every `check_interval` seconds, so other
+    processes see a write within ARANGO_CACHE_CHECK_INTERVAL; writers in
+    this process call invalidate() to re-read the revisions immediately.
+    """
+
+    def __init__(self, prefix, collections, alias="responses", check_interval=None):
+        self.prefix = prefix
+        self.alias = alias
+        self._revisions = CollectionCache(collections, lambda db: None, check_interval)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, db, key):
+        revisions = self._revisions.revisions(db)
+        digest = hashlib.sha1(json.dumps([revisions, key], default=str).encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, db, key, default=None):
+        return self.cache.get(self._key(db, key), default)
+
+    def set(self, db, key, value):
+        self.cache.set(self._key(db, key), value)
+
+    def invalidate(self):
+        """Re-read the collection revisions on the next get()/set()."""
+        self._revisions.invalidate()
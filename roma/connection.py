@@ -0,0 +1,227 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from arango import ArangoClient
+from arango.http import DefaultHTTPAdapter, DefaultHTTPClient
+from django.conf import settings
+from urllib3.connection import HTTPConnection
+
+logger = logging.getLogger(__name__)
+
+
+class ArangoUnavailableError(Exception):
+    """Raised while the circuit breaker is open (ArangoDB known to be down)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class KeepAliveHTTPAdapter(DefaultHTTPAdapter):
+    """DefaultHTTPAdapter that turns on TCP keep-alive for pooled sockets, so
+    idle connections between requests aren't silently dropped by NAT/proxies
+    and re-established on the next query."""
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault(
+            "socket_options",
+            HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+        )
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+
+class PooledHTTPClient(DefaultHTTPClient):
+    """DefaultHTTPClient with configurable keep-alive on top of its
+    pool size/timeout/retry knobs."""
+
+    def __init__(self, keepalive=True, **kwargs):
+        super().__init__(**kwargs)
+        self._keepalive = keepalive
+
+    def create_session(self, host):
+        session = super().create_session(host)
+        if self._keepalive:
+            adapter = KeepAliveHTTPAdapter(
+                connection_timeout=self.request_timeout,
+                pool_connections=self._pool_connections,
+                pool_maxsize=self._pool_maxsize,
+                pool_timeout=self._pool_timeout,
+                max_retries=session.get_adapter(host).max_retries,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        else:
+            session.headers["Connection"] = "close"
+        return session
+
+
+class ArangoConnectionManager:
+    """
+    Hands out one pooled ArangoClient + database handle per worker process.
+
+    Building an ArangoClient sets up a fresh requests Session (TCP connect,
+    and auth on first query) — doing that per call is what made every
+    ArangoModel helper pay connection setup. The handle is created lazily
+    on first use and reused for the life of the process; it's rebuilt if
+    the process forks (e.g. gunicorn --preload), since pooled sockets must
+    not be shared between parent and child.
+
+    Also acts as a circuit breaker: once a connection attempt or a query
+    fails at the transport level, the circuit opens and ensure_available()
+    fails fast (no network call) until the backoff delay has passed. The
+    next call after that probes the server once; success closes the
+    circuit, failure doubles the delay (capped at
+    ARANGO_RECONNECT_BACKOFF_MAX). This way a restarting ArangoDB neither
+    needs a redeploy nor stalls every request for request_timeout seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = None
+        self._client = None
+        self._db = None
+        self._verified = False
+        self._failures = 0
+        self._retry_at = 0.0
+        self._last_error = None
+        self._on_connect = []
+
+    def add_connect_hook(self, hook):
+        """Register hook(db) to run each time a connection is (re)established."""
+        if hook not in self._on_connect:
+            self._on_connect.append(hook)
+
+    def _build_client(self):
+        http_client = PooledHTTPClient(
+            keepalive=settings.ARANGO_KEEPALIVE,
+            request_timeout=settings.ARANGO_REQUEST_TIMEOUT,
+            retry_attempts=settings.ARANGO_RETRY_ATTEMPTS,
+            pool_connections=settings.ARANGO_POOL_SIZE,
+            pool_maxsize=settings.ARANGO_POOL_SIZE,
+            pool_timeout=settings.ARANGO_POOL_TIMEOUT,
+        )
+        return ArangoClient(
+            hosts=os.getenv("ARANGO_HOST", settings.ARANGO_HOST),
+            http_client=http_client,
+            request_timeout=settings.ARANGO_REQUEST_TIMEOUT,
+        )
+
+    def get_db(self):
+        """Return the process-wide database handle, creating it on first use."""
+        if self._db is not None and self._pid == os.getpid():
+            return self._db
+        with self._lock:
+            if self._db is None or self._pid != os.getpid():
+                if (
+                    not hasattr(settings, "ARANGO_DB_NAME")
+                    or not hasattr(settings, "ARANGO_USERNAME")
+                    or not hasattr(settings, "ARANGO_PASSWORD")
+                ):
+                    raise ValueError("ArangoDB settings are not properly configured")
+                client = self._build_client()
+                self._db = client.db(
+                    settings.ARANGO_DB_NAME,
+                    username=settings.ARANGO_USERNAME,
+                    password=settings.ARANGO_PASSWORD,
+                )
+                self._client = client
+                self._pid = os.getpid()
+                self._verified = False
+            return self._db
+
+    def ensure_available(self):
+        """
+        Return a verified database handle, reconnecting if the backoff delay
+        has passed. Raises ArangoUnavailableError without touching the network
+        while the circuit is open.
+        """
+        if self._verified and self._db is not None and self._pid == os.getpid():
+            return self._db
+        with self._lock:
+            if self._verified and self._db is not None and self._pid == os.getpid():
+                return self._db
+            now = time.monotonic()
+            if now < self._retry_at:
+                raise ArangoUnavailableError(
+                    self._last_error or "ArangoDB is unavailable",
+                    retry_after=self._retry_at - now,
+                )
+            try:
+                db = self.get_db()
+                db.version()
+            except Exception as e:
+                self.record_failure(e)
+                raise ArangoUnavailableError(str(e), retry_after=self._retry_at - time.monotonic())
+
+            if self._failures:
+                logger.info(f"ArangoDB connection re-established after {self._failures} failed attempt(s)")
+            self._verified = True
+            self._failures = 0
+            self._retry_at = 0.0
+            self._last_error = None
+            for hook in self._on_connect:
+                try:
+                    hook(db)
+                except Exception as e:
+                    logger.warning(f"ArangoDB connect hook {hook.__name__} failed: {e}")
+            return db
+
+    def record_failure(self, error):
+        """Open the circuit after a transport-level failure."""
+        with self._lock:
+            self._failures += 1
+            delay = min(
+                settings.ARANGO_RECONNECT_BACKOFF * (2 ** (self._failures - 1)),
+                settings.ARANGO_RECONNECT_BACKOFF_MAX,
+            )
+            self._verified = False
+            self._retry_at = time.monotonic() + delay
+            self._last_error = str(error)
+            logger.error(
+                f"ArangoDB unavailable ({self._failures} consecutive failure(s)), "
+                f"next attempt in {delay:.1f}s: {error}"
+            )
+
+    def health(self):
+        """Snapshot of the connection/circuit state, for the /health/ endpoint."""
+        with self._lock:
+            if self._verified:
+                state = "ok"
+            elif self._failures:
+                state = "unavailable"
+            else:
+                state = "unknown"
+            return {
+                "arangodb": state,
+                "consecutive_failures": self._failures,
+                "last_error": self._last_error,
+                "retry_in": round(max(self._retry_at - time.monotonic(), 0.0), 1) if self._failures else None,
+            }
+
+    def reset(self):
+        """Drop the cached client/handle and circuit state; the next
+        get_db() builds a new one."""
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing ArangoDB client: {e}")
+            self._client = None
+            self._db = None
+            self._pid = None
+            self._verified = False
+            self._failures = 0
+            self._retry_at = 0.0
+            self._last_error = None
+
+
+connection_manager = ArangoConnectionManager()
+
+
+def get_db():
+    """Shortcut for connection_manager.get_db()."""
+    return connection_manager.get_db()
@@ -0,0 +1,137 @@
+"""
+Streaming downloads for the search export endpoints.
+
+Rows are written out as they come off the ArangoDB cursor (which fetches
+them in batches), so an export across every sample neither buffers the
+whole result in worker memory nor waits for the query to finish before
+sending the first byte.
+
+The format is picked by DRF content negotiation (Accept: text/csv /
+application/x-ndjson, or ?format=csv|ndjson) or by an explicit
+`export_format` parameter (csv, ndjson or json); without either the
+export endpoints keep returning a regular JSON Response.
+"""
+
+import csv
+import io
+import json
+import logging
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer
+
+from roma.renderers import ORJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk handed to the WSGI server
+CHUNK_ROWS = 500
+# Rows fetched from ArangoDB per cursor round trip
+CURSOR_BATCH_SIZE = 1000
+
+
+class _StreamOnlyRenderer(BaseRenderer):
+    """Lets content negotiation pick a streaming format. Successful exports
+    bypass it (they return a StreamingHttpResponse); it only renders error
+    bodies, as JSON."""
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data).encode(self.charset)
+
+
+class CSVRenderer(_StreamOnlyRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(_StreamOnlyRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+# renderer_classes for an export action: JSON stays the default
+EXPORT_RENDERERS = [ORJSONRenderer, BrowsableAPIRenderer, CSVRenderer, NDJSONRenderer]
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def export_format(request):
+    """'csv', 'ndjson' or 'json' if a streaming export was asked for, else None."""
+    requested = request.data.get("export_format") or request.query_params.get("export_format")
+    if requested in CONTENT_TYPES:
+        return requested
+    renderer = getattr(request, "accepted_renderer", None)
+    if renderer is not None and renderer.format in ("csv", "ndjson"):
+        return renderer.format
+    return None
+
+
+def _csv_chunks(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _json_chunks(rows):
+    yield "["
+    separator = ""
+    lines = []
+    for row in rows:
+        lines.append(separator + json.dumps(row, ensure_ascii=False))
+        separator = ","
+        if len(lines) == CHUNK_ROWS:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines) + "]"
+
+
+def _logged(chunks, filename):
+    # Headers are already sent once streaming starts, so a failure midway
+    # can only truncate the download — make sure it's at least logged.
+    try:
+        yield from chunks
+    except Exception:
+        logger.exception(f"Streaming export {filename} failed")
+        raise
+
+
+def streaming_export(rows, fmt, fields, filename):
+    """
+    StreamingHttpResponse writing `rows` (any iterable of dicts, typically
+    an ArangoDB cursor) as CSV (columns `fields`), NDJSON or a JSON array.
+    """
+    if fmt == "csv":
+        chunks = _csv_chunks(rows, fields)
+    elif fmt == "ndjson":
+        chunks = _ndjson_chunks(rows)
+    else:
+        chunks = _json_chunks(rows)
+    response = StreamingHttpResponse(_logged(chunks, filename), content_type=CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -1,52 +1,84 @@
 import logging
-import os
+import math
 
-from arango import ArangoClient
-from arango.exceptions import ArangoError
-from arango.http import DefaultHTTPClient
+from arango.exceptions import ArangoError, ServerConnectionError
 from django.conf import settings
+from django.http import JsonResponse
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+from roma.connection import ArangoUnavailableError, connection_manager
 
 logger = logging.getLogger(__name__)
 
+# Transport-level failures that mean "the server is unreachable", as opposed
+# to query errors (bad AQL, missing document, ...) that leave it healthy.
+CONNECTION_ERRORS = (ServerConnectionError, RequestsConnectionError, Timeout)
+
+# (collection, fields, options) of the persistent indexes ensured on connect
+INDEXES = [
+    ("Phrases", ["phrase_ref"], {}),
+    ("Samples", ["sample_ref"], {}),
+    # Keyset pagination / sorting for phrase and transcription search
+    ("MasterPhrases", ["phrase_ref_sort"], {}),
+    ("SamplePhrases", ["phrase_ref_sort", "sample"], {}),
+    ("SamplePhrases", ["sample", "phrase_ref_sort"], {}),
+    ("Transcriptions", ["sample", "segment_no"], {}),
+    # Inverted question/category -> phrase lookups (table-cell hot path)
+    ("MasterPhrases", ["question_ids[*]"], {}),
+    ("MasterPhrases", ["category_ids[*]"], {}),
+    ("SamplePhrases", ["question_overrides.include[*]"], {"sparse": True}),
+    # Import job queue (data/imports.py)
+    ("ImportBatches", ["status", "created_at"], {"sparse": True}),
+]
+
+# Accent-stripped, lower-cased, whole string as one token
+CATEGORY_NAME_NORM = {"locale": "en", "case": "lower", "accent": False}
+SEARCH_ANALYZERS = [
+    ("category_name_norm", "norm", CATEGORY_NAME_NORM),
+    # Normalized bigrams: PHRASE() over these matches any substring of the
+    # name (consecutive query bigrams at consecutive positions) via the index
+    (
+        "category_name_ngram",
+        "pipeline",
+        {"pipeline": [
+            {"type": "norm", "properties": CATEGORY_NAME_NORM},
+            {"type": "ngram", "properties": {"min": 2, "max": 2, "preserveOriginal": False, "streamType": "utf8"}},
+        ]},
+    ),
+]
+SEARCH_VIEWS = {
+    # Category picker / research-question search (CategoryViewSet.search,
+    # search_views, ResearchQuestionViewSet.search)
+    "CategorySearch": {
+        "links": {
+            collection: {"fields": {"name": {"analyzers": ["category_name_ngram"]}}}
+            for collection in ("Categories", "ResearchQuestions")
+        },
+    },
+}
+
 
 class ArangoDBMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
         self.connection_error = None
+        connection_manager.add_connect_hook(self._ensure_indexes)
+        connection_manager.add_connect_hook(self._ensure_search_views)
 
-        # Initialize client and attempt connection
-        try:
-            self.client = ArangoClient(
-                http_client=DefaultHTTPClient(
-                    retry_attempts=1,
-                ),
-                hosts=os.getenv("ARANGO_HOST", settings.ARANGO_HOST),
-                request_timeout=5,
-            )
-            self.db = self._connect_to_arangodb()
-        except Exception as e:
-            logger.error(f"ArangoDB initialization error: {str(e)}")
-            self.db = None
-            self.connection_error = str(e)
+        # Attempt the initial connection; if ArangoDB is down right now the
+        # circuit breaker takes over and requests reconnect lazily later.
+        self.db = self._connect_to_arangodb()
 
     def _connect_to_arangodb(self):
-        """Establish a connection to ArangoDB"""
+        """Get the process-wide pooled connection to ArangoDB, reconnecting if due"""
         try:
-            # Check if required settings are defined
-            if (
-                not hasattr(settings, "ARANGO_DB_NAME")
-                or not hasattr(settings, "ARANGO_USERNAME")
-                or not hasattr(settings, "ARANGO_PASSWORD")
-            ):
-                raise ValueError("ArangoDB settings are not properly configured")
-
-            connection = self.client.db(
-                settings.ARANGO_DB_NAME,
-                username=settings.ARANGO_USERNAME,
-                password=settings.ARANGO_PASSWORD,
-            )
-            self._ensure_indexes(connection)
+            connection = connection_manager.ensure_available()
+            self.connection_error = None
             return connection
+        except ArangoUnavailableError as e:
+            self.connection_error = str(e)
+            return None
         except ArangoError as e:
             logger.error(f"ArangoDB connection error: {str(e)}")
             self.connection_error = str(e)
@@ -56,20 +88,74 @@ class ArangoDBMiddleware:
             self.connection_error = str(e)
             return None
 
-    def _ensure_indexes(self, db):
+    @staticmethod
+    def _ensure_indexes(db):
+        """Create the persistent indexes the API relies on, if missing. Each
+        is tried on its own, so one failure doesn't skip the rest."""
+        for collection, fields, options in INDEXES:
+            try:
+                db.collection(collection).add_persistent_index(fields=fields, **options)
+            except Exception as e:
+                logger.warning(f"Could not ensure ArangoDB index {collection}{fields}: {e}")
+
+    @staticmethod
+    def _ensure_search_views(db):
+        """Create the ArangoSearch analyzers/views the API relies on, if missing."""
+        for name, analyzer_type, properties in SEARCH_ANALYZERS:
+            try:
+                # Re-creating an analyzer with an identical definition is a no-op
+                db.create_analyzer(name, analyzer_type, properties, features=["frequency", "norm", "position"])
+            except Exception as e:
+                logger.warning(f"Could not ensure ArangoSearch analyzer {name}: {e}")
         try:
-            db.collection("Phrases").add_persistent_index(fields=["phrase_ref"])
-            db.collection("Samples").add_persistent_index(fields=["sample_ref"])
+            existing = {view["name"] for view in db.views()}
         except Exception as e:
-            logger.warning(f"Could not ensure ArangoDB indexes: {e}")
+            logger.warning(f"Could not list ArangoSearch views: {e}")
+            return
+        for name, properties in SEARCH_VIEWS.items():
+            if name in existing:
+                continue
+            try:
+                db.create_arangosearch_view(name, properties=properties)
+            except Exception as e:
+                logger.warning(f"Could not ensure ArangoSearch view {name}: {e}")
+
+    @staticmethod
+    def _is_optional(path):
+        """Paths that don't need ArangoDB (API root, auth, users, admin...)."""
+        return path == "/" or any(path.startswith(p) for p in settings.ARANGO_OPTIONAL_PATHS)
+
+    @staticmethod
+    def _unavailable_response(error):
+        health = connection_manager.health()
+        response = JsonResponse(
+            {"error": "Database not available", "detail": error, "health": health},
+            status=503,
+        )
+        if health.get("retry_in"):
+            response["Retry-After"] = str(math.ceil(health["retry_in"]))
+        return response
 
     def __call__(self, request):
         """Attach ArangoDB connection to request"""
-        # Attach the database connection (even if it's None)
+        self.db = self._connect_to_arangodb()
+
+        # Fail fast instead of letting the view crash on a None connection
+        # (or stall for request_timeout on a dead one).
+        if self.db is None and not self._is_optional(request.path):
+            return self._unavailable_response(self.connection_error)
+
+        # Attach the database connection (None on optional paths while down)
         request.arangodb = self.db
         request.arango_error = self.connection_error
 
-        # Always proceed with the request, even if ArangoDB connection failed
-        # Individual views can check request.arangodb and handle failures appropriately
         response = self.get_response(request)
         return response
+
+    def process_exception(self, request, exception):
+        """Open the circuit if a view's query failed because ArangoDB went away."""
+        if isinstance(exception, CONNECTION_ERRORS):
+            connection_manager.record_failure(exception)
+            self.connection_error = str(exception)
+            return self._unavailable_response(self.connection_error)
+        return None
@@ -0,0 +1,133 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# API payloads worth compressing. HTML (the admin, the browsable API) is
+# left alone: it embeds CSRF tokens, and compressing secrets alongside
+# request-reflected text opens it to BREACH. Media is already compressed.
+COMPRESSIBLE_TYPES = re.compile(r"^(application/(json|x-ndjson)|text/csv|[^;]*\+json)\s*(;|$)")
+
+
+def _accepted_encodings(header):
+    """{encoding: q} from an Accept-Encoding header."""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def _negotiate(header):
+    """'br', 'gzip' or None, honouring q-values (and q=0 refusals)."""
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _GzipStream:
+    def __init__(self):
+        self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        # Sync-flush each chunk so a streamed download reaches the client
+        # as it's produced instead of waiting for the compressor's buffer
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._brotli.process(data) + self._brotli.flush()
+
+    def finish(self):
+        return self._brotli.finish()
+
+
+COMPRESSORS = {"gzip": _GzipStream, "br": _BrotliStream}
+
+
+class CompressionMiddleware:
+    """
+    Compress API responses (JSON, NDJSON, CSV) with Brotli if
+    the client accepts it and the `brotli` package is installed, otherwise
+    gzip. Regular responses are compressed only from
+    COMPRESSION_MIN_SIZE bytes up (smaller ones gain nothing); streaming
+    exports are always compressed, chunk by chunk, so they keep streaming.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header("Content-Encoding"):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.streaming and response.is_async:
+            # Only the WSGI (sync) stack is served here
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = _negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compressor = COMPRESSORS[encoding]()
+        if response.streaming:
+            response.streaming_content = self._compress_stream(response.streaming_content, compressor)
+            del response["Content-Length"]
+        else:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The representation changed: a strong validator no longer applies
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, compressor):
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
@@ -1,10 +1,13 @@
+import gzip
 import logging
 from unittest.mock import MagicMock, patch
 
-from django.http import JsonResponse
-from django.test import RequestFactory, TestCase
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
 
+from roma.connection import connection_manager
 from roma.middleware.arangodb_middleware import ArangoDBMiddleware
+from roma.middleware.compression import CompressionMiddleware, _negotiate
 
 # Suppress logging during tests
 logging.disable(logging.CRITICAL)
@@ -14,15 +17,19 @@ class ArangoDBMiddlewareTests(TestCase):
     def setUp(self):
         self.factory = RequestFactory()
         self.get_response_mock = MagicMock(return_value=JsonResponse({"status": "ok"}))
+        connection_manager.reset()
+        self.addCleanup(connection_manager.reset)
 
-    @patch("roma.middleware.arangodb_middleware.ArangoClient")
-    @patch("roma.middleware.arangodb_middleware.settings")
+    @patch("roma.connection.ArangoClient")
+    @patch("roma.connection.settings")
     def test_successful_connection(self, mock_settings, mock_arango_client):
         # Configure mock settings
         mock_settings.ARANGO_DB_NAME = "test_db"
         mock_settings.ARANGO_USERNAME = "test_user"
         mock_settings.ARANGO_PASSWORD = "test_pass"
         mock_settings.ARANGO_HOST = "http://localhost:8529"
+        mock_settings.ARANGO_RECONNECT_BACKOFF = 1
+        mock_settings.ARANGO_RECONNECT_BACKOFF_MAX = 60
 
         # Mock the ArangoDB client and connection
         mock_db = MagicMock()
@@ -51,14 +58,16 @@ class ArangoDBMiddlewareTests(TestCase):
         # Verify response
         self.assertEqual(response.status_code, 200)
 
-    @patch("roma.middleware.arangodb_middleware.ArangoClient")
-    @patch("roma.middleware.arangodb_middleware.settings")
+    @patch("roma.connection.ArangoClient")
+    @patch("roma.connection.settings")
     def test_connection_error(self, mock_settings, mock_arango_client):
         # Configure mock settings
         mock_settings.ARANGO_DB_NAME = "test_db"
         mock_settings.ARANGO_USERNAME = "test_user"
         mock_settings.ARANGO_PASSWORD = "test_pass"
         mock_settings.ARANGO_HOST = "http://localhost:8529"
+        mock_settings.ARANGO_RECONNECT_BACKOFF = 1
+        mock_settings.ARANGO_RECONNECT_BACKOFF_MAX = 60
 
         # Mock ArangoDB client to raise an exception
         mock_client_instance = MagicMock()
@@ -72,12 +81,209 @@ class ArangoDBMiddlewareTests(TestCase):
         self.assertIsNone(middleware.db)
         self.assertIsNotNone(middleware.connection_error)
 
-        # Test middleware processing
+        # Paths that don't need ArangoDB (API root, auth, ...) still go
+        # through, with the connection status attached to the request
         request = self.factory.get("/")
         response = middleware(request)
 
-        # The middleware no longer returns an error response directly
-        # It now attaches the connection status to the request and continues
         self.assertEqual(response.status_code, 200)
         self.assertIsNone(request.arangodb)
         self.assertIsNotNone(request.arango_error)
+
+    @patch("roma.connection.ArangoClient")
+    def test_open_circuit_fails_fast_with_503(self, mock_arango_client):
+        mock_arango_client.return_value.db.return_value.version.side_effect = Exception("Connection refused")
+
+        middleware = ArangoDBMiddleware(self.get_response_mock)
+        attempts = mock_arango_client.return_value.db.return_value.version.call_count
+
+        response = middleware(self.factory.get("/samples/"))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+        self.get_response_mock.assert_not_called()
+        # No new connection attempt while the backoff delay hasn't passed
+        self.assertEqual(mock_arango_client.return_value.db.return_value.version.call_count, attempts)
+
+    @patch("roma.connection.time.monotonic")
+    @patch("roma.connection.ArangoClient")
+    def test_reconnects_after_backoff(self, mock_arango_client, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        mock_db = mock_arango_client.return_value.db.return_value
+        mock_db.version.side_effect = Exception("Connection refused")
+
+        middleware = ArangoDBMiddleware(self.get_response_mock)
+        self.assertIsNone(middleware.db)
+
+        # ArangoDB comes back; once the backoff delay passes, the next
+        # request reconnects without a redeploy
+        mock_db.version.side_effect = None
+        mock_monotonic.return_value = 1000.0 + 120
+        request = self.factory.get("/samples/")
+        response = middleware(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(request.arangodb, mock_db)
+        self.assertEqual(connection_manager.health()["arangodb"], "ok")
+
+    @patch("roma.connection.time.monotonic")
+    @patch("roma.connection.ArangoClient")
+    def test_backoff_grows_exponentially(self, mock_arango_client, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        mock_arango_client.return_value.db.return_value.version.side_effect = Exception("down")
+
+        ArangoDBMiddleware(self.get_response_mock)
+        first = connection_manager.health()["retry_in"]
+        mock_monotonic.return_value = first
+        ArangoDBMiddleware(self.get_response_mock)
+        second = connection_manager.health()["retry_in"]
+
+        self.assertEqual(second, first * 2)
+
+    @patch("roma.connection.ArangoClient")
+    def test_connection_error_during_view_opens_circuit(self, mock_arango_client):
+        from requests.exceptions import ConnectionError as RequestsConnectionError
+
+        middleware = ArangoDBMiddleware(self.get_response_mock)
+        request = self.factory.get("/samples/")
+        middleware(request)
+
+        response = middleware.process_exception(request, RequestsConnectionError("reset by peer"))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(connection_manager.health()["arangodb"], "unavailable")
+
+    def test_query_errors_do_not_open_circuit(self):
+        middleware = ArangoDBMiddleware.__new__(ArangoDBMiddleware)
+        self.assertIsNone(middleware.process_exception(self.factory.get("/"), ValueError("bad")))
+
+    def test_search_views_created_once(self):
+        db = MagicMock()
+        db.views.return_value = []
+        ArangoDBMiddleware._ensure_search_views(db)
+        self.assertEqual(db.create_arangosearch_view.call_args.args[0], "CategorySearch")
+        analyzers = [c.args[0] for c in db.create_analyzer.call_args_list]
+        self.assertEqual(analyzers, ["category_name_norm", "category_name_ngram"])
+
+        db.create_arangosearch_view.reset_mock()
+        db.views.return_value = [{"name": "CategorySearch"}]
+        ArangoDBMiddleware._ensure_search_views(db)
+        db.create_arangosearch_view.assert_not_called()
+
+    def test_failed_index_does_not_skip_the_rest(self):
+        from roma.middleware.arangodb_middleware import INDEXES
+        db = MagicMock()
+        db.collection.return_value.add_persistent_index.side_effect = [Exception("boom")] + [None] * len(INDEXES)
+        with patch("roma.middleware.arangodb_middleware.logger") as logger:
+            ArangoDBMiddleware._ensure_indexes(db)
+        self.assertEqual(db.collection.return_value.add_persistent_index.call_count, len(INDEXES))
+        logger.warning.assert_called_once()
+        self.assertIn("Phrases['phrase_ref']", logger.warning.call_args.args[0])
+
+    def test_failed_analyzer_does_not_skip_the_view(self):
+        db = MagicMock()
+        db.views.return_value = []
+        db.create_analyzer.side_effect = Exception("boom")
+        with patch("roma.middleware.arangodb_middleware.logger"):
+            ArangoDBMiddleware._ensure_search_views(db)
+        self.assertEqual(db.create_analyzer.call_count, 2)
+        db.create_arangosearch_view.assert_called_once()
+
+
+class ArangoConnectionManagerTests(TestCase):
+    def setUp(self):
+        connection_manager.reset()
+        self.addCleanup(connection_manager.reset)
+
+    @patch("roma.connection.ArangoClient")
+    def test_reuses_one_client_per_process(self, mock_arango_client):
+        mock_db = MagicMock()
+        mock_arango_client.return_value.db.return_value = mock_db
+
+        first = connection_manager.get_db()
+        second = connection_manager.get_db()
+
+        self.assertIs(first, mock_db)
+        self.assertIs(second, mock_db)
+        mock_arango_client.assert_called_once()
+
+    @patch("roma.connection.ArangoClient")
+    def test_arango_model_uses_shared_connection(self, mock_arango_client):
+        from data.models import Sample
+
+        Sample.collection()
+        Sample.collection()
+        Sample.db()
+
+        mock_arango_client.assert_called_once()
+
+    @patch("roma.connection.os.getpid")
+    @patch("roma.connection.ArangoClient")
+    def test_rebuilds_client_after_fork(self, mock_arango_client, mock_getpid):
+        mock_getpid.return_value = 100
+        connection_manager.get_db()
+        mock_getpid.return_value = 101
+        connection_manager.get_db()
+
+        self.assertEqual(mock_arango_client.call_count, 2)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, COMPRESSION_GZIP_LEVEL=6)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = b'{"rows": [' + b",".join(b'{"phrase": "me dikhav"}' for _ in range(50)) + b"]}"
+
+    def _run(self, response, accept="gzip, deflate"):
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda r: response)(request)
+
+    @patch("roma.middleware.compression.brotli", None)
+    def test_large_json_is_gzipped(self):
+        response = self._run(HttpResponse(self.body, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_response_left_alone(self):
+        response = self._run(HttpResponse(b'{"ok": true}', content_type="application/json"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, b'{"ok": true}')
+
+    def test_non_text_type_left_alone(self):
+        response = self._run(HttpResponse(self.body, content_type="audio/mpeg"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_html_left_alone(self):
+        # Pages carrying CSRF tokens are never compressed (BREACH)
+        response = self._run(HttpResponse(self.body, content_type="text/html; charset=utf-8"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_refused_encoding_left_alone(self):
+        response = self._run(HttpResponse(self.body, content_type="application/json"), accept="gzip;q=0, br;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.body)
+
+    @patch("roma.middleware.compression.brotli", None)
+    def test_streaming_export_compressed_per_chunk(self):
+        chunks = [b"phrase_ref,sample\n"] + [f"{i},AL-001\n".encode() for i in range(200)]
+        response = self._run(StreamingHttpResponse(iter(chunks), content_type="text/csv"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(chunks))
+
+    @patch("roma.middleware.compression.brotli", None)
+    def test_strong_etag_weakened(self):
+        response = HttpResponse(self.body, content_type="application/json")
+        response["ETag"] = '"abc"'
+        response = self._run(response)
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_negotiate_prefers_brotli_when_available(self):
+        with patch("roma.middleware.compression.brotli", MagicMock()):
+            self.assertEqual(_negotiate("gzip, br"), "br")
+            self.assertEqual(_negotiate("gzip, br;q=0"), "gzip")
+        with patch("roma.middleware.compression.brotli", None):
+            self.assertEqual(_negotiate("br"), None)
+            self.assertEqual(_negotiate("*"), "gzip")
@@ -1,5 +1,4 @@
-from arango import ArangoClient
-from django.conf import settings
+from roma.connection import get_db
 
 
 class ArangoModel:
@@ -16,13 +15,8 @@ class ArangoModel:
 
     @classmethod
     def db(cls):
-        """Connect to the Arango database"""
-        client = ArangoClient(hosts=settings.ARANGO_HOST)
-        return client.db(
-            settings.ARANGO_DB_NAME,
-            username=settings.ARANGO_USERNAME,
-            password=settings.ARANGO_PASSWORD,
-        )
+        """Return the shared, pooled Arango database handle"""
+        return get_db()
 
     @classmethod
     def collection(cls):
@@ -1,3 +1,9 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 
 
@@ -5,3 +11,77 @@ class ArangoPageNumberPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 200
+
+    def paginate_aql(self, db, query, bind_vars, request, view=None):
+        """
+        One page of an AQL query, paged in the database: `query` must have
+        `LIMIT @offset, @count` before its RETURN, which is bound here from
+        ?page / ?page_size. The total for `count`/`next` comes from the
+        same query's fullCount, so only the page's documents are read,
+        transferred and serialized. Returns the page's rows; follow with
+        get_paginated_response() as with paginate_queryset().
+        """
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message="Invalid page."))
+
+        cursor = db.aql.execute(
+            query,
+            bind_vars={**bind_vars, "offset": (page_number - 1) * page_size, "count": page_size},
+            full_count=True,
+        )
+        rows = list(cursor)
+        total = (cursor.statistics() or {}).get("fullCount", len(rows))
+
+        # Page arithmetic (has_next, num_pages...) over the total alone
+        try:
+            self.page = Paginator(range(total), page_size).page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        if self.page.paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return rows
+
+
+def encode_cursor(values):
+    """Opaque continuation token for keyset pagination: the sort-key values
+    of the last row returned."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, length):
+    """Sort-key values from a token made by encode_cursor(); ValidationError
+    if it's malformed or doesn't have `length` values."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error, TypeError):
+        raise ValidationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise ValidationError("Invalid cursor")
+    return values
+
+
+def keyset_filter(var, fields):
+    """
+    AQL FILTER selecting rows of `var` that sort strictly after the cursor
+    position on `fields` (all ascending), e.g. for ("sample", "segment_no"):
+    `FILTER t.sample > @after_0 OR (t.sample == @after_0 AND t.segment_no > @after_1)`.
+    Bind the decoded cursor values as after_0, after_1, ...
+    """
+    clauses = []
+    for i, field in enumerate(fields):
+        equal = [f"{var}.{fields[j]} == @after_{j}" for j in range(i)]
+        clauses.append(" AND ".join(equal + [f"{var}.{field} > @after_{i}"]))
+    return "FILTER " + " OR ".join(f"({c})" if " AND " in c else c for c in clauses)
+
+
+def keyset_bind(values):
+    return {f"after_{i}": value for i, value in enumerate(values)}
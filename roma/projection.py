@@ -0,0 +1,65 @@
+"""
+Response field projection for list/search endpoints.
+
+`fields=a,b` keeps only those top-level attributes of each row, and
+`exclude=a,b` drops them. Either can be given in the query string or the
+request body, comma-separated or as a list. The projection is applied in
+the AQL itself (KEEP / UNSET), so less is read out of ArangoDB as well as
+sent to the client.
+
+Attributes the endpoint needs after the query (e.g. the sort key for
+next_cursor, or `sample` for the sample label) are passed as `required`.
+They are always kept.
+"""
+
+import re
+
+from rest_framework.exceptions import ValidationError
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _field_list(request, name):
+    value = None
+    if isinstance(request.data, dict):
+        value = request.data.get(name)
+    if value is None:
+        value = request.query_params.get(name)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)) or not all(isinstance(f, str) for f in value):
+        raise ValidationError(f"{name} must be a comma-separated list of attribute names")
+    fields = [f.strip() for f in value if f.strip()]
+    invalid = [f for f in fields if not FIELD_NAME.match(f)]
+    if invalid:
+        raise ValidationError(f"Invalid {name}: {', '.join(invalid)}")
+    return fields
+
+
+def projection(request, required=()):
+    """(keep, unset) attribute lists from the request; both None if it
+    asks for no projection. ValidationError if it asks for both."""
+    keep = _field_list(request, "fields")
+    unset = _field_list(request, "exclude")
+    if keep and unset:
+        raise ValidationError("Use either fields or exclude, not both")
+    if keep:
+        return sorted(set(keep) | set(required)), None
+    if unset:
+        return None, sorted(set(unset) - set(required))
+    return None, None
+
+
+def project(expr, request, required=()):
+    """
+    AQL expression for `expr` projected per the request's fields/exclude,
+    and the bind vars it uses — `expr` unchanged and {} without either.
+    """
+    keep, unset = projection(request, required)
+    if keep:
+        return f"KEEP({expr}, @projection_fields)", {"projection_fields": keep}
+    if unset:
+        return f"UNSET({expr}, @projection_exclude)", {"projection_exclude": unset}
+    return expr, {}
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnList
 
 
 class ArangoModelSerializer(serializers.Serializer):
@@ -30,3 +31,63 @@ class ArangoModelSerializer(serializers.Serializer):
             setattr(instance, attr, value)
         instance.save()
         return instance
+
+
+class PassThroughListSerializer(serializers.BaseSerializer):
+    """
+    Read-only many=True serializer for PassThroughSerializer subclasses.
+    Builds each row with one dict comprehension against a precomputed
+    exclude set, without constructing a child serializer (and its fields)
+    or dispatching through it per row. Non-dict items (model instances)
+    still go through a regular child serializer.
+    """
+
+    many = True
+
+    def __init__(self, instance=None, exclude_fields=frozenset(), child_class=None, **kwargs):
+        self.exclude_fields = exclude_fields
+        self.child_class = child_class
+        super().__init__(instance, **kwargs)
+
+    def to_representation(self, data):
+        exclude = self.exclude_fields
+        child = None
+        rows = []
+        for item in data:
+            if isinstance(item, dict):
+                rows.append({k: v for k, v in item.items() if k not in exclude})
+                continue
+            if child is None:
+                child = self.child_class(context=self.context)
+            rows.append(child.to_representation(item))
+        return rows
+
+    @property
+    def data(self):
+        if not hasattr(self, "_data"):
+            self._data = self.to_representation(self.instance)
+        return ReturnList(self._data, serializer=self)
+
+
+class PassThroughSerializer(ArangoModelSerializer):
+    """
+    Serializer whose output is the stored document (a dict from AQL) minus
+    `exclude_fields`. many=True returns a PassThroughListSerializer.
+    """
+
+    exclude_fields = ("_rev", "_id")
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        return PassThroughListSerializer(
+            *args,
+            exclude_fields=frozenset(cls.exclude_fields),
+            child_class=cls,
+            context=kwargs.get("context"),
+        )
+
+    def to_representation(self, instance):
+        if isinstance(instance, dict):
+            exclude = self.exclude_fields
+            return {k: v for k, v in instance.items() if k not in exclude}
+        return super().to_representation(instance)
@@ -60,6 +60,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "roma.middleware.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -75,6 +76,57 @@ ARANGO_DB_NAME = os.getenv("ARANGO_DB_NAME", "rms")
 ARANGO_USERNAME = os.getenv("ARANGO_USERNAME", "root")
 ARANGO_PASSWORD = os.getenv("ARANGO_PASSWORD", "blabla")
 ARANGO_HOST = os.getenv("ARANGO_HOST", "http://localhost:8529")
+# Connection pool shared by every request in a worker process (see roma/connection.py)
+ARANGO_POOL_SIZE = int(os.getenv("ARANGO_POOL_SIZE", "10"))
+ARANGO_POOL_TIMEOUT = float(os.getenv("ARANGO_POOL_TIMEOUT")) if os.getenv("ARANGO_POOL_TIMEOUT") else None
+ARANGO_REQUEST_TIMEOUT = float(os.getenv("ARANGO_REQUEST_TIMEOUT", "5"))
+ARANGO_RETRY_ATTEMPTS = int(os.getenv("ARANGO_RETRY_ATTEMPTS", "1"))
+ARANGO_KEEPALIVE = os.getenv("ARANGO_KEEPALIVE", "True").lower() in ("true", "1", "yes", "on")
+# Circuit breaker: seconds before the first reconnect attempt, doubled per failure up to the max
+ARANGO_RECONNECT_BACKOFF = float(os.getenv("ARANGO_RECONNECT_BACKOFF", "1"))
+ARANGO_RECONNECT_BACKOFF_MAX = float(os.getenv("ARANGO_RECONNECT_BACKOFF_MAX", "60"))
+# Stream transactions (roma/transactions.py): seconds to wait for collection locks
+ARANGO_TRANSACTION_LOCK_TIMEOUT = int(os.getenv("ARANGO_TRANSACTION_LOCK_TIMEOUT", "10"))
+# Max age (seconds) of in-process collection caches before re-checking the collection revision
+ARANGO_CACHE_CHECK_INTERVAL = float(os.getenv("ARANGO_CACHE_CHECK_INTERVAL", "5"))
+# Phrase/transcription search: how long (seconds) a query's ordered candidate
+# list is reused while paging, how many queries are kept per process, and the
+# largest candidate list worth caching (bigger ones are recomputed per page)
+SEARCH_CANDIDATE_CACHE_TTL = float(os.getenv("SEARCH_CANDIDATE_CACHE_TTL", "60"))
+SEARCH_CANDIDATE_CACHE_ENTRIES = int(os.getenv("SEARCH_CANDIDATE_CACHE_ENTRIES", "128"))
+SEARCH_CANDIDATE_CACHE_MAX_KEYS = int(os.getenv("SEARCH_CANDIDATE_CACHE_MAX_KEYS", "20000"))
+# Cached /related/ and by-category responses (roma.cache.ResponseCache).
+# Entries are keyed on collection revisions, so any backend stays correct;
+# local memory per process by default, point RESPONSE_CACHE_BACKEND at e.g.
+# django.core.cache.backends.filebased.FileBasedCache (LOCATION a directory)
+# or django.core.cache.backends.redis.RedisCache (LOCATION a redis:// URL)
+# to share entries between worker processes.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "responses": {
+        "BACKEND": RESPONSE_CACHE_BACKEND,
+        "LOCATION": os.getenv("RESPONSE_CACHE_LOCATION", "roma-responses"),
+        "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TIMEOUT", "300")),
+    },
+}
+if "redis" not in RESPONSE_CACHE_BACKEND:
+    # Entry cap for the local-memory/file backends (Redis manages its own memory)
+    CACHES["responses"]["OPTIONS"] = {"MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))}
+# Seconds the sample import worker (manage.py run_import_worker) waits
+# between queue checks while idle
+IMPORT_WORKER_POLL_INTERVAL = float(os.getenv("IMPORT_WORKER_POLL_INTERVAL", "2"))
+# Where queued import uploads wait for the worker (shared by both processes)
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", os.path.join(BASE_DIR, "import_uploads"))
+# Response compression (roma.middleware.compression): smallest regular body
+# worth compressing, and gzip/brotli levels. Brotli is used when the
+# optional `brotli` package is installed and the client accepts it.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# Paths served even while ArangoDB is down (request.arangodb is None there);
+# everything else gets a fast 503.
+ARANGO_OPTIONAL_PATHS = ["/admin/", "/api/", "/api-auth/", "/users/", "/backups/", "/health/", "/static/"]
 
 
 ADD_ALLOWED_ORIGINS = os.environ.get("CORS_ALLOWED_ORIGINS")
@@ -124,6 +176,17 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "user.permissions.ReadOnlyOrAuthenticated",
     ],
+    # orjson for API clients (falls back to the stdlib encoder if it's
+    # missing); the browsable API stays for humans
+    "DEFAULT_RENDERER_CLASSES": [
+        "roma.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "roma.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 AUTH_USER_MODEL = "user.CustomUser"
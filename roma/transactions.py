@@ -0,0 +1,48 @@
+"""
+ArangoDB stream transactions.
+
+    with stream_transaction(db, write=["Samples", "Phrases"]) as txn:
+        txn.collection("Samples").insert(...)
+        txn.aql.execute(...)
+
+Everything done through `txn` commits together when the block exits, or
+is aborted (nothing written) if it raises. Only the listed collections can
+be touched (allow_implicit=False), and waiting for their locks is bounded
+by ARANGO_TRANSACTION_LOCK_TIMEOUT, so a stuck writer fails the request
+instead of queueing behind it.
+"""
+
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def stream_transaction(db, write, read=()):
+    txn = db.begin_transaction(
+        read=list(read),
+        write=list(write),
+        allow_implicit=False,
+        lock_timeout=settings.ARANGO_TRANSACTION_LOCK_TIMEOUT,
+    )
+    try:
+        yield txn
+    except BaseException:
+        _abort(txn)
+        raise
+    try:
+        txn.commit_transaction()
+    except Exception:
+        _abort(txn)
+        raise
+
+
+def _abort(txn):
+    try:
+        txn.abort_transaction()
+    except Exception:
+        # The server drops it once its idle timeout expires
+        logger.exception("Could not abort transaction %s", txn.transaction_id)
@@ -18,12 +18,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from rest_framework import routers
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
 import data.urls
 import user.urls
+from roma.connection import ArangoUnavailableError, connection_manager
 from user.views import CustomObtainAuthToken, logout_view
 
 router = routers.DefaultRouter()
@@ -116,6 +118,10 @@ def api_root(request, format=None):
                 "url": reverse("customuser-list", request=request, format=format),
                 "description": "User management and authentication",
             },
+            "health": {
+                "url": reverse("health", request=request, format=format),
+                "description": "ArangoDB connection/circuit-breaker state (503 while the database is unreachable)",
+            },
             "authentication": {
                 "token": reverse("api_token_auth", request=request, format=format),
                 "logout": reverse("api_logout", request=request, format=format),
@@ -125,6 +131,25 @@ def api_root(request, format=None):
     )
 
 
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def health(request, format=None):
+    """
+    Health check
+
+    Reports the ArangoDB connection state of this worker process. If the
+    circuit breaker is open and its backoff delay has passed, this also
+    triggers the reconnect attempt. Returns 200 when the database is
+    reachable, 503 otherwise (with retry_in seconds until the next attempt).
+    """
+    try:
+        connection_manager.ensure_available()
+    except ArangoUnavailableError:
+        pass
+    state = connection_manager.health()
+    return Response(state, status=200 if state["arangodb"] == "ok" else 503)
+
+
 urlpatterns = [
     # Custom root with per-endpoint descriptions, shadowing the router's own
     # (undescribed) root view — must come before include(router.urls) since
@@ -135,4 +160,5 @@ urlpatterns = [
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
     path("api/token/", CustomObtainAuthToken.as_view(), name="api_token_auth"),
     path("api/logout/", logout_view, name="api_logout"),
+    path("health/", health, name="health"),
 ]
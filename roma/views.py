@@ -1,9 +1,29 @@
+import hashlib
+import json
+import logging
+
+from arango.exceptions import ArangoError
+from django.utils.http import parse_etags
 from rest_framework import status, viewsets
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import APIException, NotFound
 from rest_framework.response import Response
 
 from roma.pagination import ArangoPageNumberPagination
 
+logger = logging.getLogger(__name__)
+
+
+class NotModified(APIException):
+    """Raised before the handler runs when the client's copy is current;
+    turned into an empty 304 by ArangoModelViewSet.handle_exception."""
+
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+def _opaque_tag(etag):
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return etag[2:] if etag.startswith("W/") else etag
+
 
 class ArangoModelViewSet(viewsets.ViewSet):
     """
@@ -15,6 +35,75 @@ class ArangoModelViewSet(viewsets.ViewSet):
     model = None  # Must be set in subclass.
     pagination_class = ArangoPageNumberPagination
 
+    # GET actions answered with an ETag, and with an empty 304 when the
+    # request's If-None-Match already has it. Opt-in per viewset: the tag
+    # only changes when one of get_etag_collections() does, so list every
+    # collection the action's response is built from.
+    etag_actions = ()
+    etag_collections = None  # defaults to the model's collection
+
+    def get_etag_collections(self):
+        return self.etag_collections or (self.model.collection_name,)
+
+    def get_etag_revisions(self, request):
+        db = request.arangodb
+        return [db.collection(name).revision() for name in self.get_etag_collections()]
+
+    def get_etag_extra(self, request):
+        """Anything else the response depends on that no collection revision
+        tracks (e.g. a per-user setting); JSON-serializable, None by default."""
+        return None
+
+    def get_etag(self, request):
+        """
+        Weak ETag from get_etag_revisions() (by default the current
+        revisions of get_etag_collections()),
+        the full path (query string included), the negotiated format,
+        the user (responses can differ per user, e.g. hidden samples) and
+        get_etag_extra().
+        Costs one cheap revision round trip per collection, none of the
+        query or serialization work.
+        """
+        user = request.user
+        validator = [
+            self.get_etag_revisions(request),
+            request.get_full_path(),
+            getattr(request.accepted_renderer, "format", None),
+            user.pk if user and user.is_authenticated else None,
+            self.get_etag_extra(request),
+        ]
+        digest = hashlib.sha1(json.dumps(validator, default=str).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method not in ("GET", "HEAD") or self.action not in self.etag_actions:
+            return
+        if getattr(request, "arangodb", None) is None:
+            return
+        try:
+            self._etag = self.get_etag(request)
+        except ArangoError as e:
+            logger.warning(f"Could not compute ETag for {request.path}: {e}")
+            return
+        client_tags = parse_etags(request.headers.get("If-None-Match", ""))
+        if "*" in client_tags or _opaque_tag(self._etag) in map(_opaque_tag, client_tags):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response["ETag"] = self._etag
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "_etag", None) and response.status_code == status.HTTP_200_OK:
+            response["ETag"] = self._etag
+        return response
+
     @property
     def paginator(self):
         if not hasattr(self, '_paginator'):
@@ -42,6 +131,22 @@ class ArangoModelViewSet(viewsets.ViewSet):
         # Return a list of all objects.
         return self.model.all()
 
+    def get_list_query(self):
+        """
+        (aql, bind_vars) for one page of what get_queryset() lists, with
+        `LIMIT @offset, @count` before the RETURN and a stable SORT, so
+        ?page= is paged in the database (see
+        ArangoPageNumberPagination.paginate_aql). None falls back to
+        serializing get_queryset() and slicing it — the default for
+        viewsets that override get_queryset without overriding this.
+        """
+        if not self._uses_stock_queryset():
+            return None
+        return f"FOR doc IN {self.model.collection_name} SORT doc._key LIMIT @offset, @count RETURN doc", {}
+
+    def _uses_stock_queryset(self):
+        return type(self).get_queryset is ArangoModelViewSet.get_queryset
+
     def get_object(self, pk):
         # Smart lookup: try _key first (efficient), fallback to id field (backward compatible)
         db = self.request.arangodb
@@ -63,11 +168,22 @@ class ArangoModelViewSet(viewsets.ViewSet):
         raise NotFound(detail="Object not found")
 
     def list(self, request):
+        # Paginate only if page param is present (backward compatible)
+        if 'page' in request.query_params and self.paginator is not None:
+            list_query = self.get_list_query()
+            if list_query is not None:
+                query, bind_vars = list_query
+                docs = self.paginator.paginate_aql(request.arangodb, query, bind_vars, request, view=self)
+                if self._uses_stock_queryset():
+                    # Same model instances model.all() would have produced
+                    docs = [self.model(**doc) for doc in docs]
+                serializer = self.serializer_class(docs, many=True, context={"request": request, "view": self})
+                return self.get_paginated_response(serializer.data)
+
         queryset = self.get_queryset()
         serializer = self.serializer_class(
             queryset, many=True, context={"request": request, "view": self}
         )
-        # Paginate only if page param is present (backward compatible)
         if 'page' in request.query_params:
             page = self.paginate_queryset(serializer.data)
             if page is not None:
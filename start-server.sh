@@ -4,4 +4,14 @@ echo "Hello from DRD Django"
 python manage.py collectstatic --no-input
 python manage.py migrate --no-input
 
+# Sample CSV imports run here, outside the gunicorn workers, as the same
+# user; restarted whenever the worker exits
+(
+    while true; do
+        runuser -u www-data -- "$(command -v python)" manage.py run_import_worker
+        echo "Import worker exited with status $?, restarting in 5s" >&2
+        sleep 5
+    done
+) &
+
 gunicorn roma.wsgi --user www-data --bind 0.0.0.0:8010 --workers 3 & nginx -g "daemon off;"